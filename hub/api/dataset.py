@@ -3,6 +3,7 @@ License:
 This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
+import copy
 import warnings
 from hub.api.versioning import VersionNode
 import os
@@ -12,7 +13,6 @@ import json
 import sys
 from typing import Iterable
 import traceback
-from collections import defaultdict
 import numpy as np
 from PIL import Image as im, ImageChops
 
@@ -43,6 +43,8 @@ from hub.api.dataset_utils import (
     _copy_helper,
     _get_compressor,
     _get_dynamic_tensor_dtype,
+    _get_schema_paths,
+    _get_storage_tensor_class,
     _store_helper,
     check_class_label,
     same_schema,
@@ -53,7 +55,6 @@ import hub.schema.deserialize
 from hub.schema.features import flatten
 from hub import auto
 
-from hub.store.dynamic_tensor import DynamicTensor
 from hub.store.store import get_fs_and_path, get_storage_map
 from hub.exceptions import (
     AddressNotFound,
@@ -71,7 +72,8 @@ from hub.exceptions import (
     InvalidVersionInfoException,
     SchemaMismatchException,
 )
-from hub.store.metastore import MetaStorage
+from hub.store.metastore import MetaCache, MetaStorage
+from hub.store.chunk_index import ChunkCommitIndex
 from hub.client.hub_control import HubControlClient
 from hub.schema import Audio, BBox, ClassLabel, Image, Sequence, Text, Video
 from hub.utils import norm_cache, norm_shape, _tuple_product
@@ -101,6 +103,7 @@ class Dataset:
         lazy: bool = True,
         public: bool = True,
         name: str = None,
+        cache_shards: int = 1,
     ):
         """| Open a new or existing dataset for read/write
 
@@ -126,6 +129,7 @@ class Dataset:
             if 0, False or None, then cache is not used
         storage_cache: int, optional
             Size of the storage cache. Default is 256MB (2**28)
+            Chunks of remote datasets are cached on local disk under ~/.activeloop/cache/ and reused between sessions
             if 0, False or None, then storage cache is not used
         lock_cache: bool, optional
             Lock the cache for avoiding multiprocessing errors
@@ -137,6 +141,9 @@ class Dataset:
             the dataset won't be visible in the visualizer to the public
         name: str, optional
             only applicable when using hub storage, this is the name that shows up on the visualizer
+        cache_shards: int, optional
+            Number of independently locked shards the memory cache is split into. Default is 1
+            Use more shards when the dataset is read or written from many threads at once
         """
 
         shape = norm_shape(shape)
@@ -160,38 +167,55 @@ class Dataset:
         self._cache = cache
         self._storage_cache = storage_cache
         self.lock_cache = lock_cache
+        self._cache_shards = cache_shards
         self.verison = "1.x"
         mode = self._get_mode(mode, self._fs)
         self._mode = mode
         needcreate = self._check_and_prepare_dir()
         fs_map = fs_map or get_storage_map(
-            self._fs, self._path, cache, lock=lock_cache, storage_cache=storage_cache
+            self._fs,
+            self._path,
+            cache,
+            lock=lock_cache,
+            storage_cache=storage_cache,
+            cache_shards=cache_shards,
         )
-        self._fs_map = fs_map
+        self._fs_map = MetaCache(fs_map)
         self._meta_information = meta_information
         self.username = None
         self.dataset_name = None
         if not needcreate:
-            self.meta = json.loads(fs_map[defaults.META_FILE].decode("utf-8"))
+            self.meta = self._fs_map.meta
+            if self.meta is None:
+                raise KeyError(defaults.META_FILE)
             self._name = self.meta.get("name") or None
             self._shape = tuple(self.meta["shape"])
             self._schema = hub.schema.deserialize.deserialize(self.meta["schema"])
-            self._meta_information = self.meta.get("meta_info") or dict()
+            # A copy, so that _save_meta can tell whether it was changed
+            self._meta_information = copy.deepcopy(self.meta.get("meta_info") or dict())
             self._flat_tensors = tuple(flatten(self._schema))
+            self._schema_paths = _get_schema_paths(self._schema)
             try:
-                version_info = pickle.loads(fs_map[defaults.VERSION_INFO])
+                version_info = pickle.loads(self._fs_map[defaults.VERSION_INFO])
                 self._branch_node_map = version_info.get("branch_node_map")
                 self._commit_node_map = version_info.get("commit_node_map")
-                self._chunk_commit_map = version_info.get("chunk_commit_map")
+                self._chunk_index_state = version_info.get("chunk_index")
+                # Datasets created before the chunk index kept whole chunk_commit_map in version.pkl
+                self._legacy_chunk_commit_map = version_info.get("chunk_commit_map")
+                self._chunk_commit_map = {}
                 if not (
                     self._branch_node_map
                     and self._commit_node_map
-                    and self._chunk_commit_map
+                    and (
+                        self._chunk_index_state is not None
+                        or self._legacy_chunk_commit_map
+                    )
                 ):
                     raise InvalidVersionInfoException()
                 self._branch = "master"
                 self._version_node = self._branch_node_map[self._branch]
                 self._commit_id = self._version_node.commit_id
+                self._reset_chunk_resolution()
             except KeyError:
                 self._commit_id = None
                 self._branch = None
@@ -199,6 +223,10 @@ class Dataset:
                 self._branch_node_map = None
                 self._commit_node_map = None
                 self._chunk_commit_map = None
+                self._chunk_index_state = None
+                self._legacy_chunk_commit_map = None
+                self._ancestry = {}
+                self._resolved_chunks = {}
             except InvalidVersionInfoException:
                 self._commit_id = None
                 self._branch = None
@@ -206,6 +234,10 @@ class Dataset:
                 self._branch_node_map = None
                 self._commit_node_map = None
                 self._chunk_commit_map = None
+                self._chunk_index_state = None
+                self._legacy_chunk_commit_map = None
+                self._ancestry = {}
+                self._resolved_chunks = {}
 
             self._tensors = dict(self._open_storage_tensors())
 
@@ -231,15 +263,17 @@ class Dataset:
                 self.meta = self._store_meta()
                 self._meta_information = meta_information
                 self._flat_tensors = tuple(flatten(self.schema))
+                self._schema_paths = _get_schema_paths(self._schema)
 
                 self._commit_id = generate_hash()
                 self._branch = "master"
                 self._version_node = VersionNode(self._commit_id, self._branch)
                 self._branch_node_map = {self._branch: self._version_node}
                 self._commit_node_map = {self._commit_id: self._version_node}
-                self._chunk_commit_map = {
-                    path: defaultdict(set) for schema, path in self._flat_tensors
-                }
+                self._reset_chunk_resolution()
+                self._chunk_index_state = {}
+                self._legacy_chunk_commit_map = None
+                self._chunk_commit_map = {}
                 self._tensors = dict(self._generate_storage_tensors())
             except Exception as e:
                 try:
@@ -310,19 +344,49 @@ class Dataset:
             "meta_info": self._meta_information or dict(),
             "name": self._name,
         }
-
-        self._fs_map[defaults.META_FILE] = bytes(json.dumps(meta), "utf-8")
+        # Keeps metadata of the tensors, stored in the same document
+        stored_meta = self._fs_map.meta
+        if stored_meta is None:
+            self._fs_map[defaults.META_FILE] = bytes(json.dumps(meta), "utf-8")
+        else:
+            stored_meta.update(json.loads(json.dumps(meta)))
+            self._fs_map.mark_dirty()
         return meta
 
     def _store_version_info(self) -> dict:
         if self._commit_id is not None:
+            self._chunk_index_state = {
+                path: index.flush() for path, index in self._chunk_commit_map.items()
+            }
+            self._legacy_chunk_commit_map = None
             d = {
                 "branch_node_map": self._branch_node_map,
                 "commit_node_map": self._commit_node_map,
-                "chunk_commit_map": self._chunk_commit_map,
+                "chunk_index": self._chunk_index_state,
             }
             self._fs_map[defaults.VERSION_INFO] = pickle.dumps(d)
 
+    def _get_chunk_index(self, path: str, storage) -> ChunkCommitIndex:
+        if self._legacy_chunk_commit_map is not None:
+            return ChunkCommitIndex.from_sets(
+                storage, self._legacy_chunk_commit_map.get(path, {})
+            )
+        return ChunkCommitIndex(storage, **self._chunk_index_state.get(path, {}))
+
+    def _get_tensor_storage_map(self, t_path: str):
+        path = posixpath.join(self._path, t_path[1:])
+        storage = get_storage_map(
+            self._fs,
+            path,
+            self._cache,
+            self.lock_cache,
+            storage_cache=self._storage_cache,
+            cache_shards=self._cache_shards,
+        )
+        if self._commit_id is not None:
+            self._chunk_commit_map[t_path] = self._get_chunk_index(t_path, storage)
+        return MetaStorage(t_path, storage, self._fs_map, self)
+
     def commit(self, message: str = "") -> str:
         """| Saves the current state of the dataset and returns the commit id.
         Checks out automatically to an auto branch if the current commit is not the head of the branch
@@ -350,6 +414,7 @@ class Dataset:
             self._version_node = new_node
             self._branch_node_map[self._branch] = new_node
             self._commit_node_map[self._commit_id] = new_node
+            self._reset_chunk_resolution()
             self.flush()
             return stored_commit_id
 
@@ -387,7 +452,7 @@ class Dataset:
             new_node = VersionNode(new_commit_id, self._branch)
             if not self._version_node.children:
                 for key in self.keys:
-                    self._tensors[key].fs_map.copy_all_chunks(
+                    self._tensors[key].fs_map.link_all_chunks(
                         self._commit_id, new_commit_id
                     )
                 if self._version_node.parent is not None:
@@ -403,8 +468,14 @@ class Dataset:
             self.flush()
         else:
             raise AddressNotFound(address)
+        self._reset_chunk_resolution()
         return self._commit_id
 
+    def _reset_chunk_resolution(self):
+        """Precomputes ancestry of the current commit and drops chunk keys resolved for the previous one"""
+        self._ancestry = self._version_node.ancestry()
+        self._resolved_chunks = {}
+
     def _auto_checkout(self):
         """| Automatically checks out to a new branch if the current commit is not at the head of a branch"""
         if self._version_node and self._version_node.children:
@@ -477,44 +548,22 @@ class Dataset:
             t_dtype, t_path = t
             path = posixpath.join(self._path, t_path[1:])
             self._fs.makedirs(posixpath.join(path, "--dynamic--"))
-            yield t_path, DynamicTensor(
-                fs_map=MetaStorage(
-                    t_path,
-                    get_storage_map(
-                        self._fs,
-                        path,
-                        self._cache,
-                        self.lock_cache,
-                        storage_cache=self._storage_cache,
-                    ),
-                    self._fs_map,
-                    self,
-                ),
+            yield t_path, _get_storage_tensor_class(t_dtype)(
+                fs_map=self._get_tensor_storage_map(t_path),
                 mode=self._mode,
                 shape=self._shape + t_dtype.shape,
                 max_shape=self._shape + t_dtype.max_shape,
                 dtype=_get_dynamic_tensor_dtype(t_dtype),
                 chunks=t_dtype.chunks,
                 compressor=_get_compressor(t_dtype.compressor),
+                chunk_layout=getattr(t_dtype, "chunk_layout", "auto"),
             )
 
     def _open_storage_tensors(self):
         for t in self._flat_tensors:
             t_dtype, t_path = t
-            path = posixpath.join(self._path, t_path[1:])
-            yield t_path, DynamicTensor(
-                fs_map=MetaStorage(
-                    t_path,
-                    get_storage_map(
-                        self._fs,
-                        path,
-                        self._cache,
-                        self.lock_cache,
-                        storage_cache=self._storage_cache,
-                    ),
-                    self._fs_map,
-                    self,
-                ),
+            yield t_path, _get_storage_tensor_class(t_dtype)(
+                fs_map=self._get_tensor_storage_map(t_path),
                 mode=self._mode,
                 # FIXME We don't need argument below here
                 shape=self._shape + t_dtype.shape,
@@ -609,14 +658,7 @@ class Dataset:
             raise KeyError(f"Key {subpath} not found in the dataset")
 
         assign_value = get_value(value)
-        schema_dict = self.schema
-        if subpath[1:] in schema_dict.dict_.keys():
-            schema_key = schema_dict.dict_.get(subpath[1:], None)
-        else:
-            for schema_key in subpath[1:].split("/"):
-                schema_dict = schema_dict.dict_.get(schema_key, None)
-                if not isinstance(schema_dict, SchemaDict):
-                    schema_key = schema_dict
+        schema_key = self._schema_paths[subpath][-1]
         if isinstance(schema_key, ClassLabel):
             assign_value = check_class_label(assign_value, schema_key)
         if isinstance(schema_key, (Text, bytes)) or (
@@ -683,8 +725,18 @@ class Dataset:
             self, url, token, sample_per_shard, public, scheduler, workers
         )
 
-    def copy(self, dst_url: str, token=None, fs=None, public=True):
+    def copy(
+        self,
+        dst_url: str,
+        token=None,
+        fs=None,
+        public=True,
+        workers: int = defaults.DEFAULT_PARALLEL_REQUESTS,
+        resume: bool = False,
+    ):
         """| Creates a copy of the dataset at the specified url and returns the dataset object
+        Files are copied in parallel, on the server side if both urls point to the same backend.
+
         Parameters
         ----------
         dst_url: str
@@ -697,6 +749,10 @@ class Dataset:
             only applicable if using hub storage, ignored otherwise
             setting this to False allows only the user who created it to access the new copied dataset and
             the dataset won't be visible in the visualizer to the public
+        workers: int, optional
+            Number of files copied at the same time
+        resume: bool, optional
+            Continue an interrupted copy to dst_url instead of requiring it to be empty
         """
         self.flush()
         destination = dst_url
@@ -707,6 +763,8 @@ class Dataset:
             public=public,
             src_url=self._path,
             src_fs=self._fs,
+            workers=workers,
+            resume=resume,
         )
 
         #  create entry in database if stored in hub storage
@@ -722,6 +780,27 @@ class Dataset:
             )
         return hub.Dataset(destination, token=token, fs=fs, public=public)
 
+    def vacuum(self) -> int:
+        """| Deletes chunks the dataset doesn't use anymore, left behind by overwriting samples with smaller ones
+        and by overwriting samples of ragged tensors.
+        Only chunks of the current, not yet committed version are deleted.
+
+        Returns
+        ----------
+        Number of deleted chunks
+        """
+        if "r" in self._mode:
+            raise ReadModeException("vacuum")
+        if self._version_node and self._version_node.children:
+            # Chunks of committed versions are never changed
+            return 0
+        # Storage is listed again after the flush, chunks written by others are not missed
+        self.flush()
+        deleted = sum(tensor.vacuum() for tensor in self._tensors.values())
+        self.flush()
+        logger.info(f"Vacuum deleted {deleted} chunks")
+        return deleted
+
     def resize_shape(self, size: int) -> None:
         """ Resize the shape of the dataset by resizing each tensor first dimension """
         if size == self._shape[0]:
@@ -766,6 +845,11 @@ class Dataset:
         indexes=None,
         key_list=None,
         shuffle=False,
+        mode="map",
+        batch_size=None,
+        shuffle_buffer=None,
+        seed=None,
+        shared_cache_size=None,
     ):
         """| Converts the dataset into a pytorch compatible format.
         ** Pytorch does not support uint16, uint32, uint64 dtypes. These are implicitly type casted to int32, int64 and int64 respectively.
@@ -787,15 +871,47 @@ class Dataset:
             use ["a/b/c"] as key_list
         shuffle: bool, optional
             whether to shuffle the data chunkwise or not. Default is False.
+        mode: one of "map", "iterable", optional
+            "map" returns a map-style dataset yielding single samples. "iterable" returns an IterableDataset which
+            splits whole chunks between DataLoader workers. Default is "map".
+        batch_size: int, optional
+            Only for "iterable" mode. Number of samples collated into each yielded item, use with
+            DataLoader(batch_size=None). Yields single samples by default.
+        shuffle_buffer: int, optional
+            Only for "map" mode. Number of chunks kept in memory to draw samples from in random order,
+            chunk order is shuffled too. Only chunk order is shuffled by default if shuffle is True.
+        seed: int, optional
+            Only for "map" mode. Seed of the shuffle, TorchDataset.set_epoch(epoch) reshuffles with seed + epoch.
+        shared_cache_size: int, optional
+            Only for "map" mode. Size in bytes of a cache of decoded chunks in shared memory, used by all
+            DataLoader workers on the host. Requires python 3.8 or newer. Each worker caches its own chunks by default.
         """
         from .integrations import _to_pytorch
 
         ds = _to_pytorch(
-            self, transform, inplace, output_type, indexes, key_list, shuffle
+            self,
+            transform,
+            inplace,
+            output_type,
+            indexes,
+            key_list,
+            shuffle,
+            mode=mode,
+            batch_size=batch_size,
+            shuffle_buffer=shuffle_buffer,
+            seed=seed,
+            shared_cache_size=shared_cache_size,
         )
         return ds
 
-    def to_tensorflow(self, indexes=None, include_shapes=False, key_list=None):
+    def to_tensorflow(
+        self,
+        indexes=None,
+        include_shapes=False,
+        key_list=None,
+        shuffle_buffer=None,
+        seed=None,
+    ):
         """| Converts the dataset into a tensorflow compatible format
         Parameters
         ----------
@@ -807,10 +923,17 @@ class Dataset:
         key_list: list, optional
             The list of keys that are needed in tensorflow format. For nested schemas such as {"a":{"b":{"c": Tensor()}}}
             use ["a/b/c"] as key_list
+        shuffle_buffer: int, optional
+            Number of chunks kept in memory to draw samples from in random order. Chunk order is shuffled too.
+            Samples are not shuffled by default.
+        seed: int, optional
+            Seed of the shuffle, the seed of each epoch is seed + epoch number.
         """
         from .integrations import _to_tensorflow
 
-        ds = _to_tensorflow(self, indexes, include_shapes, key_list)
+        ds = _to_tensorflow(
+            self, indexes, include_shapes, key_list, shuffle_buffer, seed
+        )
         return ds
 
     def to_supervisely(self, output):
@@ -863,9 +986,10 @@ class Dataset:
         self.lazy = True
 
     def _save_meta(self):
-        _meta = json.loads(self._fs_map[defaults.META_FILE])
-        _meta["meta_info"] = self._meta_information
-        self._fs_map[defaults.META_FILE] = json.dumps(_meta).encode("utf-8")
+        _meta = self._fs_map.meta
+        if _meta.get("meta_info") != self._meta_information:
+            _meta["meta_info"] = copy.deepcopy(self._meta_information)
+            self._fs_map.mark_dirty()
 
     def flush(self):
         """Save changes from cache to dataset final storage. Doesn't create a new commit.
@@ -902,7 +1026,7 @@ class Dataset:
                 self.username, self.dataset_name, "UPLOADED"
             )
 
-    def numpy(self, label_name=False):
+    def numpy(self, label_name=False, columnar=False):
         """Gets the values from different tensorview objects in the dataset schema
 
         Parameters
@@ -910,7 +1034,13 @@ class Dataset:
         label_name: bool, optional
             If the TensorView object is of the ClassLabel type, setting this to True would retrieve the label names
             instead of the label encoded integers, otherwise this parameter is ignored.
+        columnar: bool, optional
+            If True, returns a dict (nested like the schema) with a batch of values per tensor
+            instead of a list of per sample dicts. Each tensor is read at once.
+            Values of dynamic shape are batched as lists.
         """
+        if columnar:
+            return self[0 : self._shape[0]].numpy(label_name=label_name, columnar=True)
         return np.array(
             [
                 create_numpy_dict(self, i, label_name=label_name)
@@ -918,7 +1048,7 @@ class Dataset:
             ]
         )
 
-    def compute(self, label_name=False):
+    def compute(self, label_name=False, columnar=False):
         """Gets the values from different tensorview objects in the dataset schema
 
         Parameters
@@ -926,8 +1056,12 @@ class Dataset:
         label_name: bool, optional
             If the TensorView object is of the ClassLabel type, setting this to True would retrieve the label names
             instead of the label encoded integers, otherwise this parameter is ignored.
+        columnar: bool, optional
+            If True, returns a dict (nested like the schema) with a batch of values per tensor
+            instead of a list of per sample dicts. Each tensor is read at once.
+            Values of dynamic shape are batched as lists.
         """
-        return self.numpy(label_name=label_name)
+        return self.numpy(label_name=label_name, columnar=columnar)
 
     def __str__(self):
         return (
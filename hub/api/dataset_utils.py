@@ -4,15 +4,17 @@ This Source Code Form is subject to the terms of the Mozilla Public License, v.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
 
-import os
 import time
 from typing import Union, Iterable, List
+from hub.defaults import DEFAULT_PARALLEL_REQUESTS
+from hub.store.copy_engine import copy_files
+from hub.store.dynamic_tensor import DynamicTensor
+from hub.store.ragged_tensor import RaggedTensor
 from hub.store.store import get_fs_and_path
 import numpy as np
 import sys
 from hub.exceptions import (
     ModuleNotInstalledException,
-    DirectoryNotEmptyException,
     ClassLabelValueError,
 )
 import hashlib
@@ -22,7 +24,7 @@ import numcodecs.lz4
 import numcodecs.zstd
 from hub.schema.features import Primitive, SchemaDict, Tensor
 from hub.numcodecs import PngCodec
-from hub.schema import ClassLabel
+from hub.schema import ClassLabel, Sequence
 
 
 def slice_split(slice_):
@@ -58,6 +60,8 @@ def same_schema(schema1, schema2):
                 or v.chunks != schema2.dict_[k].chunks
                 or v.dtype != schema2.dict_[k].dtype
                 or v.compressor != schema2.dict_[k].compressor
+                or getattr(v, "ragged", False)
+                != getattr(schema2.dict_[k], "ragged", False)
             ):
                 return False
         else:
@@ -206,33 +210,21 @@ def generate_hash():
 
 
 def _copy_helper(
-    dst_url: str, token=None, fs=None, public=True, src_url=None, src_fs=None
+    dst_url: str,
+    token=None,
+    fs=None,
+    public=True,
+    src_url=None,
+    src_fs=None,
+    workers=DEFAULT_PARALLEL_REQUESTS,
+    resume=False,
 ):
     """Helper function for Dataset.copy"""
-    src_url = src_fs.expand_path(src_url)[0]
     dst_url = dst_url[:-1] if dst_url.endswith("/") else dst_url
     dst_fs, dst_url = (
         (fs, dst_url) if fs else get_fs_and_path(dst_url, token=token, public=public)
     )
-    if dst_fs.exists(dst_url) and dst_fs.ls(dst_url):
-        raise DirectoryNotEmptyException(dst_url)
-    for path in src_fs.ls(src_url, refresh=True):
-        dst_full_path = dst_url + path[len(src_url) :]
-        dst_folder_path, dst_file = os.path.split(dst_full_path)
-        if src_fs.isfile(path):
-            if not dst_fs.exists(dst_folder_path):
-                dst_fs.mkdir(dst_folder_path)
-            content = src_fs.cat_file(path)
-            dst_fs.pipe_file(dst_full_path, content)
-        else:
-            _copy_helper(
-                dst_full_path,
-                token=token,
-                fs=dst_fs,
-                public=public,
-                src_url=path,
-                src_fs=src_fs,
-            )
+    copy_files(src_fs, src_url, dst_fs, dst_url, workers=workers, resume=resume)
     return dst_url
 
 
@@ -264,6 +256,24 @@ def _get_dynamic_tensor_dtype(t_dtype):
         return "object"
 
 
+def _get_schema_paths(schema: SchemaDict, root="", chain=()) -> dict:
+    """Maps every path of the schema ("/a", "/a/b", ...) to schema objects on the way to it, the last one included
+    Paths continue into dicts inside Sequences
+    """
+    paths = {}
+    for key, value in schema.dict_.items():
+        path, value_chain = f"{root}/{key}", chain + (value,)
+        paths[path] = value_chain
+        inner = value.dtype if isinstance(value, Sequence) else value
+        if isinstance(inner, SchemaDict):
+            paths.update(_get_schema_paths(inner, path, value_chain))
+    return paths
+
+
+def _get_storage_tensor_class(t_dtype):
+    return RaggedTensor if getattr(t_dtype, "ragged", False) else DynamicTensor
+
+
 def _get_compressor(compressor: str):
     if compressor is None:
         return None
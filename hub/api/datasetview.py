@@ -21,6 +21,8 @@ import numpy as np
 
 
 class DatasetView:
+    __slots__ = ("dataset", "lazy", "indexes", "is_contiguous")
+
     def __init__(
         self,
         dataset=None,
@@ -263,6 +265,10 @@ class DatasetView:
     def schema(self):
         return self.dataset.schema
 
+    @property
+    def _schema_paths(self):
+        return self.dataset._schema_paths
+
     def _get_dictionary(self, subpath, slice_):
         """Gets dictionary from dataset given incomplete subpath"""
         tensor_dict = {}
@@ -305,7 +311,9 @@ class DatasetView:
     def __repr__(self):
         return self.__str__()
 
-    def to_tensorflow(self, include_shapes=False, key_list=None):
+    def to_tensorflow(
+        self, include_shapes=False, key_list=None, shuffle_buffer=None, seed=None
+    ):
         """|Converts the dataset into a tensorflow compatible format
 
         Parameters
@@ -316,10 +324,19 @@ class DatasetView:
         key_list: list, optional
             The list of keys that are needed in tensorflow format. For nested schemas such as {"a":{"b":{"c": Tensor()}}}
             use ["a/b/c"] as key_list
+        shuffle_buffer: int, optional
+            Number of chunks kept in memory to draw samples from in random order. Chunk order is shuffled too.
+            Samples are not shuffled by default.
+        seed: int, optional
+            Seed of the shuffle, the seed of each epoch is seed + epoch number.
         """
 
         return self.dataset.to_tensorflow(
-            indexes=self.indexes, include_shapes=include_shapes, key_list=key_list
+            indexes=self.indexes,
+            include_shapes=include_shapes,
+            key_list=key_list,
+            shuffle_buffer=shuffle_buffer,
+            seed=seed,
         )
 
     def to_pytorch(
@@ -329,6 +346,11 @@ class DatasetView:
         output_type=dict,
         key_list=None,
         shuffle=False,
+        mode="map",
+        batch_size=None,
+        shuffle_buffer=None,
+        seed=None,
+        shared_cache_size=None,
     ):
         """| Converts the dataset into a pytorch compatible format.
         ** Pytorch does not support uint16, uint32, uint64 dtypes. These are implicitly type casted to int32, int64 and int64 respectively.
@@ -345,6 +367,20 @@ class DatasetView:
             Defines the output type. Default is dict - same as in original Hub Dataset.
         shuffle: bool, optional
             whether to shuffle the data chunkwise or not. Default is False.
+        mode: one of "map", "iterable", optional
+            "map" returns a map-style dataset yielding single samples. "iterable" returns an IterableDataset which
+            splits whole chunks between DataLoader workers. Default is "map".
+        batch_size: int, optional
+            Only for "iterable" mode. Number of samples collated into each yielded item, use with
+            DataLoader(batch_size=None). Yields single samples by default.
+        shuffle_buffer: int, optional
+            Only for "map" mode. Number of chunks kept in memory to draw samples from in random order,
+            chunk order is shuffled too. Only chunk order is shuffled by default if shuffle is True.
+        seed: int, optional
+            Only for "map" mode. Seed of the shuffle, TorchDataset.set_epoch(epoch) reshuffles with seed + epoch.
+        shared_cache_size: int, optional
+            Only for "map" mode. Size in bytes of a cache of decoded chunks in shared memory, used by all
+            DataLoader workers on the host. Requires python 3.8 or newer. Each worker caches its own chunks by default.
         """
         return self.dataset.to_pytorch(
             transform=transform,
@@ -353,6 +389,11 @@ class DatasetView:
             output_type=output_type,
             key_list=key_list,
             shuffle=shuffle,
+            mode=mode,
+            batch_size=batch_size,
+            shuffle_buffer=shuffle_buffer,
+            seed=seed,
+            shared_cache_size=shared_cache_size,
         )
 
     def resize_shape(self, size: int) -> None:
@@ -371,7 +412,7 @@ class DatasetView:
         """Flush dataset"""
         self.dataset.flush()
 
-    def numpy(self, label_name=False):
+    def numpy(self, label_name=False, columnar=False):
         """Gets the value from different tensorview objects in the datasetview schema
 
         Parameters
@@ -379,7 +420,13 @@ class DatasetView:
         label_name: bool, optional
             If the TensorView object is of the ClassLabel type, setting this to True would retrieve the label names
             instead of the label encoded integers, otherwise this parameter is ignored.
+        columnar: bool, optional
+            If True, returns a dict (nested like the schema) with a batch of values per tensor
+            instead of a list of per sample dicts. Each tensor is read at once.
+            Values of dynamic shape are batched as lists.
         """
+        if columnar:
+            return self._numpy_columnar(label_name=label_name)
         if isinstance(self.indexes, int):
             return create_numpy_dict(self.dataset, self.indexes, label_name=label_name)
         else:
@@ -390,13 +437,29 @@ class DatasetView:
                 ]
             )
 
+    def _numpy_columnar(self, label_name=False):
+        indexes = self.indexes
+        if self.is_contiguous:
+            indexes = slice(indexes[0], indexes[-1] + 1)
+        batch = {}
+        for path in self.dataset._tensors.keys():
+            d = batch
+            split = path.split("/")
+            for subpath in split[1:-1]:
+                d = d.setdefault(subpath, {})
+            tensorview = TensorView(
+                dataset=self.dataset, subpath=path, slice_=[indexes], lazy=self.lazy
+            )
+            d[split[-1]] = tensorview.numpy(label_name=label_name)
+        return batch
+
     def disable_lazy(self):
         self.lazy = False
 
     def enable_lazy(self):
         self.lazy = True
 
-    def compute(self, label_name=False):
+    def compute(self, label_name=False, columnar=False):
         """Gets the value from different tensorview objects in the datasetview schema
 
         Parameters
@@ -404,5 +467,9 @@ class DatasetView:
         label_name: bool, optional
             If the TensorView object is of the ClassLabel type, setting this to True would retrieve the label names
             instead of the label encoded integers, otherwise this parameter is ignored.
+        columnar: bool, optional
+            If True, returns a dict (nested like the schema) with a batch of values per tensor
+            instead of a list of per sample dicts. Each tensor is read at once.
+            Values of dynamic shape are batched as lists.
         """
-        return self.numpy(label_name=label_name)
+        return self.numpy(label_name=label_name, columnar=columnar)
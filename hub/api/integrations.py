@@ -4,22 +4,33 @@ This Source Code Form is subject to the terms of the Mozilla Public License, v.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
 
+import os
 import sys
 import numpy as np
 import json
-from itertools import chain
-from collections import defaultdict
+from itertools import chain, count
+from collections import Counter, OrderedDict, defaultdict
 import PIL.Image
 import PIL.ImageDraw
 from hub.exceptions import ModuleNotInstalledException, OutOfBoundsError
 from hub.schema.features import Primitive, Tensor, SchemaDict
 from hub.schema import Audio, BBox, ClassLabel, Image, Sequence, Text, Video, Mask
+from hub.defaults import DEFAULT_PREFETCH_CHUNKS, MAX_RAW_CHUNK_SIZE
+from hub.store.prefetcher import ChunkPrefetcher, plan_chunk_ranges
+from hub.store.shared_cache import SharedChunkCache
+from hub.utils import compute_lcm
 from .dataset import Dataset
 import hub.store.pickle_s3_storage
 import hub.schema.serialize
 import hub.schema.deserialize
 import random
 
+try:
+    from torch.utils.data import IterableDataset
+except ModuleNotFoundError:
+    # _to_pytorch raises ModuleNotInstalledException before it is ever used
+    IterableDataset = object
+
 
 def _to_pytorch(
     dataset,
@@ -29,6 +40,11 @@ def _to_pytorch(
     indexes=None,
     key_list=None,
     shuffle=False,
+    mode="map",
+    batch_size=None,
+    shuffle_buffer=None,
+    seed=None,
+    shared_cache_size=None,
 ):
     """| Converts the dataset into a pytorch compatible format.
 
@@ -47,6 +63,20 @@ def _to_pytorch(
         use ["a/b/c"] as key_list
     shuffle: bool, optional
         whether to shuffle the data chunkwise or not. Default is False.
+    mode: one of "map", "iterable", optional
+        "map" returns a map-style dataset yielding single samples. "iterable" returns an IterableDataset which
+        splits whole chunks between DataLoader workers. Default is "map".
+    batch_size: int, optional
+        Only for "iterable" mode. Number of samples collated into each yielded item, use with
+        DataLoader(batch_size=None). Yields single samples by default.
+    shuffle_buffer: int, optional
+        Only for "map" mode. Number of chunks kept in memory to draw samples from in random order,
+        chunk order is shuffled too. Only chunk order is shuffled by default if shuffle is True.
+    seed: int, optional
+        Only for "map" mode. Seed of the shuffle, TorchDataset.set_epoch(epoch) reshuffles with seed + epoch.
+    shared_cache_size: int, optional
+        Only for "map" mode. Size in bytes of a cache of decoded chunks in shared memory, used by all
+        DataLoader workers on the host. Requires python 3.8 or newer. Each worker caches its own chunks by default.
     """
     try:
         import torch
@@ -54,10 +84,32 @@ def _to_pytorch(
         raise ModuleNotInstalledException("torch")
 
     global torch
+    if mode not in ("map", "iterable"):
+        raise ValueError(f"mode should be 'map' or 'iterable', got {mode}")
+    if batch_size is not None and mode != "iterable":
+        raise ValueError("batch_size is only supported in iterable mode")
+    if (shuffle_buffer is not None or seed is not None) and mode != "map":
+        raise ValueError("shuffle_buffer and seed are only supported in map mode")
+    if shared_cache_size is not None and mode != "map":
+        raise ValueError("shared_cache_size is only supported in map mode")
     indexes = indexes or dataset.indexes
 
     if "r" not in dataset.mode:
         dataset.flush()  # FIXME Without this some tests in test_converters.py fails, not clear why
+    if mode == "iterable":
+        return TorchIterableDataset(
+            dataset,
+            transform,
+            inplace=inplace,
+            output_type=output_type,
+            indexes=indexes,
+            key_list=key_list,
+            shuffle=shuffle,
+            batch_size=batch_size,
+        )
+    shared_cache = None
+    if shared_cache_size is not None:
+        shared_cache = SharedChunkCache(shared_cache_size)
     return TorchDataset(
         dataset,
         transform,
@@ -66,6 +118,9 @@ def _to_pytorch(
         indexes=indexes,
         key_list=key_list,
         shuffle=shuffle,
+        shuffle_buffer=shuffle_buffer,
+        seed=seed,
+        shared_cache=shared_cache,
     )
 
 
@@ -162,8 +217,17 @@ def _from_pytorch(dataset, scheduler: str = "single", workers: int = 1):
     return my_transform(dataset)
 
 
-def _to_tensorflow(dataset, indexes=None, include_shapes=False, key_list=None):
+def _to_tensorflow(
+    dataset,
+    indexes=None,
+    include_shapes=False,
+    key_list=None,
+    shuffle_buffer=None,
+    seed=None,
+):
     """| Converts the dataset into a tensorflow compatible format
+    If all tensors have fixed shapes, or are Text, blocks of samples are read and decoded in parallel
+    and then split into samples. Otherwise samples are read one by one.
 
     Parameters
     ----------
@@ -172,6 +236,12 @@ def _to_tensorflow(dataset, indexes=None, include_shapes=False, key_list=None):
     include_shapes: boolean, optional
         False by default. Setting it to True passes the shapes to tf.data.Dataset.from_generator.
         Setting to True could lead to issues with dictionaries inside Tensors.
+        Shapes are always known if blocks of samples are read.
+    shuffle_buffer: int, optional
+        Number of chunks kept in memory to draw samples from in random order. Chunk order is shuffled too.
+        Samples are not shuffled by default.
+    seed: int, optional
+        Seed of the shuffle, the seed of each epoch is seed + epoch number.
     """
     try:
         import tensorflow as tf
@@ -189,27 +259,27 @@ def _to_tensorflow(dataset, indexes=None, include_shapes=False, key_list=None):
     _samples_in_chunks = {
         key: value.chunks[0] for key, value in dataset._tensors.items()
     }
-    _active_chunks = {}
-    _active_chunks_range = {}
-
-    def _get_active_item(key, index):
-        active_range = _active_chunks_range.get(key)
-        samples_per_chunk = _samples_in_chunks[key]
-        if active_range is None or index not in active_range:
-            active_range_start = index - index % samples_per_chunk
-            active_range = range(
-                active_range_start,
-                min(active_range_start + samples_per_chunk, indexes[-1] + 1),
-            )
-            _active_chunks_range[key] = active_range
-            _active_chunks[key] = dataset._tensors[key][
-                active_range.start : active_range.stop
-            ]
-        return _active_chunks[key][index % samples_per_chunk]
+    max_chunk = max(_samples_in_chunks[key] for key in key_list)
+    epochs = count()
 
     def tf_gen():
         key_dtype_map = {key: dataset[key, indexes[0]].dtype for key in dataset.keys}
-        for index in indexes:
+        order, resident = indexes, 1
+        if shuffle_buffer:
+            epoch = next(epochs)
+            rng = random if seed is None else random.Random(seed + epoch)
+            order = _shuffle_indexes(indexes, max_chunk, shuffle_buffer, rng)
+            resident = max_chunk * shuffle_buffer
+        reader = _ChunkReader(
+            dataset, key_list, order, _samples_in_chunks, indexes[-1], resident
+        )
+        try:
+            yield from _gen(order, key_dtype_map, reader)
+        finally:
+            reader.close()
+
+    def _gen(order, key_dtype_map, reader):
+        for index in order:
             d = {}
             for key in dataset.keys:
                 if key not in key_list:
@@ -221,13 +291,13 @@ def _to_tensorflow(dataset, indexes=None, include_shapes=False, key_list=None):
                     else:
                         cur[split_key[i]] = {}
                         cur = cur[split_key[i]]
-                cur[split_key[-1]] = _get_active_item(key, index)
+                cur[split_key[-1]] = reader.get_item(key, index)
                 if isinstance(key_dtype_map[key], Text):
                     value = cur[split_key[-1]]
                     cur[split_key[-1]] = (
-                        "".join(chr(it) for it in value.tolist())
+                        _decode_text([value])[0]
                         if value.ndim == 1
-                        else ["".join(chr(it) for it in val.tolist()) for val in value]
+                        else list(_decode_text(value))
                     )
 
             yield (d)
@@ -259,24 +329,73 @@ def _to_tensorflow(dataset, indexes=None, include_shapes=False, key_list=None):
                 return "string"
             return str(my_dtype._dtype)
 
-    def get_output_shapes(my_dtype, path=""):
+    def get_output_shapes(my_dtype, path="", batched=False):
+        batch = (None,) if batched else ()
         if isinstance(my_dtype, SchemaDict):
-            return output_shapes_from_dict(my_dtype, path=path)
+            return output_shapes_from_dict(my_dtype, path=path, batched=batched)
         elif isinstance(my_dtype, (Text, Primitive)):
-            return ()
+            return batch
         elif isinstance(my_dtype, Tensor):
-            return my_dtype.shape
+            return batch + tuple(my_dtype.shape)
 
-    def output_shapes_from_dict(my_dtype, path=""):
+    def output_shapes_from_dict(my_dtype, path="", batched=False):
         d = {}
         for k, v in my_dtype.dict_.items():
             for key in key_list:
                 if key.startswith(path + "/" + k):
-                    d[k] = get_output_shapes(v, path + "/" + k)
+                    d[k] = get_output_shapes(v, path + "/" + k, batched)
                     break
         return d
 
+    def is_block_readable(key):
+        """Whether samples of key can be read a block at a time into one array"""
+        tensor = dataset._tensors[key]
+        if isinstance(dataset._schema_paths[key][-1], Text):
+            return len(tensor.shape) == 2
+        return None not in tensor.shape
+
+    def tf_block_ids():
+        block_ids = list(range(len(blocks)))
+        if shuffle_buffer:
+            epoch = next(epochs)
+            rng = random if seed is None else random.Random(seed + epoch)
+            rng.shuffle(block_ids)
+        yield from block_ids
+
+    def tf_read_block(block_id):
+        d = {}
+        for key in key_list:
+            split_key, cur = key.split("/"), d
+            for subkey in split_key[1:-1]:
+                cur = cur.setdefault(subkey, {})
+            value = dataset._tensors[key].gather(blocks[block_id])
+            if isinstance(dataset._schema_paths[key][-1], Text):
+                value = _decode_text(value)
+            cur[split_key[-1]] = value
+        yield d
+
     output_types = dtype_to_tf(dataset._schema)
+    if all(is_block_readable(key) for key in key_list):
+        # Blocks of samples are read and decoded in parallel, then split into samples
+        block_size = max_chunk
+        sample_nbytes = sum(_sample_nbytes(dataset._tensors[key]) for key in key_list)
+        while block_size > 1 and block_size * sample_nbytes > MAX_RAW_CHUNK_SIZE:
+            block_size //= 2
+        blocks = _group_blocks(indexes, block_size)
+        block_shapes = get_output_shapes(dataset._schema, batched=True)
+        tf_ds = tf.data.Dataset.from_generator(tf_block_ids, output_types=tf.int64)
+        tf_ds = tf_ds.interleave(
+            lambda block_id: tf.data.Dataset.from_generator(
+                tf_read_block,
+                output_types=output_types,
+                output_shapes=block_shapes,
+                args=(block_id,),
+            ),
+            num_parallel_calls=tf.data.AUTOTUNE,
+        ).unbatch()
+        if shuffle_buffer:
+            tf_ds = tf_ds.shuffle(shuffle_buffer * block_size, seed=seed)
+        return tf_ds
     if include_shapes:
         output_shapes = get_output_shapes(dataset._schema)
         return tf.data.Dataset.from_generator(
@@ -583,8 +702,19 @@ class TorchDataset:
         indexes=None,
         key_list=None,
         shuffle=False,
+        shuffle_buffer=None,
+        seed=None,
+        prefetch=DEFAULT_PREFETCH_CHUNKS,
+        shared_cache=None,
     ):
         self._ds = None
+        self._shared_cache = shared_cache
+        self._reader = None
+        self._reader_pid = None
+        self.prefetch = prefetch
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
         self._url = ds.url
         self._token = ds.token
         self._transform = transform
@@ -606,22 +736,24 @@ class TorchDataset:
             self.last_index = indexes
         elif len(indexes) > 0:
             self.last_index = indexes[-1]
+        self._unshuffled_indexes = indexes
         self.indexes = self.shuffle_indexes(indexes, shuffle)
 
-    def shuffle_indexes(self, indexes, shuffle):
-        if not shuffle or isinstance(indexes, int):
+    def shuffle_indexes(self, indexes, shuffle, epoch=0):
+        if not (shuffle or self.shuffle_buffer) or isinstance(indexes, int):
             return indexes
-        chunk_indexes_map = defaultdict(list)
-        chunk_size = self.max_chunk
-        for index in indexes:
-            chunk = index // chunk_size
-            chunk_indexes_map[chunk].append(index)
-        chunk_indexes = list(chunk_indexes_map.values())
-        random.shuffle(chunk_indexes)
-        new_indexes = []
-        for item in chunk_indexes:
-            new_indexes.extend(item)
-        return new_indexes
+        rng = random if self.seed is None else random.Random(self.seed + epoch)
+        return _shuffle_indexes(indexes, self.max_chunk, self.shuffle_buffer, rng)
+
+    def set_epoch(self, epoch):
+        """Shuffles the samples again, with seed + epoch if seed is given"""
+        self.indexes = self.shuffle_indexes(
+            self._unshuffled_indexes, self.shuffle, epoch
+        )
+        if self._reader is not None:
+            self._reader.close()
+        self._reader = None
+        self._reader_pid = None
 
     def get_max_chunk(self, ds):
         max_chunk = 1
@@ -647,28 +779,38 @@ class TorchDataset:
                 key: (None in value.shape) and 1 or value.chunks[0]
                 for key, value in self._ds._tensors.items()
             }
-            self._active_chunks = {}
-            self._active_chunks_range = {}
+        if self._reader_pid != os.getpid():
+            # Threads of the prefetcher are not copied into forked DataLoader workers
+            self._reader = self._create_reader()
+            self._reader_pid = os.getpid()
+
+    def _create_reader(self):
+        indexes = [self.indexes] if isinstance(self.indexes, int) else self.indexes
+        resident = self.max_chunk * self.shuffle_buffer if self.shuffle_buffer else 1
+        # Each of several workers gets only some of the batches, in an order the
+        # dataset can't know, so reading ahead in the order of indexes would be wasted
+        prefetch = self.prefetch if _worker_count() == 1 else 0
+        return _ChunkReader(
+            self._ds,
+            self.key_list,
+            indexes,
+            self._samples_in_chunks,
+            self.last_index,
+            resident,
+            prefetch=prefetch,
+            cache=self._shared_cache,
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        state["_reader_pid"] = None
+        return state
 
     def __len__(self):
         self._init_ds()
         return len(self.indexes) if isinstance(self.indexes, list) else 1
 
-    def _get_active_item(self, key, index):
-        active_range = self._active_chunks_range.get(key)
-        samples_per_chunk = self._samples_in_chunks[key]
-        if active_range is None or index not in active_range:
-            active_range_start = index - index % samples_per_chunk
-            active_range = range(
-                active_range_start,
-                min(active_range_start + samples_per_chunk, self.last_index + 1),
-            )
-            self._active_chunks_range[key] = active_range
-            self._active_chunks[key] = self._ds._tensors[key][
-                active_range.start : active_range.stop
-            ]
-        return self._active_chunks[key][index % samples_per_chunk]
-
     def __getitem__(self, ind):
         if isinstance(self.indexes, int):
             if ind != 0:
@@ -688,7 +830,7 @@ class TorchDataset:
                     cur[split_key[i]] = {}
                 cur = cur[split_key[i]]
 
-            item = self._get_active_item(key, index)
+            item = self._reader.get_item(key, index)
             if not isinstance(item, bytes) and not isinstance(item, str):
                 t = item
                 if self.inplace:
@@ -709,6 +851,287 @@ class TorchDataset:
             yield self[i]
 
 
+def _worker_count():
+    """Number of DataLoader workers of the current process, 1 outside of workers"""
+    try:
+        from torch.utils.data import get_worker_info
+    except ModuleNotFoundError:
+        return 1
+    worker_info = get_worker_info()
+    return 1 if worker_info is None else worker_info.num_workers
+
+
+def _sample_nbytes(tensor):
+    """Upper bound of the size of a decoded sample of tensor"""
+    sample_shape = [dim or 1 for dim in tensor.max_shape[1:]]
+    return int(np.prod(sample_shape)) * np.dtype(tensor.dtype).itemsize
+
+
+def _group_blocks(indexes, block_size):
+    """Groups indexes by blocks of block_size samples, in the order blocks are first visited"""
+    blocks = defaultdict(list)
+    for index in indexes:
+        blocks[index // block_size].append(index)
+    return list(blocks.values())
+
+
+def _decode_text(samples):
+    """Decodes a batch of Text samples, codes of all samples are decoded at once"""
+    samples = list(samples)
+    if not samples:
+        return np.array([], dtype=object)
+    lengths = [len(sample) for sample in samples]
+    codes = np.concatenate(samples).astype("<u4")
+    text = codes.tobytes().decode("utf-32-le")
+    ends = np.cumsum(lengths).tolist()
+    return np.array(
+        [text[end - length : end] for end, length in zip(ends, lengths)], dtype=object
+    )
+
+
+def _shuffle_indexes(indexes, chunk_size, buffer_chunks=None, rng=random):
+    """Shuffles the order of chunks of chunk_size samples
+    If buffer_chunks is given, samples are drawn at random from a buffer of that many chunks,
+    refilled with the next chunk each time one is drained
+    """
+    chunk_indexes_map = defaultdict(list)
+    for index in indexes:
+        chunk_indexes_map[index // chunk_size].append(index)
+    chunk_indexes = list(chunk_indexes_map.values())
+    rng.shuffle(chunk_indexes)
+    if not buffer_chunks:
+        return [index for item in chunk_indexes for index in item]
+    new_indexes, buffer, remaining = [], [], []
+    for chunk, item in enumerate(chunk_indexes):
+        buffer += [(index, chunk) for index in item]
+        remaining.append(len(item))
+        if chunk + 1 < min(buffer_chunks, len(chunk_indexes)):
+            continue
+        # draw until a chunk is drained, freeing a place for the next one
+        while buffer:
+            i = rng.randrange(len(buffer))
+            buffer[i], buffer[-1] = buffer[-1], buffer[i]
+            index, drawn_chunk = buffer.pop()
+            new_indexes.append(index)
+            remaining[drawn_chunk] -= 1
+            if not remaining[drawn_chunk] and chunk + 1 < len(chunk_indexes):
+                break
+    return new_indexes
+
+
+class _ChunkReader:
+    """Reads samples of tensors visited in the order of indexes
+    Chunks are kept in memory until their last index is read, at most the resident most recently
+    used ones per tensor, as planned by plan_chunk_ranges. Upcoming chunks are read ahead
+    as long as samples are requested in the order of indexes.
+    """
+
+    def __init__(
+        self,
+        ds,
+        key_list,
+        indexes,
+        samples_in_chunks,
+        last_index,
+        resident=1,
+        prefetch=DEFAULT_PREFETCH_CHUNKS,
+        cache=None,
+    ):
+        """resident is the number of samples to keep in memory, rounded up to whole chunks
+        cache is an optional SharedChunkCache of chunks read by other processes
+        """
+        self._ds = ds
+        self._cache = cache
+        self._samples_in_chunks = samples_in_chunks
+        self._last_index = last_index
+        self._resident = {
+            key: -(-resident // samples_in_chunks[key]) for key in key_list
+        }
+        self._chunks = {key: OrderedDict() for key in key_list}
+        self._remaining = {
+            key: Counter(index - index % samples_in_chunks[key] for index in indexes)
+            for key in key_list
+        }
+        plans = {
+            key: plan_chunk_ranges(
+                indexes, samples_in_chunks[key], last_index, self._resident[key]
+            )
+            for key in key_list
+        }
+        sample_nbytes = {key: _sample_nbytes(ds._tensors[key]) for key in key_list}
+        self._prefetcher = ChunkPrefetcher(
+            self._fetch_chunk, plans, sample_nbytes, depth=prefetch
+        )
+
+    def _fetch_chunk(self, key, start, stop):
+        if self._cache is None:
+            return self._ds._tensors[key][start:stop]
+        value = self._cache.get((key, start, stop))
+        if value is None:
+            value = self._ds._tensors[key][start:stop]
+            self._cache.put((key, start, stop), value)
+        return value
+
+    def get_item(self, key, index):
+        samples_per_chunk = self._samples_in_chunks[key]
+        start = index - index % samples_per_chunk
+        chunks, remaining = self._chunks[key], self._remaining[key]
+        chunk = chunks.get(start)
+        if chunk is not None:
+            chunks.move_to_end(start)
+        else:
+            stop = min(start + samples_per_chunk, self._last_index + 1)
+            chunk = chunks[start] = self._prefetcher.get(key, start, stop)
+            if len(chunks) > self._resident[key]:
+                chunks.popitem(last=False)
+        remaining[start] -= 1
+        if remaining[start] <= 0:
+            chunks.pop(start, None)
+        return chunk[index % samples_per_chunk]
+
+    def close(self):
+        self._prefetcher.close()
+
+
+def _concat_columns(parts):
+    """Concatenates the columns of consecutive reads, samples of differing shapes are kept as lists"""
+    columns = {}
+    for key in parts[0]:
+        values = [part[key] for part in parts]
+        if all(isinstance(value, np.ndarray) for value in values) and (
+            len({value.shape[1:] for value in values}) == 1
+        ):
+            columns[key] = np.concatenate(values)
+        else:
+            columns[key] = [sample for value in values for sample in value]
+    return columns
+
+
+def _to_torch(value):
+    if isinstance(value, list):
+        return [_to_torch(item) for item in value]
+    if value.dtype == "uint16":
+        value = value.astype("int32")
+    elif value.dtype == "uint32" or value.dtype == "uint64":
+        value = value.astype("int64")
+    return torch.as_tensor(value)
+
+
+class TorchIterableDataset(IterableDataset):
+    """Iterable pytorch dataset, which reads samples in chunk aligned blocks.
+    Blocks are split between DataLoader workers, so each chunk is fetched and decoded once per epoch.
+    """
+
+    def __init__(
+        self,
+        ds,
+        transform=None,
+        inplace=True,
+        output_type=dict,
+        indexes=None,
+        key_list=None,
+        shuffle=False,
+        batch_size=None,
+    ):
+        self._ds = ds
+        self._pid = os.getpid()
+        self._url = ds.url
+        self._token = ds.token
+        self._transform = transform
+        self.inplace = inplace
+        self.output_type = output_type
+        self.shuffle = shuffle
+        self.batch_size = batch_size
+        self.key_list = key_list or list(ds.keys)
+        self.key_list = [
+            key if key.startswith("/") else "/" + key for key in self.key_list
+        ]
+        for key in self.key_list:
+            if key not in ds.keys:
+                raise KeyError(key)
+        indexes = ds.indexes if indexes is None else indexes
+        self.indexes = [indexes] if isinstance(indexes, int) else list(indexes)
+        self.block_size = self.get_block_size(ds)
+
+    def get_block_size(self, ds):
+        """Number of samples in a block, a multiple of the samples per chunk of every key if not too large"""
+        samples = [ds._tensors[key].chunks[0] for key in self.key_list]
+        lcm = compute_lcm(samples)
+        return lcm if lcm <= 4 * max(samples) else max(samples)
+
+    def get_blocks(self, worker_id=0, num_workers=1, seed=None):
+        """Groups indexes by block and returns the blocks of a worker"""
+        blocks = _group_blocks(self.indexes, self.block_size)
+        if self.shuffle:
+            # All workers share the seed, so they split the same permutation
+            random.Random(seed).shuffle(blocks)
+        return blocks[worker_id::num_workers]
+
+    def _init_ds(self):
+        """Workers load the dataset independently"""
+        if self._ds is None or self._pid != os.getpid():
+            self._ds = Dataset(self._url, token=self._token, lock_cache=False)
+            self._pid = os.getpid()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_ds"] = None
+        return state
+
+    def _read_block(self, indexes):
+        return {key: self._ds._tensors[key].gather(indexes) for key in self.key_list}
+
+    def iter_batches(self, blocks):
+        """Yields dicts of columns with batch_size samples, or single samples if batch_size is None"""
+        pending = None
+        for indexes in blocks:
+            columns = self._read_block(indexes)
+            if self.batch_size is None:
+                for i in range(len(indexes)):
+                    yield {key: value[i] for key, value in columns.items()}
+                continue
+            if pending is not None:
+                columns = _concat_columns([pending, columns])
+            count = len(next(iter(columns.values())))
+            start = 0
+            while count - start >= self.batch_size:
+                stop = start + self.batch_size
+                yield {key: value[start:stop] for key, value in columns.items()}
+                start = stop
+            pending = None
+            if start < count:
+                pending = {key: value[start:] for key, value in columns.items()}
+        if pending is not None:
+            yield pending
+
+    def _to_output(self, columns):
+        d = {}
+        for key, value in columns.items():
+            split_key = key.split("/")
+            cur = d
+            for subkey in split_key[1:-1]:
+                cur = cur.setdefault(subkey, {})
+            cur[split_key[-1]] = _to_torch(value) if self.inplace else value
+        d = self._transform(d) if self._transform else d
+        if self.inplace & (self.output_type != dict) & (isinstance(d, dict)):
+            d = self.output_type(d.values())
+        return d
+
+    def __iter__(self):
+        worker_info = torch.utils.data.get_worker_info()
+        if worker_info is None:
+            blocks = self.get_blocks()
+        else:
+            blocks = self.get_blocks(
+                worker_info.id,
+                worker_info.num_workers,
+                worker_info.seed - worker_info.id,
+            )
+        self._init_ds()
+        for columns in self.iter_batches(blocks):
+            yield self._to_output(columns)
+
+
 def _from_supervisely(project, scheduler: str = "single", workers: int = 1):
     try:
         import supervisely_lib as sly
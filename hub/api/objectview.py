@@ -11,6 +11,19 @@ import collections.abc as abc
 
 
 class ObjectView:
+    __slots__ = (
+        "dataset",
+        "schema",
+        "subpath",
+        "nums",
+        "offsets",
+        "squeeze_dims",
+        "inner_schema_obj",
+        "lazy",
+        "indexes",
+        "is_contiguous",
+    )
+
     def __init__(
         self,
         dataset,
@@ -122,34 +135,19 @@ class ObjectView:
 
     def process_path(self, subpath, inner_schema_obj, nums, offsets, squeeze_dims):
         """Checks if a subpath is valid or not. Does not repeat computation done in a previous ObjectView object"""
-        paths = subpath.split("/")[1:]
-        try:
-            # If key is invalid raises KeyError
-            # If schema object is not subscriptable raises AttributeError
-            if inner_schema_obj:
-                if isinstance(inner_schema_obj, Sequence):
-                    schema_obj = inner_schema_obj.dtype.dict_[paths[0]]
-                elif isinstance(inner_schema_obj, SchemaDict):
-                    schema_obj = inner_schema_obj.dict_[paths[0]]
-                else:
-                    raise KeyError()
-            else:
-                schema_obj = self.schema[paths[0]]
-        except (KeyError, AttributeError):
-            raise KeyError(f"{paths[0]} is an invalid key")
-        self.num_process(schema_obj, nums, offsets, squeeze_dims)
-        for path in paths[1:]:
-            try:
-                if isinstance(schema_obj, Sequence):
-                    schema_obj = schema_obj.dtype.dict_[path]
-                elif isinstance(schema_obj, SchemaDict):
-                    schema_obj = schema_obj.dict_[path]
-                else:
-                    raise KeyError()
-                self.num_process(schema_obj, nums, offsets, squeeze_dims)
-            except (KeyError, AttributeError):
-                raise KeyError(f"{path} is an invalid key")
-        return schema_obj, nums, offsets, squeeze_dims
+        # subpath continues the path of inner_schema_obj, which is self.subpath
+        root = self.subpath if inner_schema_obj else ""
+        schema_paths = self.dataset._schema_paths
+        chain = schema_paths.get(root + subpath)
+        if chain is None:
+            path = root
+            for key in subpath.split("/")[1:]:
+                path += "/" + key
+                if path not in schema_paths:
+                    raise KeyError(f"{key} is an invalid key")
+        for schema_obj in chain[len(chain) - subpath.count("/") :]:
+            self.num_process(schema_obj, nums, offsets, squeeze_dims)
+        return chain[-1], nums, offsets, squeeze_dims
 
     def __getitem__(self, slice_):
         """| Gets a slice from an objectview"""
@@ -3,17 +3,30 @@ License:
 This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
-import numpy as np
 from typing import Iterable
 import hub
 import collections.abc as abc
 from hub.api.dataset_utils import get_value, slice_split, str_to_int, check_class_label
 from hub.exceptions import NoneValueException
-from hub.schema import ClassLabel, Text, SchemaDict
+from hub.schema import ClassLabel, Text
 import hub.api.objectview as objv
 
 
 class TensorView:
+    __slots__ = (
+        "dataset",
+        "subpath",
+        "lazy",
+        "slice_",
+        "nums",
+        "offsets",
+        "squeeze_dims",
+        "indexes",
+        "is_contiguous",
+        "dtype",
+        "_shape",
+    )
+
     def __init__(
         self,
         dataset=None,
@@ -69,7 +82,14 @@ class TensorView:
                 self.offsets.append(ofs)
                 self.squeeze_dims.append(False)
         self.dtype = self.dtype_from_path(subpath)
-        self.shape = self.dataset._tensors[self.subpath].get_shape(self.slice_)
+        self._shape = None
+
+    @property
+    def shape(self):
+        # Shapes of dynamic tensors are a storage read, so it is done only if asked for
+        if self._shape is None:
+            self._shape = self.dataset._tensors[self.subpath].get_shape(self.slice_)
+        return self._shape
 
     def numpy(self, label_name=False):
         """Gets the value from tensorview
@@ -81,11 +101,8 @@ class TensorView:
             instead of the label encoded integers, otherwise this parameter is ignored.
         """
         if isinstance(self.indexes, list):
-            value = np.array(
-                [
-                    self.dataset._tensors[self.subpath][[index] + self.slice_[1:]]
-                    for index in self.indexes
-                ]
+            value = self.dataset._tensors[self.subpath].gather(
+                self.indexes, self.slice_[1:]
             )
         else:
             value = self.dataset._tensors[self.subpath][self.slice_]
@@ -106,17 +123,19 @@ class TensorView:
                     ]
 
         if isinstance(self.dtype, hub.schema.text.Text):
+            # Texts of different lengths are read as a list
+            ndim = 2 if isinstance(value, list) else value.ndim
             if self.dataset.tokenizer is not None:
                 from transformers import AutoTokenizer
 
                 tokenizer = AutoTokenizer.from_pretrained("bert-base-cased")
-                if value.ndim == 1:
+                if ndim == 1:
                     return tokenizer.decode(value.tolist())
-                elif value.ndim == 2:
+                elif ndim == 2:
                     return [tokenizer.decode(val.tolist()) for val in value]
-            elif value.ndim == 1:
+            elif ndim == 1:
                 return "".join(chr(it) for it in value.tolist())
-            elif value.ndim == 2:
+            elif ndim == 2:
                 return ["".join(chr(it) for it in val.tolist()) for val in value]
             raise ValueError(f"Unexpected value with shape for text {value.shape}")
         return value
@@ -207,14 +226,7 @@ class TensorView:
             raise ValueError("Can't setitem of TensorView with subpath")
 
         assign_value = get_value(value)
-        schema_dict = self.dataset.schema
-        if subpath[1:] in schema_dict.dict_.keys():
-            schema_key = schema_dict.dict_.get(subpath[1:], None)
-        else:
-            for schema_key in subpath[1:].split("/"):
-                schema_dict = schema_dict.dict_.get(schema_key, None)
-                if not isinstance(schema_dict, SchemaDict):
-                    schema_key = schema_dict
+        schema_key = self.dtype
         if isinstance(schema_key, ClassLabel):
             assign_value = check_class_label(assign_value, schema_key)
         if isinstance(schema_key, (Text, bytes)) or (
@@ -295,13 +307,8 @@ class TensorView:
             raise IndexError("start index is greater than stop index")
 
     def dtype_from_path(self, path):
-        "Gets the dtype of the Tensorview by traversing the schema"
-        path = path.split("/")
-        cur_type = self.dataset.schema.dict_
-        for subpath in path[1:-1]:
-            cur_type = cur_type[subpath]
-            cur_type = cur_type.dict_
-        return cur_type[path[-1]]
+        "Gets the dtype of the Tensorview from the schema"
+        return self.dataset._schema_paths[path][-1]
 
     def slice_fill(self, slice_):
         "Fills the slice with zeroes for the dimensions that have single elements and squeeze_dims true"
@@ -5,9 +5,12 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 """
 
 import hub.api.tests.test_converters
+from hub.defaults import DEFAULT_PREFETCH_CHUNKS
 from hub.schema.features import Tensor
+from hub.schema import Text
 import numpy as np
 import shutil
+import random
 import os.path
 from hub.utils import (
     tfds_loaded,
@@ -17,6 +20,7 @@ from hub.utils import (
     Timer,
 )
 import pytest
+from hub.store.shared_cache import shared_memory
 
 
 @pytest.mark.skipif(not tfds_loaded(), reason="requires tfds to be loaded")
@@ -151,6 +155,45 @@ def test_to_tensorflow_key_list():
         tds = dsv.to_tensorflow(key_list=["xyz"])
 
 
+def test_decode_text():
+    from hub.api.integrations import _decode_text, _group_blocks
+
+    samples = [np.array([104, 233], "uint8"), np.array([], "uint8"), np.array([97])]
+    assert _decode_text(samples).tolist() == ["hé", "", "a"]
+    assert _decode_text(np.array([[120, 121], [0, 122]])).tolist() == ["xy", "\x00z"]
+    assert _decode_text([]).tolist() == []
+    assert _group_blocks([5, 0, 6, 9, 1], 4) == [[5, 6], [0, 1], [9]]
+
+
+@pytest.mark.skipif(not tensorflow_loaded(), reason="requires tensorflow to be loaded")
+def test_to_tensorflow_blocks():
+    schema = {
+        "image": Tensor((4, 4), "uint8", chunks=(4,)),
+        "text": Text(max_shape=(10,)),
+        "label": "int64",
+    }
+    ds = hub.Dataset("./data/test_to_tf_blocks", shape=(30,), schema=schema, mode="w")
+    for i in range(30):
+        ds["image", i] = i * np.ones((4, 4))
+        ds["text", i] = str(i)
+        ds["label", i] = i
+    tds = ds.to_tensorflow()
+    assert tds.element_spec["image"].shape == (4, 4)
+    for i, item in enumerate(tds):
+        assert (item["image"].numpy() == i).all()
+        assert item["text"].numpy().decode() == str(i)
+        assert item["label"].numpy() == i
+
+    tds = ds[3:20].to_tensorflow(shuffle_buffer=2, seed=0)
+    labels = []
+    for item in tds:
+        assert (item["image"].numpy() == item["label"].numpy()).all()
+        assert item["text"].numpy().decode() == str(item["label"].numpy())
+        labels.append(int(item["label"].numpy()))
+    assert sorted(labels) == list(range(3, 20))
+    assert labels != list(range(3, 20))
+
+
 @pytest.mark.skipif(not pytorch_loaded(), reason="requires pytorch to be loaded")
 def test_to_pytorch_key_list():
     schema = {
@@ -207,6 +250,165 @@ def test_to_pytorch_dtype_coversion():
         pass
 
 
+def test_torch_dataset_prefetch():
+    from hub.api.integrations import TorchDataset
+
+    schema = {"a": Tensor((2,), "int32", chunks=(4,)), "b": "int64"}
+    ds = hub.Dataset("./data/test_torch_dataset_prefetch", shape=(30,), schema=schema)
+    for i in range(30):
+        ds["a", i] = [i, i]
+        ds["b", i] = i
+    ds.flush()
+    tds = TorchDataset(
+        ds, inplace=False, indexes=ds.indexes, key_list=["a"], shuffle=True
+    )
+    assert sorted(tds.indexes) == list(range(30))
+    assert [item["a"][0] for item in tds] == tds.indexes
+    assert tds._reader._prefetcher.memory == 0
+
+    tds = TorchDataset(ds, inplace=False, indexes=ds.indexes)
+    for i, item in enumerate(tds):
+        assert (item["a"] == i).all() and item["b"] == i
+
+    # Like a DataLoader worker that gets every other batch of 4 samples
+    tds = TorchDataset(ds, inplace=False, indexes=ds.indexes, key_list=["a"])
+    fetched = []
+    tds._init_ds()
+    fetch = tds._reader._prefetcher._fetch
+    tds._reader._prefetcher._fetch = lambda *args: fetched.append(args) or fetch(*args)
+    for i in [0, 1, 2, 3, 8, 9, 10, 11, 16, 17, 18, 19]:
+        assert tds[i]["a"][0] == i
+    tds._reader.close()
+    # Chunks of the other worker are read ahead at most up to the default depth
+    assert len(fetched) <= 3 + DEFAULT_PREFETCH_CHUNKS
+
+
+def test_shuffle_indexes_buffer():
+    from hub.api.integrations import _shuffle_indexes
+
+    indexes = list(range(100))
+    order = _shuffle_indexes(indexes, 10, rng=random.Random(0))
+    assert sorted(order) == indexes
+    assert all(order[i] // 10 == order[i + 1] // 10 for i in range(0, 100, 10))
+
+    order = _shuffle_indexes(indexes, 10, 3, random.Random(0))
+    assert sorted(order) == indexes
+    assert order == _shuffle_indexes(indexes, 10, 3, random.Random(0))
+    assert order != _shuffle_indexes(indexes, 10, 3, random.Random(1))
+    # samples are mixed between chunks, at most 3 chunks are in the buffer at once
+    assert len({index // 10 for index in order[:10]}) > 1
+    started, drained = set(), set()
+    for i, index in enumerate(order):
+        started.add(index // 10)
+        if all(later // 10 != index // 10 for later in order[i + 1 :]):
+            drained.add(index // 10)
+        assert len(started - drained) <= 3
+
+
+def test_torch_dataset_shuffle_buffer():
+    from hub.api.integrations import TorchDataset
+
+    schema = {"a": Tensor((2,), "int32", chunks=(4,))}
+    ds = hub.Dataset("./data/test_torch_shuffle_buffer", shape=(30,), schema=schema)
+    for i in range(30):
+        ds["a", i] = [i, i]
+    ds.flush()
+    tds = TorchDataset(ds, inplace=False, indexes=ds.indexes, shuffle_buffer=2, seed=3)
+    assert sorted(tds.indexes) == list(range(30))
+    assert [item["a"][0] for item in tds] == tds.indexes
+    # every chunk is read once
+    assert len(tds._reader._prefetcher._plans["/a"]) == 8
+    order = tds.indexes
+    tds.set_epoch(1)
+    assert tds.indexes != order
+    assert [item["a"][0] for item in tds] == tds.indexes
+    tds.set_epoch(0)
+    assert tds.indexes == order
+
+
+@pytest.mark.skipif(shared_memory is None, reason="requires python 3.8 or newer")
+def test_torch_dataset_shared_cache():
+    from hub.api.integrations import TorchDataset
+    from hub.store.shared_cache import SharedChunkCache
+
+    schema = {"a": Tensor((2,), "int32", chunks=(4,))}
+    ds = hub.Dataset("./data/test_torch_shared_cache", shape=(10,), schema=schema)
+    for i in range(10):
+        ds["a", i] = [i, i]
+    ds.flush()
+    cache = SharedChunkCache(2 ** 20)
+    tds = TorchDataset(ds, inplace=False, indexes=ds.indexes, shared_cache=cache)
+    assert [item["a"][0] for item in tds] == list(range(10))
+    assert cache.size == 3 * 256 + 10 * 8
+    other = TorchDataset(ds, inplace=False, indexes=ds.indexes, shared_cache=cache)
+    other._init_ds()
+    chunk = other._reader._fetch_chunk("/a", 4, 8)
+    assert (chunk == [[i, i] for i in range(4, 8)]).all()
+    assert cache.size == 3 * 256 + 10 * 8
+    cache.close()
+
+
+def test_torch_iterable_dataset_blocks():
+    from hub.api.integrations import TorchIterableDataset
+
+    schema = {
+        "a": Tensor((2,), "int32", chunks=(4,)),
+        "b": {"c": Tensor((None,), "int32", max_shape=(8,), chunks=(8,))},
+    }
+    ds = hub.Dataset("./data/test_torch_iterable_blocks", shape=(30,), schema=schema)
+    for i in range(30):
+        ds["a", i] = [i, i]
+        ds["b/c", i] = i * np.ones(i % 3 + 1)
+    tds = TorchIterableDataset(ds, inplace=False, batch_size=5)
+    assert tds.block_size == 8
+    blocks = [list(range(i, min(i + 8, 30))) for i in range(0, 30, 8)]
+    assert tds.get_blocks() == blocks
+    assert tds.get_blocks(0, 2) == blocks[0::2]
+    assert tds.get_blocks(1, 2) == blocks[1::2]
+
+    tds.shuffle = True
+    workers = [tds.get_blocks(i, 2, seed=7) for i in range(2)]
+    assert sorted(sum(workers[0] + workers[1], [])) == list(range(30))
+    tds.shuffle = False
+
+    batches = list(tds.iter_batches(tds.get_blocks()))
+    assert [len(batch["/a"]) for batch in batches] == [5] * 6
+    assert (np.concatenate([batch["/a"] for batch in batches])[:, 0] == range(30)).all()
+    samples = [sample for batch in batches for sample in batch["/b/c"]]
+    for i, sample in enumerate(samples):
+        assert (sample == i * np.ones(i % 3 + 1)).all()
+
+    tds.batch_size = None
+    samples = list(tds.iter_batches([[3, 4]]))
+    assert (samples[1]["/a"] == [4, 4]).all()
+    assert (samples[1]["/b/c"] == [4, 4]).all()
+
+
+@pytest.mark.skipif(not pytorch_loaded(), reason="requires pytorch to be loaded")
+def test_to_pytorch_iterable():
+    import torch
+
+    schema = {"image": Tensor((4, 4), "uint16", chunks=(3,)), "label": "int64"}
+    ds = hub.Dataset(
+        "./data/test_to_pytorch_iterable", shape=(20,), schema=schema, mode="w"
+    )
+    for i in range(20):
+        ds["image", i] = i * np.ones((4, 4))
+        ds["label", i] = i
+    ds.flush()
+    tds = ds.to_pytorch(mode="iterable", batch_size=4, shuffle=True)
+    loader = torch.utils.data.DataLoader(tds, batch_size=None, num_workers=2)
+    labels = []
+    for batch in loader:
+        assert batch["image"].dtype == torch.int32
+        assert (batch["image"][:, 0, 0] == batch["label"]).all()
+        labels += batch["label"].tolist()
+    assert sorted(labels) == list(range(20))
+
+    with pytest.raises(ValueError):
+        ds.to_pytorch(batch_size=4)
+
+
 @pytest.mark.skipif(not tensorflow_loaded(), reason="requires tensorflow to be loaded")
 def test_to_from_tensorflow():
     my_schema = {
@@ -8,6 +8,7 @@ import pickle
 import shutil
 
 import hub.api.dataset as dataset
+from hub.api.datasetview import DatasetView
 from hub.cli.auth import login_fn
 from hub.exceptions import DirectoryNotEmptyException, ClassLabelValueError
 import numpy as np
@@ -1335,6 +1336,44 @@ def test_dataset_schema_bug():
     ds2 = Dataset("./data/schema_bug_2", schema=schema, shape=(100,))
 
 
+def test_dataset_chunk_layout():
+    schema = {
+        "image": Image((None, None, 3), max_shape=(5000, 5000, 3)),
+        "rows": Image(
+            (None, None, 3), max_shape=(5000, 5000, 3), chunk_layout="sample"
+        ),
+    }
+    ds = Dataset("./data/test/chunk_layout", schema=schema, shape=(2,), mode="w")
+    assert ds._tensors["/image"].chunks == (1, 2048, 2048, 3)
+    assert ds._tensors["/rows"].chunks == (1, 1119, 5000, 3)
+    ds["image", 0] = np.ones((3000, 3000, 3), dtype="uint8")
+    assert ds["image", 0, 2000:2100, 0:10].compute().shape == (100, 10, 3)
+    ds.flush()
+    ds = Dataset("./data/test/chunk_layout")
+    assert ds.schema.dict_["image"].chunk_layout == "auto"
+    assert ds.schema.dict_["rows"].chunk_layout == "sample"
+
+
+def test_dataset_numpy_columnar():
+    schema = {
+        "image": Tensor((None, 2), "int32", max_shape=(4, 2)),
+        "label": ClassLabel(names=["cat", "dog"]),
+        "meta": {"text": Text((None,), max_shape=(10,))},
+    }
+    ds = Dataset("./data/test/numpy_columnar", schema=schema, shape=(5,), mode="w")
+    ds["image", 1] = np.ones((3, 2))
+    ds["label", 2] = 1
+    ds["meta/text", 1] = "hello"
+    batch = ds.numpy(columnar=True, label_name=True)
+    assert [image.shape for image in batch["image"]] == [(0, 2), (3, 2)] + [(0, 2)] * 3
+    assert batch["label"] == ["cat", "cat", "dog", "cat", "cat"]
+    assert batch["meta"]["text"] == ["", "hello", "", "", ""]
+    batch = DatasetView(dataset=ds, indexes=[2, 1]).compute(columnar=True)
+    assert batch["label"].tolist() == [1, 0]
+    assert batch["meta"]["text"] == ["", "hello"]
+    assert ds[1:3].numpy(columnar=True)["image"][0].tolist() == [[1, 1]] * 3
+
+
 def test_dataset_google():
     ds = Dataset("google/bike")
     assert ds["image_channels", 0].compute() == 3
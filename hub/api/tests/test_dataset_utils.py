@@ -1,9 +1,11 @@
 import pytest
-from hub.api.dataset_utils import _get_compressor
+from hub.api.dataset_utils import _get_compressor, _get_schema_paths
 import numcodecs
 import numcodecs.lz4
 import numcodecs.zstd
 from hub.numcodecs import PngCodec
+from hub.schema import ClassLabel, Sequence, Tensor
+from hub.schema.features import featurify
 
 
 def test_get_compression():
@@ -14,3 +16,13 @@ def test_get_compression():
     assert _get_compressor("png") == PngCodec(solo_channel=True)
     with pytest.raises(ValueError):
         _get_compressor("abcd")
+
+
+def test_get_schema_paths():
+    label = ClassLabel(num_classes=2)
+    seq = Sequence((None,), dtype={"x": "int32"}, max_shape=(5,))
+    schema = featurify({"a": {"b": label, "c": Tensor((2,))}, "seq": seq})
+    paths = _get_schema_paths(schema)
+    assert sorted(paths) == ["/a", "/a/b", "/a/c", "/seq", "/seq/x"]
+    assert paths["/a/b"] == (schema.dict_["a"], label)
+    assert paths["/seq/x"][0] is seq
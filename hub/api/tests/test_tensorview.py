@@ -5,9 +5,9 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 """
 
 from hub import Dataset
-from hub.api.datasetview import TensorView
+from hub.api.datasetview import DatasetView, TensorView
 from hub.exceptions import NoneValueException
-from hub.schema import Tensor, ClassLabel
+from hub.schema import Tensor, ClassLabel, Text
 
 import numpy as np
 import pytest
@@ -133,6 +133,70 @@ def test_check_label_name():
     )
 
 
+def test_tensorview_gather(monkeypatch):
+    schema = {
+        "image": Tensor((16, 16), "int32", chunks=1000),
+        "mask": Tensor((None, 8), "uint8", max_shape=(8, 8)),
+        "text": Text((None,), max_shape=(10,)),
+    }
+    ds = Dataset("./data/test/gather", shape=(2000,), mode="w", schema=schema)
+    images = np.arange(2000 * 256, dtype="int32").reshape(2000, 16, 16)
+    ds["image", :] = images
+    ds["mask", 3] = np.ones((2, 8))
+    ds["mask", 7] = np.ones((5, 8))
+    ds["text", 3] = "abc"
+    ds["text", 7] = "hello"
+    fs_map = ds._tensors["/image"].fs_map
+    fetched = []
+    getitems = fs_map.getitems
+
+    def counting_getitems(keys, on_error="omit"):
+        fetched.extend(keys)
+        return getitems(keys, on_error=on_error)
+
+    monkeypatch.setattr(fs_map, "getitems", counting_getitems)
+    indexes = [3, 7, 9, 1000, 1002]
+    view = DatasetView(dataset=ds, indexes=indexes)
+    assert (view["image"].compute() == images[indexes]).all()
+    # Each chunk is fetched once
+    assert sorted(fetched) == ["0.0.0", "1.0.0"]
+    expected = images[[7, 9, 1000], 2, 3:5]
+    assert (view["image", 1:4, 2, 3:5].compute() == expected).all()
+    view = DatasetView(dataset=ds, indexes=[7, 3, 0])
+    masks = view["mask"].compute()
+    assert [mask.shape for mask in masks] == [(5, 8), (2, 8), (0, 8)]
+    assert view["mask", 0:2, 1:2].compute().tolist() == [[[1] * 8]] * 2
+    assert view["text"].compute() == ["hello", "abc", ""]
+
+
+def test_tensorview_lazy_shape(monkeypatch):
+    tensor = ds._tensors["/image"]
+    calls = []
+    get_shape = tensor.get_shape
+
+    def counting_get_shape(slice_):
+        calls.append(slice_)
+        return get_shape(slice_)
+
+    monkeypatch.setattr(tensor, "get_shape", counting_get_shape)
+    for sample in ds[0:3]:
+        assert sample["label"].compute() in (0, 1, 2)
+        sample["image"]
+    assert calls == []
+    tv = ds["image", 1]
+    assert tv.shape.tolist() == [0, 0, 0, 0]
+    assert tv.shape.tolist() == [0, 0, 0, 0]
+    assert len(calls) == 1
+    with pytest.raises(AttributeError):
+        tv.foo = 1
+
+
+def test_tensorview_setitem_class_label():
+    ds2["label"][3] = "green"
+    ds2["label", 4:5][0] = "blue"
+    assert ds2["label", 3:5].compute(label_name=True) == ["green", "blue"]
+
+
 if __name__ == "__main__":
     test_tensorview_init()
     test_tensorview_getitem()
@@ -140,3 +204,4 @@ if __name__ == "__main__":
     test_check_slice_bound()
     test_tensorview_str()
     test_tensorview_repr()
+    test_tensorview_setitem_class_label()
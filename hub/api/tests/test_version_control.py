@@ -3,7 +3,7 @@ from hub.exceptions import (
     ReadModeException,
     VersioningNotSupportedException,
 )
-from hub.schema import Image
+from hub.schema import Image, Tensor
 import hub
 import numpy as np
 import pytest
@@ -238,6 +238,98 @@ def test_dynamic_version_control():
         assert (ds["img", i].compute() == 2 * i * np.ones((150, 150, 3))).all()
 
 
+def test_deep_history():
+    my_schema = {"abc": "uint32"}
+    ds = hub.Dataset(
+        "./data/test_versioning/deep", shape=(10,), schema=my_schema, mode="w"
+    )
+    ds["abc", 0] = 1
+    ds["abc", 5] = 1
+    first = ds.commit("first")
+    commits = []
+    for i in range(100):
+        ds["abc", 0] = i + 2
+        commits.append(ds.commit(str(i)))
+    assert ds["abc", 0].compute() == 101
+    assert ds["abc", 5].compute() == 1
+    ds.checkout(commits[49])
+    assert ds["abc", 0].compute() == 51
+    ds.checkout(first)
+    assert ds["abc", 0].compute() == 1
+    ds.checkout("master")
+    assert ds["abc", 0].compute() == 101
+    ds["abc", 5] = 7
+    ds.commit("last")
+    assert ds["abc", 5].compute() == 7
+    ds.checkout(commits[0])
+    assert ds["abc", 5].compute() == 1
+
+
+def test_branch_shares_chunks():
+    my_schema = {"abc": "uint32"}
+    ds = hub.Dataset(
+        "./data/test_versioning/branch_cow", shape=(10,), schema=my_schema, mode="w"
+    )
+    ds["abc", 0] = 1
+    ds.checkout("alt", create=True)
+    # New branch refers to the chunk of master instead of copying it
+    master_commit_id = ds._branch_node_map["master"].commit_id
+    assert ds._tensors["/abc"].fs_map.find_chunk("0") == f"0:{master_commit_id}"
+    assert ds["abc", 0].compute() == 1
+    ds["abc", 0] = 2
+    ds.checkout("master")
+    assert ds["abc", 0].compute() == 1
+    ds.checkout("other", create=True)
+    ds.checkout("master")
+    ds["abc", 0] = 3
+    ds.checkout("other")
+    assert ds["abc", 0].compute() == 1
+    ds.checkout("alt")
+    assert ds["abc", 0].compute() == 2
+    ds.checkout("master")
+    assert ds["abc", 0].compute() == 3
+
+
+def test_vacuum():
+    schema = {"x": Tensor((None,), "int32", max_shape=(100,), chunks=(1, 10))}
+    ds = hub.Dataset(
+        "./data/test_versioning/vacuum", shape=(3,), schema=schema, mode="w"
+    )
+    ds["x", 0:2] = [np.ones(5), np.ones(45)]
+    a = ds.commit("first")
+    ds["x", 0:2] = [np.ones(45) * 2, np.ones(5) * 2]
+    # Padding of the smaller sample written in the first commit is shared, it stays
+    assert ds.vacuum() == 4
+    assert ds["x", 1].compute().tolist() == [2] * 5
+    ds.checkout(a)
+    assert ds["x", 0].compute().tolist() == [1] * 5
+    assert ds["x", 1].compute().tolist() == [1] * 45
+    assert ds.vacuum() == 0
+
+
+def test_shrink_regrow_branch():
+    schema = {"abc": Tensor((), "int32", chunks=(2,))}
+    ds = hub.Dataset(
+        "./data/test_versioning/shrink_regrow", shape=(8,), schema=schema, mode="w"
+    )
+    ds["abc", 0:8] = np.arange(1, 9)
+    a = ds.commit("first")
+    ds.checkout("alt", create=True)
+    ds.resize_shape(2)
+    ds.resize_shape(8)
+    # Chunks dropped on the branch are not resolved to the copy of master anymore
+    assert ds["abc", 0:8].compute().tolist() == [1, 2, 0, 0, 0, 0, 0, 0]
+    ds["abc", 3] = 10
+    assert ds["abc", 2:4].compute().tolist() == [0, 10]
+    b = ds.commit("second")
+    ds.checkout("newer", create=True)
+    assert ds["abc", 0:8].compute().tolist() == [1, 2, 0, 10, 0, 0, 0, 0]
+    ds.checkout(a)
+    assert ds["abc", 0:8].compute().tolist() == list(range(1, 9))
+    ds.checkout(b)
+    assert ds["abc", 0:8].compute().tolist() == [1, 2, 0, 10, 0, 0, 0, 0]
+
+
 if __name__ == "__main__":
     test_commit()
     test_commit_checkout()
@@ -246,3 +338,7 @@ if __name__ == "__main__":
     test_read_mode()
     test_old_datasets()
     test_checkout_address_not_found()
+    test_deep_history()
+    test_branch_shares_chunks()
+    test_vacuum()
+    test_shrink_regrow_branch()
@@ -25,6 +25,15 @@ class VersionNode:
         self.commit_user_name = "None" if user_name == "public" else user_name
         self.commit_time = datetime.now()
 
+    def ancestry(self) -> dict:
+        """Returns {commit_id: distance} for this node and all of its ancestors"""
+        ancestry = {}
+        node = self
+        while node is not None:
+            ancestry[node.commit_id] = len(ancestry)
+            node = node.parent
+        return ancestry
+
     def __repr__(self) -> str:
         return f'commit {self.commit_id} ({self.branch}) \nAuthor: {self.commit_user_name}\nCommit Time:  {str(self.commit_time)[:-7]}\nMessage: "{self.message}"'
 
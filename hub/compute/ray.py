@@ -253,9 +253,8 @@ class RayTransform(Transform):
 
         for key, value in shapes.items():
             ds._tensors[f"/{key}"].enable_dynamicness()
-
-            for (slice_, shape) in shapes[key]:
-                ds._tensors[f"/{key}"].set_dynamic_shape(slice_, shape)
+            slices, key_shapes = zip(*value)
+            ds._tensors[f"/{key}"].set_dynamic_shapes(slices, key_shapes)
 
 
 class TransformShard:
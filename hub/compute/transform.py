@@ -17,7 +17,7 @@ import collections.abc as abc
 from hub.api.datasetview import DatasetView
 from pathos.pools import ProcessPool, ThreadPool
 from hub.schema.sequence import Sequence
-from hub.schema.features import featurify
+from hub.schema.features import featurify, SchemaDict
 import os
 from hub.defaults import OBJECT_CHUNK
 
@@ -143,15 +143,17 @@ class Transform:
         Parameters
         ----------
         d: dict
+        schema: dict
+            Schema of the level of d, walked down together with d
         """
         items = []
         for k, v in d.items():
             new_key = parent_key + "/" + k if parent_key else k
-            if isinstance(v, MutableMapping) and not isinstance(
-                self.dtype_from_path(new_key, schema), Sequence
-            ):
+            if isinstance(v, MutableMapping) and not isinstance(schema[k], Sequence):
+                inner = schema[k]
+                inner = inner.dict_ if isinstance(inner, SchemaDict) else inner
                 items.extend(
-                    self._flatten_dict(v, parent_key=new_key, schema=schema).items()
+                    self._flatten_dict(v, parent_key=new_key, schema=inner).items()
                 )
             else:
                 items.append((new_key, v))
@@ -1,4 +1,7 @@
 CHUNK_DEFAULT_SIZE = 2 ** 24
+# Target size of compressed chunks picked by adaptive chunking
+STORED_CHUNK_SIZE = 2 ** 24
+MAX_RAW_CHUNK_SIZE = 2 ** 25
 OBJECT_CHUNK = 128
 DEFAULT_COMPRESSOR = "default"
 DEFAULT_MEMORY_CACHE_SIZE = 2 ** 26
@@ -7,3 +10,7 @@ AZURE_HOST_SUFFIX = "blob.core.windows.net"
 META_FILE = "meta.json"
 VERSION_INFO = "version.pkl"
 CRED_EXPIRATION = 36000  # in seconds
+DEFAULT_PARALLEL_REQUESTS = 25
+DEFAULT_PREFETCH_CHUNKS = 2  # chunks per tensor read ahead by framework integrations
+DEFAULT_PREFETCH_MEMORY = 2 ** 28
+RAGGED_CHUNK_SIZE = 2 ** 24
@@ -74,6 +74,7 @@ class Audio(Tensor):
         max_shape: Tuple[int, ...] = None,
         chunks=None,
         compressor="lz4",
+        ragged: bool = False,
     ):
         """Constructs the connector.
 
@@ -109,6 +110,7 @@ class Audio(Tensor):
             max_shape=max_shape,
             chunks=chunks,
             compressor=compressor,
+            ragged=ragged,
         )
 
     def __str__(self):
@@ -32,6 +32,7 @@ def deserialize(inp):
                 max_shape=tuple(inp["max_shape"]),
                 chunks=inp["chunks"],
                 compressor=_get_compressor(inp),
+                ragged=inp.get("ragged", False),
             )
         elif inp["type"] == "BBox":
             return BBox(
@@ -72,6 +73,7 @@ def deserialize(inp):
                 max_shape=tuple(inp["max_shape"]),
                 chunks=inp["chunks"],
                 compressor=_get_compressor(inp),
+                chunk_layout=inp.get("chunk_layout", "auto"),
             )
         elif inp["type"] == "Mask":
             return Mask(
@@ -79,6 +81,7 @@ def deserialize(inp):
                 max_shape=tuple(inp["max_shape"]),
                 chunks=inp["chunks"],
                 compressor=_get_compressor(inp),
+                chunk_layout=inp.get("chunk_layout", "auto"),
             )
         elif inp["type"] == "Polygon":
             return Polygon(
@@ -129,6 +132,8 @@ def deserialize(inp):
                 max_shape=tuple(inp["max_shape"]),
                 chunks=inp["chunks"],
                 compressor=_get_compressor(inp),
+                ragged=inp.get("ragged", False),
+                chunk_layout=inp.get("chunk_layout", "auto"),
             )
         elif inp["type"] == "Text":
             return Text(
@@ -145,6 +150,8 @@ def deserialize(inp):
                 max_shape=tuple(inp["max_shape"]),
                 chunks=inp["chunks"],
                 compressor=_get_compressor(inp),
+                ragged=inp.get("ragged", False),
+                chunk_layout=inp.get("chunk_layout", "auto"),
             )
     else:
         return inp
@@ -128,6 +128,8 @@ class Tensor(HubSchema):
         max_shape: Shape = None,
         chunks=None,
         compressor="lz4",
+        ragged: bool = False,
+        chunk_layout: str = "auto",
     ):
         """
         Parameters
@@ -144,6 +146,14 @@ class Tensor(HubSchema):
             It is anticipated that each file should be ~16MB.
             Sample Count is also in the list of tensor's dimensions (first dimension)
             If default value is chosen, automatically detects how to split into chunks
+        ragged : bool
+            Stores samples without padding them to max_shape, packed one after another into chunks.
+            Useful for dynamic shapes where samples are much smaller than max_shape.
+        chunk_layout : str
+            How samples are split into chunks if chunks are not given.
+            "sample" keeps whole samples (or their rows) in a chunk, "tile" splits large samples into
+            tiles along all dimensions, so that crops read only the tiles they touch.
+            "auto" (default) tiles samples of 2 and more dimensions that don't fit into a chunk.
         """
         if shape is None:
             raise TypeError("shape cannot be None")
@@ -176,6 +186,10 @@ class Tensor(HubSchema):
             if dim is not None and dim != max_dim:
                 raise ValueError(f"shape and max_shape mismatch, {dim} != {max_dim}")
 
+        if chunk_layout not in ("sample", "tile", "auto"):
+            raise ValueError(
+                f"chunk_layout should be 'sample', 'tile' or 'auto', got {chunk_layout}"
+            )
         chunks = _normalize_chunks(chunks)
 
         # TODO add errors if shape and max_shape have wrong values
@@ -184,6 +198,8 @@ class Tensor(HubSchema):
         self.max_shape = max_shape
         self.chunks = chunks
         self.compressor = compressor
+        self.ragged = ragged
+        self.chunk_layout = chunk_layout
 
     def _flatten(self):
         for item in self.dtype._flatten():
@@ -203,6 +219,12 @@ class Tensor(HubSchema):
             else out
         )
         out = out + ", chunks=" + str(self.chunks) if self.chunks is not None else out
+        out = out + ", ragged=True" if self.ragged else out
+        out = (
+            out + ", chunk_layout=" + self.chunk_layout
+            if self.chunk_layout != "auto"
+            else out
+        )
         out += ")"
         return out
 
@@ -65,6 +65,7 @@ class Image(Tensor):
         max_shape: Tuple[int, ...] = None,
         chunks=None,
         compressor="lz4",
+        chunk_layout: str = "auto",
     ):
         """| Construct the connector.
 
@@ -85,7 +86,8 @@ class Image(Tensor):
             It is anticipated that each file should be ~16MB.
             Sample Count is also in the list of tensor's dimensions (first dimension)
             If default value is chosen, automatically detects how to split into chunks
-
+        chunk_layout : str
+            "sample", "tile" or "auto" (default), see `Tensor`
 
         Returns
         ----------
@@ -104,6 +106,7 @@ class Image(Tensor):
             max_shape=max_shape,
             chunks=chunks,
             compressor=compressor,
+            chunk_layout=chunk_layout,
         )
 
     def _set_dtype(self, dtype):
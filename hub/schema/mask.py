@@ -24,6 +24,7 @@ class Mask(Tensor):
         max_shape: Tuple[int, ...] = None,
         chunks=None,
         compressor="lz4",
+        chunk_layout: str = "auto",
     ):
         """Constructs a Mask HubSchema.
 
@@ -40,6 +41,8 @@ class Mask(Tensor):
             It is anticipated that each file should be ~16MB.
             Sample Count is also in the list of tensor's dimensions (first dimension)
             If default value is chosen, automatically detects how to split into chunks
+        chunk_layout : str
+            "sample", "tile" or "auto" (default), see `Tensor`
 
         """
         super().__init__(
@@ -48,6 +51,7 @@ class Mask(Tensor):
             max_shape=max_shape,
             chunks=chunks,
             compressor=compressor,
+            chunk_layout=chunk_layout,
         )
 
     def __str__(self):
@@ -92,6 +92,13 @@ def test_tensor_repr():
     assert tensor_object_2.__repr__() == "Tensor(shape=(5000,), dtype='<U20')"
 
 
+def test_tensor_chunk_layout():
+    with pytest.raises(ValueError):
+        Tensor((10, 10), chunk_layout="rows")
+    tensor = Tensor((10, 10), chunk_layout="tile")
+    assert str(tensor) == "Tensor(shape=(10, 10), dtype='float64', chunk_layout=tile)"
+
+
 if __name__ == "__main__":
     test_tensor_flattening()
     test_primitive_str()
@@ -100,3 +107,4 @@ if __name__ == "__main__":
     test_tensor_str()
     test_tensor_repr()
     test_tensor_error_2()
+    test_tensor_chunk_layout()
@@ -30,6 +30,8 @@ class Video(Tensor):
         # ffmpeg_extra_args=(),
         chunks=None,
         compressor="lz4",
+        ragged: bool = False,
+        chunk_layout: str = "auto",
     ):
         """Initializes the connector.
 
@@ -43,6 +45,8 @@ class Video(Tensor):
             The video is stored as a sequence of encoded images.
             You can use any encoding format supported by Image.
         dtype: `uint16` or `uint8` (default)
+        chunk_layout : str
+            "sample", "tile" or "auto" (default), see `Tensor`
 
         Raises
         ----------
@@ -54,6 +58,8 @@ class Video(Tensor):
             max_shape=max_shape,
             chunks=chunks,
             compressor=compressor,
+            ragged=ragged,
+            chunk_layout=chunk_layout,
         )
 
     def __str__(self):
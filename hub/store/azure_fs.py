@@ -7,8 +7,11 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 from fsspec import AbstractFileSystem
 import array
 from collections.abc import MutableMapping
+import time
 from azure.storage.blob import BlobServiceClient
 
+from hub.store.parallel import fetch_items, store_items
+
 
 class AzureBlobFileSystem(AbstractFileSystem):
     def __init__(
@@ -125,21 +128,41 @@ class AzureBlobFileSystem(AbstractFileSystem):
         """
         return True
 
-    def find(self, path):
+    def find(self, path, detail=False):
         """
         Finds all the files in the given path in the File System
 
         Returns
         -------
-        List of full paths of all files found in given path
+        List of full paths of all files found in given path,
+        dict of {path: info} with size of each file if detail is True
         """
         split_path = path.split("/")
         container_name = split_path[0]
         sub_path = "/".join(split_path[1:])
         container = self.service_client.get_container_client(container_name)
         it = container.list_blobs(name_starts_with=sub_path)
+        if detail:
+            return {
+                f"{container_name}/{item['name']}": {
+                    "name": f"{container_name}/{item['name']}",
+                    "size": item["size"],
+                    "type": "file",
+                }
+                for item in it
+            }
         return [f"{container_name}/{item['name']}" for item in it]
 
+    def iter_find(self, path, page_size=1000):
+        """Yields full paths of all files in the given path, listing page_size of them at a time"""
+        split_path = path.split("/")
+        container_name = split_path[0]
+        sub_path = "/".join(split_path[1:])
+        container = self.service_client.get_container_client(container_name)
+        it = container.list_blobs(name_starts_with=sub_path, results_per_page=page_size)
+        for item in it:
+            yield f"{container_name}/{item['name']}"
+
     def rm(self, path, recursive=False, maxdepth=None):
         """Removes all the files in the given path"""
         split_path = path.split("/")
@@ -177,6 +200,26 @@ class AzureBlobFileSystem(AbstractFileSystem):
         blob_client = self.service_client.get_blob_client(container_name, sub_path)
         return blob_client.download_blob().readall()
 
+    def cp_file(self, path1, path2, poll_interval=0.5):
+        """Copies blob path1 to path2 on the server, both have to be in this account"""
+        split_path = path1.split("/")
+        source = self.service_client.get_blob_client(
+            split_path[0], "/".join(split_path[1:])
+        )
+        split_path = path2.split("/")
+        blob_client = self.service_client.get_blob_client(
+            split_path[0], "/".join(split_path[1:])
+        )
+        blob_client.start_copy_from_url(source.url)
+        # Copy finishes asynchronously on the server
+        while True:
+            status = blob_client.get_blob_properties().copy.status
+            if status != "pending":
+                break
+            time.sleep(poll_interval)
+        if status != "success":
+            raise IOError(f"Copying {path1} to {path2} failed with status {status}")
+
     def cat_file(self, path):
         return self.download(path)
 
@@ -236,10 +279,22 @@ class FSMap(MutableMapping):
             value = bytearray(value)
         self.fs.upload(key, value)
 
+    def getitems(self, keys, on_error="omit"):
+        """Retrieve many items concurrently"""
+        return fetch_items(self, keys, on_error=on_error)
+
+    def setitems(self, mapping):
+        """Store many items concurrently"""
+        store_items(self, mapping)
+
     def __iter__(self):
         """iterating over the structure"""
         return (self._str_to_key(x) for x in self.fs.find(self.root))
 
+    def iter_keys(self, page_size=1000):
+        """Yields keys without listing the whole structure first"""
+        return (self._str_to_key(x) for x in self.fs.iter_find(self.root, page_size))
+
     def __len__(self):
         """returns length of the structure"""
         return len(self.fs.find(self.root))
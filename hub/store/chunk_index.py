@@ -0,0 +1,261 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from collections.abc import MutableMapping
+import io
+import json
+import threading
+
+import numpy as np
+
+INDEX_FOLDER = "--version-index--"
+# Once this many deltas pile up they are merged into a new base on flush
+MAX_DELTAS = 64
+# Indexes are loaded on first access, possibly from several reader threads at once
+_load_lock = threading.Lock()
+# Owner of a chunk deleted by a commit, ancestors of the commit may still have it
+TOMBSTONE = "-"
+
+
+def _entry(commit_id: str, owner: str = None) -> str:
+    """Entry of a commit that shares the chunk stored by owner commit is "commit_id@owner" """
+    if owner is None or owner == commit_id:
+        return commit_id
+    return f"{commit_id}@{owner}"
+
+
+def _parse_entry(entry: str):
+    """Returns commit id and id of the commit the chunk is physically stored under"""
+    commit_id, _, owner = entry.partition("@")
+    return commit_id, owner or commit_id
+
+
+def _base_key(seq: int) -> str:
+    return f"{INDEX_FOLDER}/base.{seq}"
+
+
+def _delta_key(base_seq: int, seq: int) -> str:
+    return f"{INDEX_FOLDER}/delta.{base_seq}.{seq}"
+
+
+class ChunkCommitIndex:
+    """Maps chunk keys of a single tensor to the ids of the commits that have their own copy of the chunk
+
+    A commit can share the copy stored by another commit instead of having a physical one,
+    such chunks are copied to the commit only when the owner is about to overwrite them.
+    A commit that deleted a chunk of its ancestors has it with TOMBSTONE as the owner.
+
+    On storage the index is a base and a list of deltas.
+    The base holds sorted chunk keys and a bitmap of commits per chunk.
+    Each flush appends one delta with only the changes made since the previous flush,
+    every MAX_DELTAS deltas they are merged into a new base.
+    Nothing is read from storage until the index is accessed for the first time.
+    """
+
+    def __init__(self, storage: MutableMapping, base=0, deltas=0):
+        """
+        Parameters
+        ----------
+        storage: MutableMapping
+            Storage of the tensor, index is kept under the INDEX_FOLDER prefix
+        base: int
+            Sequence number of the current base, 0 if no base was written yet
+        deltas: int
+            Number of deltas written on top of the base
+        """
+        self._storage = storage
+        self._base_seq = base
+        self._delta_count = deltas
+        self._loaded = False
+        self._commits = []
+        self._keys = np.array([], dtype=str)
+        self._bitmaps = np.zeros((0, 0), dtype="uint8")
+        self._overlay = {}
+        self._log = []
+        self._stale = []
+
+    @classmethod
+    def from_sets(cls, storage: MutableMapping, chunk_commits: dict):
+        """Creates index from a {chunk_key: set of commit ids} dict used by older versions of hub
+        Whole index gets written as a new base on the next flush
+        """
+        index = cls(storage)
+        index._loaded = True
+        index._overlay = {k: set(v) for k, v in chunk_commits.items() if v}
+        index._log = [("+", k, c) for k, v in index._overlay.items() for c in v]
+        return index
+
+    @property
+    def state(self) -> dict:
+        """Arguments needed to open the index again from storage"""
+        return {"base": self._base_seq, "deltas": self._delta_count}
+
+    def _load(self):
+        if self._loaded:
+            return
+        with _load_lock:
+            if not self._loaded:
+                self._load_storage()
+                self._loaded = True
+
+    def _load_storage(self):
+        if self._base_seq:
+            self._load_base(self._storage[_base_key(self._base_seq)])
+        for seq in range(1, self._delta_count + 1):
+            delta = json.loads(
+                bytes(self._storage[_delta_key(self._base_seq, seq)]).decode("utf-8")
+            )
+            for op, chunk_key, commit_id in delta:
+                commits = set(self._get(chunk_key))
+                if op == "+":
+                    commits.add(commit_id)
+                else:
+                    commits.discard(commit_id)
+                self._overlay[chunk_key] = commits
+
+    def _load_base(self, data):
+        arrays = np.load(io.BytesIO(bytes(data)), allow_pickle=False)
+        self._keys = arrays["keys"]
+        self._bitmaps = arrays["bitmaps"]
+        self._commits = arrays["commits"].tolist()
+
+    def _get(self, chunk_key: str):
+        commits = self._overlay.get(chunk_key)
+        if commits is not None:
+            return commits
+        i = np.searchsorted(self._keys, chunk_key)
+        if i < len(self._keys) and self._keys[i] == chunk_key:
+            bits = np.unpackbits(self._bitmaps[i])[: len(self._commits)]
+            return {self._commits[j] for j in np.flatnonzero(bits)}
+        return set()
+
+    def commits(self, chunk_key: str) -> dict:
+        """Returns {commit_id: owner} for commits that have their own copy of the chunk,
+        owner is the id of the commit the chunk is physically stored under
+        """
+        self._load()
+        return dict(_parse_entry(entry) for entry in self._get(chunk_key))
+
+    def _replace(self, chunk_key: str, commit_id: str, entry: str = None):
+        entries = self._get(chunk_key)
+        old = {e for e in entries if _parse_entry(e)[0] == commit_id}
+        if entry is None and not old:
+            raise KeyError(chunk_key)
+        if entry is not None and old == {entry}:
+            return
+        new = entries - old
+        self._log += [("-", chunk_key, e) for e in sorted(old)]
+        if entry is not None:
+            new.add(entry)
+            self._log.append(("+", chunk_key, entry))
+        self._overlay[chunk_key] = new
+
+    def add(self, chunk_key: str, commit_id: str, owner: str = None):
+        """Records that commit has the chunk, stored under owner commit if given"""
+        self._load()
+        self._replace(chunk_key, commit_id, _entry(commit_id, owner))
+
+    def remove(self, chunk_key: str, commit_id: str):
+        """Raises KeyError if the commit doesn't have its own copy of the chunk"""
+        self._load()
+        self._replace(chunk_key, commit_id)
+
+    def borrowers(self, chunk_key: str, owner: str) -> list:
+        """Returns ids of the other commits sharing the chunk stored under owner commit"""
+        return [
+            commit_id
+            for commit_id, stored_under in self.commits(chunk_key).items()
+            if stored_under == owner and commit_id != owner
+        ]
+
+    def chunks(self, commit_id: str) -> list:
+        """Returns all chunk keys that commit has its own copy of"""
+        self._load()
+        result = set()
+        columns = [
+            j
+            for j, entry in enumerate(self._commits)
+            if _parse_entry(entry)[0] == commit_id
+        ]
+        if columns and len(self._keys):
+            present = np.zeros(len(self._keys), dtype=bool)
+            for j in columns:
+                present |= (self._bitmaps[:, j // 8] & (0x80 >> (j % 8))) != 0
+            result.update(self._keys[present].tolist())
+        for chunk_key, entries in self._overlay.items():
+            if any(_parse_entry(e)[0] == commit_id for e in entries):
+                result.add(chunk_key)
+            else:
+                result.discard(chunk_key)
+        return sorted(result)
+
+    def link(self, from_commit_id: str, to_commit_id: str):
+        """Makes to_commit share all chunks of from_commit without copying them"""
+        for chunk_key in self.chunks(from_commit_id):
+            owner = self.commits(chunk_key)[from_commit_id]
+            self.add(chunk_key, to_commit_id, owner)
+
+    def _dump_base(self) -> bytes:
+        positions = {c: j for j, c in enumerate(self._commits)}
+        commits = list(self._commits)
+        for v in self._overlay.values():
+            for c in v:
+                if c not in positions:
+                    positions[c] = len(commits)
+                    commits.append(c)
+        overlay_keys = np.array(sorted(self._overlay), dtype=str)
+        keys = np.union1d(self._keys, overlay_keys)
+        bits = np.zeros((len(keys), len(commits)), dtype=bool)
+        if len(self._keys):
+            base_bits = np.unpackbits(self._bitmaps, axis=1)[:, : len(self._commits)]
+            bits[np.searchsorted(keys, self._keys), : len(self._commits)] = base_bits
+        rows = np.searchsorted(keys, overlay_keys)
+        bits[rows] = False
+        for i, chunk_key in zip(rows.tolist(), overlay_keys.tolist()):
+            for commit_id in self._overlay[chunk_key]:
+                bits[i, positions[commit_id]] = True
+        # Chunks no commit refers to anymore are dropped from the base
+        used = bits.any(axis=1)
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            keys=keys[used],
+            bitmaps=np.packbits(bits[used], axis=1),
+            commits=np.array(commits, dtype=str),
+        )
+        return buffer.getvalue()
+
+    def flush(self) -> dict:
+        """Writes changes made since the last flush and returns the new state"""
+        if not self._log:
+            return self.state
+        # Files replaced by the previous merge are not referenced by the stored state anymore
+        for key in self._stale:
+            try:
+                del self._storage[key]
+            except KeyError:
+                pass
+        self._stale = []
+        if self._delta_count + 1 > MAX_DELTAS or not self._base_seq:
+            data = self._dump_base()
+            if self._base_seq:
+                self._stale.append(_base_key(self._base_seq))
+            self._stale += [
+                _delta_key(self._base_seq, seq)
+                for seq in range(1, self._delta_count + 1)
+            ]
+            self._base_seq += 1
+            self._storage[_base_key(self._base_seq)] = data
+            self._delta_count = 0
+            self._load_base(data)
+            self._overlay = {}
+        else:
+            self._delta_count += 1
+            self._storage[_delta_key(self._base_seq, self._delta_count)] = bytes(
+                json.dumps(self._log), "utf-8"
+            )
+        self._log = []
+        return self.state
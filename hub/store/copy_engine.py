@@ -0,0 +1,115 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import posixpath
+import time
+
+from fsspec.spec import AbstractFileSystem
+
+from hub import defaults
+from hub.defaults import DEFAULT_PARALLEL_REQUESTS
+from hub.exceptions import DirectoryNotEmptyException
+from hub.log import logger
+from hub.store.parallel import thread_map
+from hub.store.store import _is_local
+
+# Copied after everything else, so an interrupted copy is never opened as a complete dataset
+LAST_FILES = (defaults.VERSION_INFO, defaults.META_FILE)
+
+
+def _root(fs: AbstractFileSystem, path: str) -> str:
+    return posixpath.normpath(fs._strip_protocol(path)).rstrip("/")
+
+
+def list_files(fs: AbstractFileSystem, path: str) -> dict:
+    """Returns {relative path: size} of all files under path, using a single listing"""
+    root = _root(fs, path)
+    try:
+        found = fs.find(root, detail=True)
+    except FileNotFoundError:
+        return {}
+    return {
+        name[len(root) + 1 :]: info.get("size")
+        for name, info in found.items()
+        if info.get("type", "file") == "file" and name.startswith(root + "/")
+    }
+
+
+def supports_server_side_copy(src_fs: AbstractFileSystem, dst_fs: AbstractFileSystem):
+    """Files can be copied with dst_fs.cp_file if both filesystems point to the same backend"""
+    if src_fs is dst_fs:
+        return True
+    return type(src_fs) is type(dst_fs) and getattr(
+        src_fs, "storage_options", None
+    ) == getattr(dst_fs, "storage_options", None)
+
+
+def copy_files(
+    src_fs: AbstractFileSystem,
+    src_path: str,
+    dst_fs: AbstractFileSystem,
+    dst_path: str,
+    workers: int = DEFAULT_PARALLEL_REQUESTS,
+    resume: bool = False,
+) -> dict:
+    """Copies all files under src_path to dst_path
+
+    Source and destination are listed once, files are copied by up to workers threads.
+    Files are copied on the server if both paths are on the same backend.
+
+    Parameters
+    ----------
+    workers: int
+        Number of files copied at the same time
+    resume: bool
+        Continue an interrupted copy, files already present in dst_path with the same size are skipped.
+        Otherwise dst_path has to be empty.
+
+    Returns
+    -------
+    dict with number of copied and skipped files, copied bytes, seconds and throughput in bytes/s
+    """
+    start = time.time()
+    src_root, dst_root = _root(src_fs, src_path), _root(dst_fs, dst_path)
+    files = list_files(src_fs, src_root)
+    existing = list_files(dst_fs, dst_root)
+    if existing and not resume:
+        raise DirectoryNotEmptyException(dst_path)
+    todo = [name for name, size in files.items() if existing.get(name) != size]
+    server_side = supports_server_side_copy(src_fs, dst_fs)
+
+    if _is_local(dst_fs):
+        for folder in {posixpath.dirname(name) for name in todo}:
+            dst_fs.makedirs(posixpath.join(dst_root, folder), exist_ok=True)
+
+    def copy_file(name):
+        src = posixpath.join(src_root, name)
+        dst = posixpath.join(dst_root, name)
+        if server_side:
+            dst_fs.cp_file(src, dst)
+        else:
+            dst_fs.pipe_file(dst, src_fs.cat_file(src))
+
+    thread_map(copy_file, [name for name in todo if name not in LAST_FILES], workers)
+    for name in LAST_FILES:
+        if name in todo:
+            copy_file(name)
+
+    seconds = max(time.time() - start, 1e-9)
+    copied_bytes = sum(files[name] or 0 for name in todo)
+    stats = {
+        "files": len(todo),
+        "skipped": len(files) - len(todo),
+        "bytes": copied_bytes,
+        "seconds": seconds,
+        "throughput": copied_bytes / seconds,
+    }
+    logger.info(
+        f"Copied {stats['files']} files ({copied_bytes / 2 ** 20:.1f} MB) in {seconds:.1f}s, "
+        f"{stats['throughput'] / 2 ** 20:.1f} MB/s"
+        + (f", {stats['skipped']} already copied" if stats["skipped"] else "")
+    )
+    return stats
@@ -0,0 +1,312 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import json
+import os
+from urllib.parse import quote, unquote
+import uuid
+
+from hub.store.lru_cache import Lock, LRUCache, _get_size
+from hub.store.parallel import getitems, thread_map
+
+# Keys are percent-encoded on disk, so no key can produce a name with a bare "%"
+INDEX_FILE = "%index"
+TMP_MARKER = ".%tmp-"
+
+
+def _atomic_write(path: str, value):
+    """Writes value next to path and renames it into place, so readers never see a partial file"""
+    tmp_path = f"{path}{TMP_MARKER}{uuid.uuid4().hex}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class DiskStorage(MutableMapping):
+    def __init__(self, root: str):
+        """MutableMapping over files in root directory with crash-safe writes"""
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._remove_tmp_files()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, quote(key, safe="/"))
+
+    def _walk(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                yield os.path.join(dirpath, filename)
+
+    def _remove_tmp_files(self):
+        for path in self._walk():
+            if TMP_MARKER in os.path.basename(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __getitem__(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _atomic_write(path, value)
+
+    def __delitem__(self, key):
+        try:
+            os.remove(self._path(key))
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            raise KeyError(key)
+
+    def sizes(self) -> dict:
+        """Returns sizes of all items currently on disk"""
+        sizes = {}
+        for path in self._walk():
+            name = os.path.basename(path)
+            if name == INDEX_FILE or TMP_MARKER in name:
+                continue
+            key = unquote(os.path.relpath(path, self.root).replace(os.sep, "/"))
+            try:
+                sizes[key] = os.path.getsize(path)
+            except OSError:
+                pass
+        return sizes
+
+    def __iter__(self):
+        yield from self.sizes()
+
+    def __len__(self):
+        return len(self.sizes())
+
+    def load_index(self) -> OrderedDict:
+        """Returns index saved by save_index, empty if missing or corrupted"""
+        try:
+            with open(os.path.join(self.root, INDEX_FILE), "rb") as f:
+                return OrderedDict(json.loads(f.read().decode("utf-8")))
+        except (OSError, ValueError):
+            return OrderedDict()
+
+    def save_index(self, index: OrderedDict):
+        _atomic_write(
+            os.path.join(self.root, INDEX_FILE),
+            bytes(json.dumps(list(index.items())), "utf-8"),
+        )
+
+
+def _same_info(local: dict, remote: dict) -> bool:
+    if local.get("size") != remote.get("size"):
+        return False
+    if local.get("etag") and remote.get("etag"):
+        return local["etag"] == remote["etag"]
+    return True
+
+
+class DiskLRUCache(LRUCache):
+    def __init__(
+        self,
+        cache_path: str,
+        actual_storage: MutableMapping,
+        max_size,
+        lock=True,
+    ):
+        """Creates LRU cache of actual_storage items persisted in cache_path directory
+        max_size -> maximum size of the cache on disk
+        Items left on disk by earlier sessions are validated against the ETag and size
+        of the remote objects all at once, the first time any item is accessed
+        """
+        super().__init__(DiskStorage(cache_path), actual_storage, max_size, lock=lock)
+        self._info = {}
+        self._fetched_info = {}
+        self._validated = set()
+        self._validation_lock = Lock()
+        self._load()
+        self._unvalidated = list(self._cached_items)
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state["_validation_lock"]
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._validation_lock = Lock()
+
+    def _load(self):
+        sizes = self._cache_storage.sizes()
+        index = self._cache_storage.load_index()
+        for key, info in index.items():
+            if key not in sizes:
+                continue
+            if sizes.pop(key) != info.get("size"):
+                self._remove_file(key)
+                continue
+            self._cached_items[key] = info["size"]
+            self._total_cached += info["size"]
+            self._info[key] = info
+        # Items unknown to the index were cached after the last flush, without their ETag
+        # they can't be told apart from stale copies, so they are dropped
+        for key in sizes:
+            self._remove_file(key)
+        self._free_memory(0)
+
+    def _remove_file(self, key):
+        try:
+            del self._cache_storage[key]
+        except KeyError:
+            pass
+
+    def _forget(self, key):
+        """Drops key from the cache without touching actual storage"""
+        with self._mutex:
+            if key in self._cached_items and key not in self._dirty:
+                self._total_cached -= self._cached_items.pop(key)
+                self._info.pop(key, None)
+                self._remove_file(key)
+
+    def _validate(self, key):
+        with self._mutex:
+            info = self._info.get(key)
+            if key in self._validated or key in self._dirty or info is None:
+                self._validated.add(key)
+                return
+        try:
+            remote = get_info(self._actual_storage, key)
+        except KeyError:
+            self._forget(key)
+            return
+        if remote is not None:
+            if not _same_info(info, remote):
+                self._forget(key)
+                return
+            info["etag"] = info.get("etag") or remote.get("etag")
+        with self._mutex:
+            self._validated.add(key)
+
+    def _validate_loaded(self):
+        """Validates items loaded from disk concurrently instead of one per access"""
+        if not self._unvalidated:
+            return
+        with self._validation_lock:
+            keys = [key for key in self._unvalidated if key not in self._validated]
+            thread_map(self._validate, keys)
+            self._unvalidated = []
+
+    def _read_actual(self, key):
+        result, info = get_with_info(self._actual_storage, key)
+        self._fetched_info[key] = info
+        return result
+
+    def _read_actual_items(self, keys) -> dict:
+        items, infos = getitems_with_info(self._actual_storage, keys)
+        self._fetched_info.update(infos)
+        return items
+
+    def _cache_fetched_items(self, keys, items: dict) -> dict:
+        try:
+            return super()._cache_fetched_items(keys, items)
+        finally:
+            # Infos of items that were not cached are not needed anymore
+            for key in keys:
+                self._fetched_info.pop(key, None)
+
+    def _append_cache(self, key, value):
+        super()._append_cache(key, value)
+        info = self._fetched_info.pop(key, None)
+        self._info[key] = info or {"size": _get_size(value), "etag": None}
+        self._validated.add(key)
+
+    def __getitem__(self, key):
+        self._validate_loaded()
+        try:
+            return super().__getitem__(key)
+        except KeyError:
+            # File might have been removed by another process sharing the cache folder
+            if key not in self._cached_items:
+                raise
+            self._forget(key)
+            return super().__getitem__(key)
+
+    def getitems(self, keys, on_error="omit"):
+        self._validate_loaded()
+        return super().getitems(keys, on_error=on_error)
+
+    def _save_index(self):
+        with self._mutex:
+            index = OrderedDict(
+                (key, self._info[key])
+                for key in self._cached_items
+                if key in self._info
+            )
+            self._info = dict(index)
+        self._cache_storage.save_index(index)
+
+    def flush(self):
+        try:
+            super().flush()
+        finally:
+            self._save_index()
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._save_index()
+
+
+def get_info(storage: MutableMapping, key):
+    """Returns dict with size and etag of the item in storage, None if storage can't tell
+    Raises KeyError if item doesn't exist
+    """
+    if hasattr(storage, "info"):
+        return storage.info(key)
+    return None
+
+
+def get_with_info(storage: MutableMapping, key):
+    """Returns the item and the dict with its size and etag"""
+    if hasattr(storage, "get_with_info"):
+        return storage.get_with_info(key)
+    result = storage[key]
+    return result, {"size": _get_size(result), "etag": None}
+
+
+def _get_with_info_or_missing(storage: MutableMapping, key):
+    try:
+        return get_with_info(storage, key)
+    except KeyError:
+        return None
+
+
+def getitems_with_info(storage: MutableMapping, keys):
+    """Returns dict of the items and dict of their sizes and etags, missing keys are left out"""
+    keys = list(keys)
+    if hasattr(storage, "getitems_with_info"):
+        return storage.getitems_with_info(keys)
+    if hasattr(storage, "get_with_info"):
+        fetched = thread_map(lambda key: _get_with_info_or_missing(storage, key), keys)
+        found = [(key, item) for key, item in zip(keys, fetched) if item is not None]
+        return (
+            {key: item[0] for key, item in found},
+            {key: item[1] for key, item in found},
+        )
+    items = getitems(storage, keys)
+    return items, {
+        key: {"size": _get_size(value), "etag": None} for key, value in items.items()
+    }
@@ -13,9 +13,11 @@ import math
 import numpy as np
 from numpy.lib.arraysetops import isin
 import zarr
+from zarr.indexing import BasicIndexer, OrthogonalIndexer
 import numcodecs
 
 from hub.store.nested_store import NestedStore
+from hub.store.parallel import delitems
 from hub.store.shape_detector import ShapeDetector
 from hub.defaults import DEFAULT_COMPRESSOR
 
@@ -44,6 +46,7 @@ class DynamicTensor:
         dtype="float64",
         chunks=None,
         compressor=DEFAULT_COMPRESSOR,
+        chunk_layout="auto",
     ):
         """Constructor
         Parameters
@@ -61,12 +64,18 @@ class DynamicTensor:
         chunks : Tuple[int] | True
             How to split the tensor into chunks (files) (default is True)
             If chunks=True then chunksize will automatically be detected
-
+        chunk_layout : str
+            How chunks are detected if not given, "sample", "tile" or "auto" (default)
         """
         if not (shape is None):
             # otherwise shape detector fails
             shapeDt = ShapeDetector(
-                shape, max_shape, chunks, dtype, compressor=compressor
+                shape,
+                max_shape,
+                chunks,
+                dtype,
+                compressor=compressor,
+                chunk_layout=chunk_layout,
             )
             shape = shapeDt.shape
             max_shape = shapeDt.max_shape
@@ -75,6 +84,8 @@ class DynamicTensor:
             raise TypeError("shape cannot be none")
 
         self.fs_map = fs_map
+        # Set while chunk layout can still be adapted to the first written data
+        self._shape_detector = None
         exist_ = fs_map.get(".hub.dynamic_tensor")
 
         # if not exist_ and len(fs_map) > 0 and "w" in mode:
@@ -133,6 +144,8 @@ class DynamicTensor:
             )
 
             fs_map[".hub.dynamic_tensor"] = bytes(json.dumps({"shape": shape}), "utf-8")
+            if shapeDt.adaptive:
+                self._shape_detector = shapeDt
 
         self.shape = shape
         self.max_shape = self._storage_tensor.shape
@@ -158,7 +171,8 @@ class DynamicTensor:
             else:
                 start = slice_[0].start or 0
                 end = slice_[0].stop or self.shape[0]
-                real_shapes = [self.get_real_shape(i) for i in range(start, end)]
+                # Shapes of all samples are read at once instead of one zarr read per sample
+                real_shapes = list(self._dynamic_tensor[start:end])
         else:
             real_shapes = None
         return real_shapes
@@ -178,8 +192,103 @@ class DynamicTensor:
                 self._get_slice([start + i] + slice_[1:], real_shapes[i])
                 for i in range(len(real_shapes))
             ]
-            return [self._storage_tensor[cur_slice] for cur_slice in slice_list]
+            return self._read_samples(slice_list)
         slice_ = self._get_slice(slice_, real_shapes)
+        return self._read_storage_tensor(slice_)
+
+    def _bounding_box(self, slice_list):
+        """Returns slice covering all samples of slice_list and slices of each sample inside of it
+        Returns None if samples can't be read as one box
+        """
+        box = [slice(slice_list[0][0], slice_list[-1][0] + 1)]
+        local = [[] for _ in slice_list]
+        for dim in range(1, len(self.max_shape)):
+            items = [cur_slice[dim] for cur_slice in slice_list]
+            if all(isinstance(item, int) for item in items):
+                if len(set(items)) > 1 or items[0] < 0:
+                    return None
+                box.append(items[0])
+                continue
+            bounds = []
+            for item in items:
+                if not isinstance(item, slice) or item.step not in (None, 1):
+                    return None
+                start = item.start or 0
+                stop = self.max_shape[dim] if item.stop is None else item.stop
+                if start < 0 or stop < 0:
+                    return None
+                stop = min(stop, self.max_shape[dim])
+                bounds.append((start, max(start, stop)))
+            box_start = min(start for start, _ in bounds)
+            box_stop = max(stop for _, stop in bounds)
+            box.append(slice(box_start, box_stop))
+            for i, (start, stop) in enumerate(bounds):
+                local[i].append(slice(start - box_start, stop - box_start))
+        return tuple(box), [tuple(item) for item in local]
+
+    def _read_samples(self, slice_list):
+        """Reads many samples, with a single storage read of their bounding box if it isn't much bigger than them"""
+        if not slice_list:
+            return []
+        bounding_box = self._bounding_box(slice_list)
+        if bounding_box is not None:
+            box, local = bounding_box
+            box_size = np.prod(BasicIndexer(box, self._storage_tensor).shape)
+            samples_size = sum(
+                np.prod(BasicIndexer(cur_slice, self._storage_tensor).shape)
+                for cur_slice in slice_list
+            )
+            # Limits memory overhead of reading the box when samples differ a lot in size
+            if box_size <= 2 * samples_size + 2 ** 20:
+                data = self._read_storage_tensor(box)
+                return [data[(i,) + local[i]] for i in range(len(slice_list))]
+        return [self._read_storage_tensor(cur_slice) for cur_slice in slice_list]
+
+    def gather(self, indexes, slice_=()):
+        """Gets samples at indexes (list of ints), each one sliced by slice_
+        Each chunk is fetched (concurrently) and decompressed once, whatever number of samples it holds
+        Returns an array if sliced samples are of the same shape, a list otherwise
+        """
+        indexes = [index + self.shape[0] if index < 0 else index for index in indexes]
+        if not indexes:
+            return np.array([])
+        slice_ = list(slice_)
+        slice_ += [slice(0, None, 1) for i in self.max_shape[len(slice_) + 1 :]]
+        real_shapes = (
+            self._dynamic_tensor.get_orthogonal_selection((indexes, slice(None)))
+            if self._dynamic_tensor
+            else [None] * len(indexes)
+        )
+        slice_list = [
+            self._get_slice([index] + slice_, real_shape)
+            for index, real_shape in zip(indexes, real_shapes)
+        ]
+        bounding_box = self._bounding_box(slice_list)
+        if bounding_box is None:
+            return [self._read_storage_tensor(cur_slice) for cur_slice in slice_list]
+        box, local = bounding_box
+        box = (indexes,) + box[1:]
+        box_shape = OrthogonalIndexer(box, self._storage_tensor).shape
+        samples_size = sum(
+            np.prod(BasicIndexer(cur_slice, self._storage_tensor).shape)
+            for cur_slice in slice_list
+        )
+        # Same limit of memory overhead as in _read_samples
+        if np.prod(box_shape) > 2 * samples_size + 2 ** 20:
+            return [self._read_storage_tensor(cur_slice) for cur_slice in slice_list]
+        if 0 in box_shape:
+            data = np.zeros(box_shape, dtype=self._storage_tensor.dtype)
+        else:
+            data = self._storage_tensor.get_orthogonal_selection(box)
+        if all(item == local[0] for item in local):
+            return data
+        return [data[(i,) + local[i]] for i in range(len(indexes))]
+
+    def _read_storage_tensor(self, slice_):
+        # zarr's batched (getitems) read path fails on selections that don't touch any chunk
+        shape = BasicIndexer(slice_, self._storage_tensor).shape
+        if 0 in shape:
+            return np.zeros(shape, dtype=self._storage_tensor.dtype)
         return self._storage_tensor[slice_]
 
     def __setitem__(self, slice_, value):
@@ -187,6 +296,8 @@ class DynamicTensor:
         if not isinstance(slice_, abc.Iterable):
             slice_ = [slice_]
         slice_ = list(slice_)
+        shape_detector, self._shape_detector = self._shape_detector, None
+        whole_samples = all(_is_full_slice(sl) for sl in slice_[1:])
         if self._dynamic_tensor and self._enabled_dynamicness:
             self.set_shape(slice_, value)
         slice_ += [slice(0, None, 1) for i in self.max_shape[len(slice_) :]]
@@ -224,8 +335,38 @@ class DynamicTensor:
 
         slice_ = self._get_slice(slice_, real_shapes)
         value = self.check_value_shape(value, slice_)
+        if 0 in BasicIndexer(slice_, self._storage_tensor).shape:
+            # Nothing to write, zarr's batched (setitems) write path fails on empty selections
+            return
+        if shape_detector is not None and whole_samples:
+            samples = np.ascontiguousarray(value, dtype=self.dtype)
+            if isinstance(slice_[0], int):
+                samples = samples[np.newaxis]
+            self._adapt_chunks(shape_detector, samples)
         self._storage_tensor[slice_] = value
 
+    def _adapt_chunks(self, shape_detector: ShapeDetector, samples: np.ndarray):
+        """Picks samples per chunk from compressed size of the first written samples
+        Can only be done before any chunk is stored
+        """
+        if samples.nbytes == 0:
+            return
+        # Samples up to 64MB are enough to measure compression
+        samples = samples[: max(1, 2 ** 26 // samples[0].nbytes)]
+        compressed = len(self._storage_tensor.compressor.encode(samples))
+        chunks = shape_detector.adapt_chunks(compressed / len(samples))
+        meta = json.loads(self.fs_map[".hub.dynamic_tensor"].decode("utf-8"))
+        meta["chunks"] = list(chunks)
+        meta["compression_ratio"] = samples.nbytes / compressed
+        self.fs_map[".hub.dynamic_tensor"] = bytes(json.dumps(meta), "utf-8")
+        if chunks == self.chunks:
+            return
+        zarray = json.loads(self.fs_map[".zarray"].decode("utf-8"))
+        zarray["chunks"] = list(chunks)
+        self.fs_map[".zarray"] = bytes(json.dumps(zarray), "utf-8")
+        self._storage_tensor = zarr.open_array(store=self.fs_map, mode="a")
+        self.chunks = self._storage_tensor.chunks
+
     def check_value_shape(self, value, slice_):
         """Checks if value can be set to the slice"""
         if None not in self.shape and self.dtype != "O":
@@ -273,9 +414,9 @@ class DynamicTensor:
         if self._dynamic_tensor:
             self._resize_shape(self._dynamic_tensor, size)
 
-        self.fs_map[".hub.dynamic_tensor"] = bytes(
-            json.dumps({"shape": self.shape}), "utf-8"
-        )
+        meta = json.loads(self.fs_map[".hub.dynamic_tensor"].decode("utf-8"))
+        meta["shape"] = self.shape
+        self.fs_map[".hub.dynamic_tensor"] = bytes(json.dumps(meta), "utf-8")
 
     def get_shape_samples(self, samples):
         """Gets full shape of dynamic_tensor(s)"""
@@ -290,17 +431,10 @@ class DynamicTensor:
                 shape.append(current)
             return np.array(shape)
         elif isinstance(samples, slice):
-            shapes = self._dynamic_tensor[samples]
-            for i in range(1, len(self.shape)):
-                if self.shape[i] is not None:
-                    shapes = np.insert(shapes, i - 1, self.shape[i], axis=1)
-            return shapes
+            return self._with_static_dims(self._dynamic_tensor[samples])
         elif isinstance(samples, list):
             shapes = np.array([self._dynamic_tensor[index] for index in samples])
-            for i in range(1, len(self.shape)):
-                if self.shape[i] is not None:
-                    shapes = np.insert(shapes, i - 1, self.shape[i], axis=1)
-            return shapes
+            return self._with_static_dims(shapes)
 
     def combine_shape(self, shape, slice_):
         """Combines given shape with slice to get final shape"""
@@ -368,57 +502,77 @@ class DynamicTensor:
         """
         self._dynamic_tensor[slice_[0]] = shape
 
+    def set_dynamic_shapes(self, slices, shapes):
+        """
+        Set shapes of many slices of samples, shapes of adjacent slices are written at once
+        """
+        batches = sorted(zip(slices, shapes), key=lambda batch: batch[0][0].start or 0)
+        start, stop, block = None, None, []
+        for slice_, shape in batches:
+            if block and (slice_[0].start or 0) != stop:
+                self.set_dynamic_shape([slice(start, stop)], np.concatenate(block))
+                block = []
+            if not block:
+                start = slice_[0].start or 0
+            stop = slice_[0].stop
+            block.append(np.asarray(shape).reshape(-1, len(self._dynamic_dims)))
+        if block:
+            self.set_dynamic_shape([slice(start, stop)], np.concatenate(block))
+
     def get_shape_from_value(self, slice_, value):
         """
         create shape for multiple elements
+        Shapes of all samples are computed at once, current shapes are read with a single read
         """
         if isinstance(slice_[0], int):
-            new_shapes = self.create_shape(slice_, value)
-            new_shapes = np.maximum(self._dynamic_tensor[slice_[0]], new_shapes)
-        else:
-            start = slice_[0].start if slice_[0].start is not None else 0
-            stop = (
-                slice_[0].stop if slice_[0].stop is not None else start + value.shape[0]
-            )
-            dt = self._dynamic_tensor[slice_[0]]
-            new_shapes = []
-            for i in range(start, stop):
-                new_shape = self.create_shape([i] + slice_[1:], value[i - start])
-                new_shape = np.maximum(dt[i - start], new_shape)
-                new_shapes.append(new_shape)
+            sample_slice = [slice(slice_[0], slice_[0] + 1)] + list(slice_[1:])
+            return self.get_shape_from_value(sample_slice, [value])[0]
+        start = slice_[0].start if slice_[0].start is not None else 0
+        stop = slice_[0].stop if slice_[0].stop is not None else start + len(value)
+        new_shapes = self.create_shapes(
+            slice_[1:], [value[i] for i in range(stop - start)]
+        )
+        current_shapes = self._dynamic_tensor[start:stop]
+        if not all(_is_full_slice(sl) for sl in slice_[1:]):
+            # Partial writes only grow samples
+            new_shapes = np.maximum(current_shapes, new_shapes)
+        self._delete_chunks_after_reshape(start, current_shapes, new_shapes)
         return new_shapes
 
-    def create_shape(self, slice_, value):
-        assert isinstance(slice_[0], int)
-        new_shape = []
-        shape_offset = 0
-
-        value_shape = (
+    def create_shapes(self, slice_, values) -> np.ndarray:
+        """Dynamic shapes of values written to slice_ (without the first, sample dimension) of many samples"""
+        value_shapes = [
             list(value.shape)
             if hasattr(value, "shape") and len(list(value.shape)) > 0
             else [1]
-        )
-
+            for value in values
+        ]
+        new_shapes = np.zeros((len(values), len(self._dynamic_dims)), dtype="int64")
+        shape_offset, column = 0, 0
         for i in range(1, len(self.shape)):
-
+            sl = slice_[i - 1] if i <= len(slice_) else None
             if self.shape[i] is None:
-                if i < len(slice_):
-                    if isinstance(slice_[i], slice):
-                        sl = slice_[i].stop
-                        shape_offset += 1
-                    else:
-                        sl = slice_[i] + 1
-                    new_shape.append(sl)
+                if isinstance(sl, int):
+                    new_shapes[:, column] = sl + 1
+                elif sl is not None and sl.stop is not None:
+                    new_shapes[:, column] = sl.stop
+                    shape_offset += 1
                 else:
-                    new_shape.append(value_shape[shape_offset])
+                    new_shapes[:, column] = [
+                        value_shape[shape_offset] for value_shape in value_shapes
+                    ]
                     shape_offset += 1
-            elif i >= len(slice_) or isinstance(slice_[i], slice):
+                column += 1
+            elif not isinstance(sl, int):
                 shape_offset += 1
-        new_appended_shape = list(self.shape)
-        for i, dim in enumerate(self._dynamic_dims):
-            new_appended_shape[dim] = new_shape[i]
-        self._delete_chunks_after_reshape(slice_[0], new_appended_shape[1:])
-        return new_shape
+        return new_shapes
+
+    def _with_static_dims(self, shapes: np.ndarray) -> np.ndarray:
+        """Inserts static dims into dynamic shapes of samples"""
+        for i in range(1, len(self.shape)):
+            if self.shape[i] is not None:
+                shapes = np.insert(shapes, i - 1, self.shape[i], axis=1)
+        return shapes
 
     def _get_slice(self, slice_, real_shapes):
         # Makes slice_ which is uses relative indices (ex [:-5]) into precise slice_ (ex [10:40])
@@ -435,43 +589,52 @@ class DynamicTensor:
                     )
         return tuple(slice_)
 
-    def _delete_chunks_after_reshape(self, samples, new_shape: np.ndarray):
-        """For a single sample or slice of samples deletes all chunks that exist out of new_shape bounds
-        New shape does not include first (sample) dimension. It assumes that each sample gets the same new_shape shape
+    def _delete_chunks_after_reshape(
+        self, start: int, shapes: np.ndarray, new_shapes: np.ndarray
+    ):
+        """For consecutive samples starting from start deletes all chunks that exist out of new_shapes bounds
+        shapes and new_shapes are dynamic shapes of the samples, one row per sample
         NOTE: There is an assumption that dynamic_tensor chunks is either (1, A, B, C, ...) or (X, Infinity, Infinity, Infinity, ...)
         """
         if self.chunks[0] > 1:
             return
 
-        if isinstance(samples, slice):
-            samples_shape = self.get_shape([samples])
-            for sample in range(slice.start, slice.stop, slice.step):
-                self._delete_chunks_after_reshape_single_sample(
-                    sample, samples_shape[sample], new_shape
-                )
-        else:
-            assert isinstance(samples, int)
-            self._delete_chunks_after_reshape_single_sample(
-                samples, self.get_shape([samples]), new_shape
-            )
-
-    def _delete_chunks_after_reshape_single_sample(
-        self, sample, sample_shape, new_shape
-    ):
-        if (sample_shape <= new_shape).all():
-            return
-
-        shapes = sample_shape
-        assert len(shapes.shape) + 1 == len(self.shape)
-        chunks = self._storage_tensor.chunks[1:]
-
-        div = np.ceil(shapes / chunks).astype("int32")
-        for index in np.ndindex(*div.tolist()):
-            if (np.array(index) * chunks >= new_shape).any():
-                try:
-                    del self[".".join((sample,) + index)]
-                except KeyError:
-                    pass
+        shapes = self._with_static_dims(np.asarray(shapes))
+        new_shapes = self._with_static_dims(np.asarray(new_shapes))
+        chunks = np.array(self._storage_tensor.chunks[1:])
+        keys = []
+        for i in np.flatnonzero((shapes > new_shapes).any(axis=1)):
+            # Chunk coordinates of the sample before reshape, one row per chunk
+            grid = np.indices(np.ceil(shapes[i] / chunks).astype("int64"))
+            grid = grid.reshape(len(chunks), -1).T
+            orphaned = grid[(grid * chunks >= new_shapes[i]).any(axis=1)]
+            keys += [_chunk_key((start + int(i),) + tuple(idx)) for idx in orphaned]
+        delitems(self.fs_map, keys)
+
+    def vacuum(self) -> int:
+        """Deletes chunks out of bounds of their samples, left behind by earlier overwrites
+        Returns number of deleted chunks
+        """
+        if self._dynamic_tensor is None or self.chunks[0] > 1:
+            return 0
+        keys = [
+            key
+            for key in _stored_chunk_keys(self.fs_map)
+            if key.count(".") == len(self.shape) - 1 and key.replace(".", "").isdigit()
+        ]
+        if not keys:
+            return 0
+        index = np.array([key.split(".") for key in keys], dtype="int64")
+        shapes = self._with_static_dims(self._dynamic_tensor[:])
+        chunks = np.array(self._storage_tensor.chunks[1:])
+        stale = index[:, 0] >= len(shapes)
+        in_range = np.flatnonzero(~stale)
+        stale[in_range] = (
+            index[in_range, 1:] * chunks >= shapes[index[in_range, 0]]
+        ).any(axis=1)
+        stale_keys = [key for key, is_stale in zip(keys, stale) if is_stale]
+        delitems(self.fs_map, stale_keys)
+        return len(stale_keys)
 
     @property
     def chunksize(self):
@@ -500,6 +663,11 @@ class DynamicTensor:
         if self._dynamic_tensor:
             self._dynamic_tensor.store.close()
 
+    def __getstate__(self):
+        # Copies written by other processes can't agree on a new chunk layout, so it is fixed from now on
+        self._shape_detector = None
+        return self.__dict__
+
     def __enter__(self):
         return self
 
@@ -517,6 +685,26 @@ class DynamicTensor:
         self._enabled_dynamicness = True
 
 
+def _is_full_slice(sl) -> bool:
+    return (
+        isinstance(sl, slice)
+        and sl.start in (None, 0)
+        and sl.stop is None
+        and sl.step in (None, 1)
+    )
+
+
+def _chunk_key(index) -> str:
+    return ".".join(str(i) for i in index)
+
+
+def _stored_chunk_keys(fs_map):
+    """Keys of chunks stored in fs_map for the current version, without meta and nested arrays"""
+    if hasattr(fs_map, "chunk_keys"):
+        return fs_map.chunk_keys()
+    return [key for key in fs_map if "/" not in key and not key.startswith(".")]
+
+
 def get_dynamic_dims(shape):
     return [i for i, s in enumerate(shape) if s is None]
 
@@ -6,6 +6,10 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 
 from collections import OrderedDict
 from collections.abc import MutableMapping
+import queue
+import threading
+
+from hub.store.parallel import delitems, getitems, setitems
 
 
 class DummyLock:
@@ -19,7 +23,170 @@ class DummyLock:
         pass
 
 
-Lock = DummyLock
+Lock = threading.Lock
+
+
+def _get_size(value) -> int:
+    """Returns the size of value in bytes.
+    len() is not enough for memoryviews and arrays, which report the number of elements
+    """
+    nbytes = getattr(value, "nbytes", None)
+    if nbytes is not None:
+        return nbytes
+    return len(value)
+
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    def __init__(
+        self, storage: MutableMapping, max_pending_size=2 ** 28, workers=1, write=None
+    ):
+        """Writes items to storage on separate threads
+        max_pending_size -> maximum size of items waiting to be written, put() blocks above it
+        workers -> number of threads writing items concurrently
+        write -> function(key, value) that does the writing, defaults to storage.__setitem__
+        Items waiting to be written can still be read with get()
+        """
+        self._storage = storage
+        self._max_pending_size = max_pending_size
+        self._workers = workers
+        self._write = write
+        self._init_state()
+
+    def _init_state(self):
+        self._pending = {}
+        self._pending_size = 0
+        self._writing = set()
+        self._error = None
+        self._cond = threading.Condition()
+        self._queue = queue.Queue()
+        self._threads = []
+
+    def _start(self):
+        if not self._threads:
+            self._threads = [
+                threading.Thread(target=self._run, daemon=True)
+                for _ in range(self._workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def _write_item(self, key, value):
+        if self._write is not None:
+            self._write(key, value)
+        else:
+            self._storage[key] = value
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            if key is _STOP:
+                self._queue.task_done()
+                return
+            with self._cond:
+                # Writes of the same key must not overtake each other
+                while key in self._writing:
+                    self._cond.wait()
+                item = self._pending.get(key)
+                if item is None:
+                    self._queue.task_done()
+                    continue
+                self._writing.add(key)
+            try:
+                self._write_item(key, item[0])
+            except Exception as err:
+                self._error = self._error or err
+            finally:
+                with self._cond:
+                    self._writing.discard(key)
+                    if self._pending.get(key) is item:
+                        del self._pending[key]
+                        self._pending_size -= item[1]
+                    self._cond.notify_all()
+                self._queue.task_done()
+
+    @property
+    def pending_size(self):
+        """Number of bytes waiting to be written"""
+        return self._pending_size
+
+    def put(self, key, value):
+        """Schedules value to be written under key, replacing any pending value"""
+        size = _get_size(value)
+        with self._cond:
+            while (
+                self._pending_size > 0
+                and self._pending_size + size > self._max_pending_size
+            ):
+                self._cond.wait()
+            old = self._pending.get(key)
+            if old is not None:
+                self._pending_size -= old[1]
+            self._pending[key] = (value, size)
+            self._pending_size += size
+            self._start()
+        self._queue.put(key)
+
+    def get(self, key):
+        """Returns the value still waiting to be written, raises KeyError otherwise"""
+        with self._cond:
+            return self._pending[key][0]
+
+    def discard(self, key) -> bool:
+        """Cancels pending write of key, waits if key is being written right now"""
+        with self._cond:
+            while key in self._writing:
+                self._cond.wait()
+            item = self._pending.pop(key, None)
+            if item is None:
+                return False
+            self._pending_size -= item[1]
+            self._cond.notify_all()
+            return True
+
+    def __contains__(self, key):
+        with self._cond:
+            return key in self._pending
+
+    def keys(self):
+        with self._cond:
+            return list(self._pending)
+
+    def raise_error(self):
+        """Raises the first error of a failed write since the previous call, if any"""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def flush(self):
+        """Waits until all pending items are written, raises the first error that happened"""
+        self._queue.join()
+        self.raise_error()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+            self._threads = []
+
+    def __getstate__(self):
+        self.flush()
+        return {
+            "_storage": self._storage,
+            "_max_pending_size": self._max_pending_size,
+            "_workers": self._workers,
+            "_write": self._write,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
 
 
 class LRUCache(MutableMapping):
@@ -28,17 +195,24 @@ class LRUCache(MutableMapping):
         cache_storage: MutableMapping,
         actual_storage: MutableMapping,
         max_size,
+        lock=True,
+        writer: BackgroundWriter = None,
     ):
         """Creates LRU cache using cache_storage and actual_storage containers
         max_size -> maximum cache size that is allowed
+        lock -> whether the cache can be safely shared between threads
+        writer -> if given, dirty items evicted from the cache are written to actual_storage through it
         """
         self._dirty = set()
-        self._mutex = Lock()
+        self._lock = lock
+        self._mutex = Lock() if lock else DummyLock()
         self._max_size = max_size
         self._cache_storage = cache_storage
         self._actual_storage = actual_storage
+        self._writer = writer
         self._total_cached = 0
         self._cached_items = OrderedDict()
+        self._init_reads()
         # assert len(self._cache_storage) == 0, "Initially cache storage should be empty"
 
     @property
@@ -55,18 +229,66 @@ class LRUCache(MutableMapping):
         """
         return self._actual_storage
 
+    @property
+    def total_cached(self):
+        """Number of bytes currently held in the cache"""
+        return self._total_cached
+
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
         self.close()
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_mutex"]
+        del state["_reads"]
+        del state["_stale_reads"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._mutex = Lock() if self._lock else DummyLock()
+        self._init_reads()
+
+    def _init_reads(self):
+        # Number of storage reads in progress per key, keys written during them are stale
+        self._reads = {}
+        self._stale_reads = set()
+
+    def _start_reads(self, keys):
+        for key in keys:
+            self._reads[key] = self._reads.get(key, 0) + 1
+
+    def _finish_reads(self, keys) -> set:
+        """Returns keys that were not written or deleted while they were being read"""
+        fresh = set()
+        for key in keys:
+            if key not in self._stale_reads:
+                fresh.add(key)
+            count = self._reads.pop(key) - 1
+            if count:
+                self._reads[key] = count
+            else:
+                self._stale_reads.discard(key)
+        return fresh
+
+    def _invalidate_reads(self, key):
+        if key in self._reads:
+            self._stale_reads.add(key)
+
     def _flush_dirty(self):
-        for item in self._dirty:
-            self._actual_storage[item] = self._cache_storage[item]
-        self._dirty.clear()
+        with self._mutex:
+            setitems(
+                self._actual_storage,
+                {item: self._cache_storage[item] for item in self._dirty},
+            )
+            self._dirty.clear()
 
     def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
         self._flush_dirty()
         if hasattr(self._cache_storage, "flush"):
             self._cache_storage.flush()
@@ -74,6 +296,8 @@ class LRUCache(MutableMapping):
             self._actual_storage.flush()
 
     def close(self):
+        if self._writer is not None:
+            self._writer.close()
         self._flush_dirty()
         if hasattr(self._cache_storage, "close"):
             self._cache_storage.close()
@@ -83,31 +307,113 @@ class LRUCache(MutableMapping):
     def commit(self):
         self.close()
 
+    def _read_actual(self, key):
+        if self._writer is not None:
+            try:
+                return self._writer.get(key)
+            except KeyError:
+                pass
+        return self._actual_storage[key]
+
     def __getitem__(self, key):
         """ Gets item and puts it in the cache if not there """
         with self._mutex:
             if key in self._cached_items:
                 self._cached_items.move_to_end(key)
                 return self._cache_storage[key]
-            else:
-                result = self._actual_storage[key]
-                self._free_memory(len(result))
-                self._append_cache(key, result)
-                return result
+            self._start_reads((key,))
+        # Storage is read outside of the lock so that misses don't block hits
+        items = {}
+        try:
+            items[key] = self._read_actual(key)
+        finally:
+            self._cache_fetched_items((key,), items)
+        return items[key]
+
+    def _get_cached_items(self, keys):
+        """Returns dict of keys found in the cache and the list of keys that are not there"""
+        hits, misses = {}, []
+        with self._mutex:
+            for key in keys:
+                if key in self._cached_items:
+                    try:
+                        hits[key] = self._cache_storage[key]
+                        self._cached_items.move_to_end(key)
+                        continue
+                    except KeyError:
+                        if key in self._dirty:
+                            raise
+                        self._total_cached -= self._cached_items.pop(key)
+                misses.append(key)
+            self._start_reads(misses)
+        return hits, misses
+
+    def _read_actual_items(self, keys) -> dict:
+        result = {}
+        if self._writer is not None:
+            for key in keys:
+                try:
+                    result[key] = self._writer.get(key)
+                except KeyError:
+                    pass
+        rest = [key for key in keys if key not in result]
+        if rest:
+            result.update(getitems(self._actual_storage, rest))
+        return result
+
+    def _cache_fetched_items(self, keys, items: dict) -> dict:
+        """Caches items read from storage for keys returned as misses by _get_cached_items"""
+        with self._mutex:
+            fresh = self._finish_reads(keys)
+            for key, value in items.items():
+                if key in self._cached_items:
+                    # Item was set by another thread while we were reading
+                    self._cached_items.move_to_end(key)
+                    items[key] = self._cache_storage[key]
+                elif key in fresh:
+                    # Items written or deleted in the meantime are not cached
+                    self._free_memory(_get_size(value))
+                    self._append_cache(key, value)
+        return items
+
+    def getitems(self, keys, on_error="omit"):
+        """Gets many items at once, items missing from the cache are read from storage in one batch"""
+        hits, misses = self._get_cached_items(keys)
+        if misses:
+            items = {}
+            try:
+                items = self._read_actual_items(misses)
+            finally:
+                hits.update(self._cache_fetched_items(misses, items))
+        if on_error != "omit":
+            for key in keys:
+                if key not in hits:
+                    raise KeyError(key)
+        return hits
+
+    def setitems(self, mapping):
+        for key, value in mapping.items():
+            self[key] = value
 
     def __setitem__(self, key, value):
         """ Sets item and puts it in the cache if not there"""
+        if self._writer is not None:
+            self._writer.discard(key)
         with self._mutex:
+            self._invalidate_reads(key)
             if key in self._cached_items:
                 self._total_cached -= self._cached_items.pop(key)
-            self._free_memory(len(value))
+            self._free_memory(_get_size(value))
             self._append_cache(key, value)
             if key not in self._dirty:
                 self._dirty.add(key)
 
     def __delitem__(self, key):
         deleted_from_cache = False
+        if self._writer is not None:
+            deleted_from_cache = self._writer.discard(key)
         with self._mutex:
+            self._invalidate_reads(key)
             if key in self._cached_items:
                 self._total_cached -= self._cached_items.pop(key)
                 del self._cache_storage[key]
@@ -119,13 +425,37 @@ class LRUCache(MutableMapping):
                 if not deleted_from_cache:
                     raise
 
+    def _discard_cached(self, keys):
+        with self._mutex:
+            for key in keys:
+                self._invalidate_reads(key)
+                if key in self._cached_items:
+                    self._total_cached -= self._cached_items.pop(key)
+                    del self._cache_storage[key]
+                    self._dirty.discard(key)
+
+    def delitems(self, keys):
+        """Deletes many items at once, items are deleted from storage in one batch, missing ones are skipped"""
+        keys = list(keys)
+        if self._writer is not None:
+            for key in keys:
+                self._writer.discard(key)
+        self._discard_cached(keys)
+        delitems(self._actual_storage, keys)
+
     def __len__(self):
-        return len(
-            self.actual_storage
-        )  # TODO: In future might need to fix this to return proper len
+        # Storage listing is cached below, so counting doesn't list it again
+        return sum(1 for _ in self)
+
+    def _unflushed_keys(self):
+        with self._mutex:
+            keys = set(self._dirty)
+        if self._writer is not None:
+            keys.update(self._writer.keys())
+        return keys
 
     def __iter__(self):
-        cached_keys = set(self._dirty)
+        cached_keys = self._unflushed_keys()
         for i in self.actual_storage:
             cached_keys.discard(i)
             yield i
@@ -137,12 +467,156 @@ class LRUCache(MutableMapping):
         ):
             item, itemsize = self._cached_items.popitem(last=False)
             if item in self._dirty:
-                self._actual_storage[item] = self._cache_storage[item]
+                if self._writer is not None:
+                    self._writer.put(item, self._cache_storage[item])
+                else:
+                    self._actual_storage[item] = self._cache_storage[item]
                 self._dirty.discard(item)
             del self._cache_storage[item]
             self._total_cached -= itemsize
 
     def _append_cache(self, key, value):
-        self._total_cached += len(value)
-        self._cached_items[key] = len(value)
+        size = _get_size(value)
+        self._total_cached += size
+        self._cached_items[key] = size
         self._cache_storage[key] = value
+
+
+class ShardedLRUCache(MutableMapping):
+    def __init__(
+        self,
+        actual_storage: MutableMapping,
+        max_size,
+        shards=16,
+        max_pending_size=None,
+    ):
+        """Creates LRU cache that can be shared between many threads
+        Keys are striped across independently locked LRUCache shards, each holding max_size / shards bytes
+        Dirty items evicted from a shard are handed to a background writer instead of blocking the caller
+        max_pending_size -> maximum size of evicted items waiting to be written, defaults to max_size
+        """
+        self._actual_storage = actual_storage
+        self._max_size = max_size
+        self._writer = BackgroundWriter(
+            actual_storage, max_pending_size or max_size or 1
+        )
+        self._shards = tuple(
+            LRUCache(
+                dict(),
+                actual_storage,
+                max(max_size // shards, 1),
+                lock=True,
+                writer=self._writer,
+            )
+            for _ in range(shards)
+        )
+
+    @property
+    def actual_storage(self):
+        """Storage which is used for actual storing (not caching)
+        Returns MutableMapping
+        """
+        return self._actual_storage
+
+    @property
+    def shards(self):
+        return self._shards
+
+    @property
+    def total_cached(self):
+        """Number of bytes currently held in the cache"""
+        return sum(shard.total_cached for shard in self._shards)
+
+    def _shard_index(self, key) -> int:
+        return hash(key) % len(self._shards)
+
+    def _shard(self, key) -> LRUCache:
+        return self._shards[self._shard_index(key)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _flush_dirty(self):
+        self._writer.flush()
+        for shard in self._shards:
+            shard._flush_dirty()
+
+    def flush(self):
+        self._flush_dirty()
+        if hasattr(self._actual_storage, "flush"):
+            self._actual_storage.flush()
+
+    def close(self):
+        self._flush_dirty()
+        self._writer.close()
+        if hasattr(self._actual_storage, "close"):
+            self._actual_storage.close()
+
+    def commit(self):
+        self.close()
+
+    def __getitem__(self, key):
+        return self._shard(key)[key]
+
+    def __setitem__(self, key, value):
+        self._shard(key)[key] = value
+
+    def __delitem__(self, key):
+        del self._shard(key)[key]
+
+    def delitems(self, keys):
+        """Deletes many items at once, items are deleted from storage in one batch, missing ones are skipped"""
+        keys = list(keys)
+        for key in keys:
+            self._writer.discard(key)
+        for shard in self._shards:
+            shard._discard_cached(keys)
+        delitems(self._actual_storage, keys)
+
+    def getitems(self, keys, on_error="omit"):
+        """Gets many items at once, items missing from all shards are read from storage in one batch"""
+        shard_keys = {}
+        for key in keys:
+            shard_keys.setdefault(self._shard_index(key), []).append(key)
+        hits, misses = {}, {}
+        for index, keys_ in shard_keys.items():
+            shard_hits, shard_misses = self._shards[index]._get_cached_items(keys_)
+            hits.update(shard_hits)
+            if shard_misses:
+                misses[index] = shard_misses
+        if misses:
+            fetched = {}
+            try:
+                # All shards share the same writer and actual storage
+                fetched = self._shards[0]._read_actual_items(
+                    [key for keys_ in misses.values() for key in keys_]
+                )
+            finally:
+                for index, keys_ in misses.items():
+                    items = {key: fetched[key] for key in keys_ if key in fetched}
+                    hits.update(self._shards[index]._cache_fetched_items(keys_, items))
+        if on_error != "omit":
+            for key in keys:
+                if key not in hits:
+                    raise KeyError(key)
+        return hits
+
+    def setitems(self, mapping):
+        for key, value in mapping.items():
+            self[key] = value
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __iter__(self):
+        cached_keys = set(self._writer.keys())
+        for shard in self._shards:
+            with shard._mutex:
+                cached_keys.update(shard._dirty)
+        for i in self._actual_storage:
+            cached_keys.discard(i)
+            yield i
+        yield from sorted(cached_keys)
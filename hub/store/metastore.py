@@ -7,45 +7,124 @@ import json
 from collections.abc import MutableMapping
 import posixpath
 from hub import defaults
+from hub.store.chunk_index import TOMBSTONE
+from hub.store.parallel import delitems, getitems, setitems
+
+
+def _to_str(obj):
+    if isinstance(obj, memoryview):
+        obj = obj.tobytes()
+    if isinstance(obj, bytes):
+        obj = obj.decode("utf-8")
+    return obj
+
+
+class MetaCache(MutableMapping):
+    def __init__(self, fs_map: MutableMapping):
+        """Wraps dataset storage and keeps meta.json parsed in memory
+        All tensors of a dataset share one instance, changes are written as a single meta.json on flush
+        """
+        self._fs_map = fs_map
+        self._meta = None
+        self._dirty = False
+
+    @property
+    def meta(self) -> dict:
+        """Parsed meta.json, None if it doesn't exist yet. Call mark_dirty after changing it"""
+        if self._meta is None:
+            data = self._fs_map.get(defaults.META_FILE)
+            if data is not None:
+                self._meta = json.loads(_to_str(data))
+        return self._meta
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def __getitem__(self, k):
+        if k == defaults.META_FILE:
+            if self.meta is None:
+                raise KeyError(k)
+            return bytes(json.dumps(self.meta), "utf-8")
+        return self._fs_map[k]
+
+    def __setitem__(self, k, v):
+        if k == defaults.META_FILE:
+            self._meta = json.loads(_to_str(v))
+            self._dirty = True
+        else:
+            self._fs_map[k] = v
+
+    def __delitem__(self, k):
+        if k == defaults.META_FILE:
+            self._meta = None
+            self._dirty = False
+        del self._fs_map[k]
+
+    def __iter__(self):
+        yield from self._fs_map
+
+    def __len__(self):
+        return len(self._fs_map)
+
+    def _write_meta(self):
+        if self._dirty:
+            self._fs_map[defaults.META_FILE] = bytes(json.dumps(self._meta), "utf-8")
+            self._dirty = False
+
+    def flush(self):
+        self._write_meta()
+        self._fs_map.flush()
+
+    def close(self):
+        self._write_meta()
+        self._fs_map.close()
 
 
-# TODO: Better version control for PB scale data
-# Retrieving chunks with version control is fast, but the memory used to store the chunk_commit_map would be huge ~GBs
 class MetaStorage(MutableMapping):
     @classmethod
     def to_str(cls, obj):
-        if isinstance(obj, memoryview):
-            obj = obj.tobytes()
-        if isinstance(obj, bytes):
-            obj = obj.decode("utf-8")
-        return obj
+        return _to_str(obj)
 
-    def __init__(self, path, fs_map: MutableMapping, meta_map: MutableMapping, ds):
+    def __init__(self, path, fs_map: MutableMapping, meta_map: MetaCache, ds):
         self._fs_map = fs_map
         self._meta = meta_map
         self._path = path
         self._ds = ds
 
+    @property
+    def _chunk_index(self):
+        return self._ds._chunk_commit_map[self._path]
+
+    @property
+    def _resolved_chunks(self) -> dict:
+        return self._ds._resolved_chunks.setdefault(self._path, {})
+
     def find_chunk(self, k: str) -> str:
-        ls = self._ds._chunk_commit_map[self._path][k]
-        cur_node = self._ds._version_node
-        while cur_node is not None:
-            if cur_node.commit_id in ls:
-                return f"{k}:{cur_node.commit_id}"
-            cur_node = cur_node.parent
-        return None
+        resolved = self._resolved_chunks
+        try:
+            return resolved[k]
+        except KeyError:
+            pass
+        ancestry = self._ds._ancestry
+        commits = self._chunk_index.commits(k)
+        candidates = [c for c in commits if c in ancestry]
+        # The closest ancestor holding its own copy of the chunk wins
+        result = None
+        if candidates:
+            owner = commits[min(candidates, key=ancestry.get)]
+            # Chunk deleted by the commit or its ancestor reads as fill value
+            if owner != TOMBSTONE:
+                result = f"{k}:{owner}"
+        resolved[k] = result
+        return result
 
     def __getitem__(self, k: str, check=True) -> bytes:
         filename = posixpath.split(k)[1]
         if filename.startswith("."):
-            return bytes(
-                json.dumps(
-                    json.loads(self.to_str(self._meta[defaults.META_FILE]))[k][
-                        self._path
-                    ]
-                ),
-                "utf-8",
-            )
+            meta = self._meta.meta
+            if meta is None:
+                raise KeyError(defaults.META_FILE)
+            return bytes(json.dumps(meta[k][self._path]), "utf-8")
         if check:
             if self._ds._commit_id:
                 k = self.find_chunk(k) or f"{k}:{self._ds._commit_id}"
@@ -54,10 +133,9 @@ class MetaStorage(MutableMapping):
     def get(self, k: str, check=True) -> bytes:
         filename = posixpath.split(k)[1]
         if filename.startswith("."):
-            meta_ = self._meta.get(defaults.META_FILE)
-            if not meta_:
+            meta = self._meta.meta
+            if not meta:
                 return None
-            meta = json.loads(self.to_str(meta_))
             metak = meta.get(k)
             if not metak:
                 return None
@@ -69,40 +147,89 @@ class MetaStorage(MutableMapping):
                     k = self.find_chunk(k) or f"{k}:{self._ds._commit_id}"
             return self._fs_map.get(k)
 
+    def getitems(self, keys, on_error="omit"):
+        """Gets many items at once, chunks are fetched from the storage in one batch"""
+        result = {}
+        chunk_keys = {}
+        for k in keys:
+            if posixpath.split(k)[1].startswith("."):
+                item = self.get(k)
+                if item is not None:
+                    result[k] = item
+                elif on_error != "omit":
+                    raise KeyError(k)
+            else:
+                if self._ds._commit_id:
+                    chunk_keys[self.find_chunk(k) or f"{k}:{self._ds._commit_id}"] = k
+                else:
+                    chunk_keys[k] = k
+        items = getitems(self._fs_map, list(chunk_keys), on_error=on_error)
+        result.update({chunk_keys[k]: v for k, v in items.items()})
+        return result
+
+    def _set_meta(self, k: str, value):
+        meta = self._meta.meta
+        if meta is None:
+            raise KeyError(defaults.META_FILE)
+        meta[k] = meta.get(k) or {}
+        meta[k][self._path] = value
+        self._meta.mark_dirty()
+
+    def _get_chunk_write_key(self, k: str, check=True) -> str:
+        # Chunks are always written whole, so the previous version doesn't need to be copied first
+        chunk_key = k.split(":")[0]
+        if check and self._ds._commit_id:
+            k = f"{k}:{self._ds._commit_id}"
+        if k == chunk_key:
+            # Datasets without version control keep no chunk index
+            return k
+        commit_id = k.split(":")[-1]
+        self._materialize_borrowers(chunk_key, commit_id)
+        self._chunk_index.add(chunk_key, commit_id)
+        self._resolved_chunks.pop(chunk_key, None)
+        return k
+
     def __setitem__(self, k: str, v: bytes, check=True):
         filename = posixpath.split(k)[1]
         if filename.startswith("."):
-            meta = json.loads(self.to_str(self._meta[defaults.META_FILE]))
-            meta[k] = meta.get(k) or {}
-            meta[k][self._path] = json.loads(self.to_str(v))
-            self._meta[defaults.META_FILE] = bytes(json.dumps(meta), "utf-8")
+            self._set_meta(k, json.loads(self.to_str(v)))
         else:
-            chunk_key = k.split(":")[0]
-            if check and self._ds._commit_id:
-                old_filename = self.find_chunk(k)
-                k = f"{k}:{self._ds._commit_id}"
-                if old_filename and k != old_filename:
-                    self.copy_chunk(old_filename, k)
-            commit_id = k.split(":")[-1]
-            self._ds._chunk_commit_map[self._path][chunk_key].add(commit_id)
-            self._fs_map[k] = v
+            self._fs_map[self._get_chunk_write_key(k, check)] = v
+
+    def setitems(self, mapping):
+        """Sets many items at once, chunks are written to the storage in one batch"""
+        chunks = {}
+        for k, v in mapping.items():
+            if posixpath.split(k)[1].startswith("."):
+                self[k] = v
+            else:
+                chunks[self._get_chunk_write_key(k)] = v
+        setitems(self._fs_map, chunks)
 
-    def copy_all_chunks(self, from_commit_id: str, to_commit_id: str):
-        ls = {
-            chunk
-            for chunk, commit_ids in self._ds._chunk_commit_map[self._path].items()
-            if from_commit_id in commit_ids
-        }
+    def _materialize_borrowers(self, chunk_key: str, commit_id: str):
+        """Copies the chunk to the commits sharing it before commit_id overwrites it"""
+        for borrower in self._chunk_index.borrowers(chunk_key, commit_id):
+            self.copy_chunk(f"{chunk_key}:{commit_id}", f"{chunk_key}:{borrower}")
 
-        for chunk in ls:
-            from_path = f"{chunk}:{from_commit_id}"
-            to_path = f"{chunk}:{to_commit_id}"
-            self.copy_chunk(from_path, to_path)
+    def link_all_chunks(self, from_commit_id: str, to_commit_id: str):
+        """Makes to_commit share all chunks of from_commit, chunks are copied only once overwritten"""
+        self._chunk_index.link(from_commit_id, to_commit_id)
 
     def copy_chunk(self, from_chunk: str, to_chunk: str):
         data = self.__getitem__(from_chunk, False)
         self.__setitem__(to_chunk, data, False)
 
+    def chunk_keys(self) -> list:
+        """Keys of chunks stored by the current commit, chunks shared with earlier commits are left out"""
+        commit_id = self._ds._commit_id
+        if not commit_id:
+            return [k for k in self._fs_map if "/" not in k and not k.startswith(".")]
+        return [
+            k
+            for k in self._chunk_index.chunks(commit_id)
+            if "/" not in k and self._chunk_index.commits(k)[commit_id] == commit_id
+        ]
+
     def __len__(self):
         return len(self._fs_map) + 1
 
@@ -110,27 +237,55 @@ class MetaStorage(MutableMapping):
         yield ".zarray"
         yield from self._fs_map
 
-    def __delitem__(self, k: str):
-        filename = posixpath.split(k)[1]
-        if not filename.startswith("."):
-            filename = self.find_chunk(filename) or f"{filename}:{self._ds._commit_id}"
-        if filename.startswith("."):
-            meta = json.loads(self.to_str(self._meta[defaults.META_FILE]))
-            meta[k] = meta.get(k) or dict()
-            meta[k][self._path] = None
-            self._meta[defaults.META_FILE] = bytes(json.dumps(meta), "utf-8")
+    def _get_chunk_delete_key(self, k: str) -> str:
+        """Removes the chunk from the current commit
+        Returns the key to delete from the storage, None if the chunk is shared with an earlier commit
+        """
+        commit_id = self._ds._commit_id
+        if not commit_id:
+            return k
+        owner = self._chunk_index.commits(k).get(commit_id)
+        if owner is None and self.find_chunk(k) is None or owner == TOMBSTONE:
+            raise KeyError(k)
+        if owner == commit_id:
+            self._materialize_borrowers(k, commit_id)
+        self._resolved_chunks.pop(k, None)
+        if owner != commit_id or self._has_ancestor_copy(k):
+            # Earlier commit still needs its copy, tombstone hides it from this commit
+            self._chunk_index.add(k, commit_id, TOMBSTONE)
         else:
-            chunk_key = k.split(":")[0]
-            if self._ds._commit_id:
-                k = self.find_chunk(k) or f"{k}:{self._ds._commit_id}"
-            commit_id = k.split(":")[-1]
+            self._chunk_index.remove(k, commit_id)
+        return f"{k}:{commit_id}" if owner == commit_id else None
+
+    def _has_ancestor_copy(self, k: str) -> bool:
+        ancestry = self._ds._ancestry
+        commit_id = self._ds._commit_id
+        return any(
+            c in ancestry and c != commit_id for c in self._chunk_index.commits(k)
+        )
+
+    def __delitem__(self, k: str):
+        if posixpath.split(k)[1].startswith("."):
+            self._set_meta(k, None)
+            return
+        key = self._get_chunk_delete_key(k)
+        if key is not None:
+            del self._fs_map[key]
+
+    def delitems(self, keys):
+        """Deletes many chunks at once, missing ones are skipped"""
+        chunk_keys = []
+        for k in keys:
+            if posixpath.split(k)[1].startswith("."):
+                del self[k]
+                continue
             try:
-                self._ds._chunk_commit_map[self._path][chunk_key].remove(commit_id)
-            except Exception:
-                try:
-                    del self._fs_map[k]
-                except Exception:
-                    pass
+                key = self._get_chunk_delete_key(k)
+            except KeyError:
+                continue
+            if key is not None:
+                chunk_keys.append(key)
+        delitems(self._fs_map, chunk_keys)
 
     def flush(self):
         self._meta.flush()
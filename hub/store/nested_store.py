@@ -8,6 +8,8 @@ from collections.abc import MutableMapping
 
 import posixpath
 
+from hub.store.parallel import delitems, getitems, setitems
+
 
 class NestedStore(MutableMapping):
     def __init__(self, storage: MutableMapping, root: str):
@@ -23,6 +25,20 @@ class NestedStore(MutableMapping):
     def __delitem__(self, k):
         del self._storage[posixpath.join(self._root, k)]
 
+    def getitems(self, keys, on_error="omit"):
+        paths = {posixpath.join(self._root, k): k for k in keys}
+        items = getitems(self._storage, list(paths), on_error=on_error)
+        return {paths[path]: value for path, value in items.items()}
+
+    def setitems(self, mapping):
+        setitems(
+            self._storage,
+            {posixpath.join(self._root, k): v for k, v in mapping.items()},
+        )
+
+    def delitems(self, keys):
+        delitems(self._storage, [posixpath.join(self._root, k) for k in keys])
+
     def __iter__(self):
         prefix = self._root + "/"
         for item in self._storage:
@@ -0,0 +1,95 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+
+from hub.defaults import DEFAULT_PARALLEL_REQUESTS
+
+
+def thread_map(fn, items, workers=DEFAULT_PARALLEL_REQUESTS) -> list:
+    """Applies fn to every item using up to workers threads, keeps the order of items"""
+    items = list(items)
+    if len(items) <= 1 or workers <= 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(fn, items))
+
+
+def _get_or_missing(storage: MutableMapping, key):
+    try:
+        return storage[key]
+    except KeyError:
+        return KeyError
+
+
+def fetch_items(
+    storage: MutableMapping, keys, on_error="omit", workers=DEFAULT_PARALLEL_REQUESTS
+) -> dict:
+    """Reads keys from storage concurrently
+    Missing keys are left out of the result if on_error is "omit", KeyError is raised otherwise
+    """
+    keys = list(keys)
+    values = thread_map(lambda key: _get_or_missing(storage, key), keys, workers)
+    result = {}
+    for key, value in zip(keys, values):
+        if value is KeyError:
+            if on_error != "omit":
+                raise KeyError(key)
+        else:
+            result[key] = value
+    return result
+
+
+def store_items(storage: MutableMapping, mapping, workers=DEFAULT_PARALLEL_REQUESTS):
+    """Writes items of mapping to storage concurrently"""
+
+    def store_item(item):
+        storage[item[0]] = item[1]
+
+    thread_map(store_item, mapping.items(), workers)
+
+
+def remove_items(storage: MutableMapping, keys, workers=DEFAULT_PARALLEL_REQUESTS):
+    """Deletes keys from storage concurrently, missing keys are skipped"""
+
+    def remove_item(key):
+        try:
+            del storage[key]
+        except KeyError:
+            pass
+
+    thread_map(remove_item, keys, workers)
+
+
+def getitems(storage: MutableMapping, keys, on_error="omit") -> dict:
+    """Reads many keys from storage at once, using storage.getitems if it has one"""
+    if hasattr(storage, "getitems"):
+        return storage.getitems(keys, on_error=on_error)
+    return fetch_items(storage, keys, on_error=on_error, workers=1)
+
+
+def setitems(storage: MutableMapping, mapping):
+    """Writes many items to storage at once, using storage.setitems if it has one"""
+    if not mapping:
+        return
+    if hasattr(storage, "setitems"):
+        storage.setitems(mapping)
+    else:
+        store_items(storage, mapping, workers=1)
+
+
+def delitems(storage: MutableMapping, keys):
+    """Deletes many keys from storage at once, using storage.delitems if it has one
+    Missing keys are skipped
+    """
+    keys = list(keys)
+    if not keys:
+        return
+    if hasattr(storage, "delitems"):
+        storage.delitems(keys)
+    else:
+        remove_items(storage, keys, workers=1)
@@ -10,6 +10,8 @@ from hub.store.s3_storage import S3Storage
 
 
 def save_s3_storage(obj):
+    # Queued uploads belong to this process, they have to land before the copy can see them
+    obj.flush()
     return obj.__class__, (
         obj.s3fs,
         obj.url,
@@ -19,6 +21,11 @@ def save_s3_storage(obj):
         None,
         obj.parallel,
         obj.endpoint_url,
+        obj.aws_region,
+        obj.expiration,
+        obj.write_behind,
+        obj.max_inflight_size,
+        obj.multipart_threshold,
     )
 
 
@@ -0,0 +1,123 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from hub.defaults import (
+    DEFAULT_PARALLEL_REQUESTS,
+    DEFAULT_PREFETCH_CHUNKS,
+    DEFAULT_PREFETCH_MEMORY,
+)
+
+
+def plan_chunk_ranges(indexes, samples_per_chunk, last_index, resident=1):
+    """Returns the (start, stop) ranges of chunks in the order indexes visit them
+    A chunk stays in memory until its last index is visited, or until it is
+    evicted from the resident most recently used chunks
+    """
+    remaining = Counter(index - index % samples_per_chunk for index in indexes)
+    ranges = []
+    active = OrderedDict()
+    for index in indexes:
+        start = index - index % samples_per_chunk
+        if start in active:
+            active.move_to_end(start)
+        else:
+            ranges.append((start, min(start + samples_per_chunk, last_index + 1)))
+            active[start] = True
+            if len(active) > resident:
+                active.popitem(last=False)
+        remaining[start] -= 1
+        if remaining[start] <= 0:
+            del active[start]
+    return ranges
+
+
+class ChunkPrefetcher:
+    """Reads the upcoming ranges of samples of tensors on a thread pool
+
+    fetch(key, start, stop) reads samples start:stop of key, plans maps keys to the (start, stop)
+    ranges in the order they are going to be requested, sample_nbytes maps keys to the estimated
+    size of a sample. Up to depth ranges per key are read ahead, using at most max_memory bytes.
+    Reading ahead only helps if ranges are requested in the planned order. Once a key is
+    requested out of it, like by interleaved DataLoader workers or a shuffling sampler,
+    reads ahead of the key are cancelled and its ranges are read on request from then on.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        plans,
+        sample_nbytes,
+        depth=DEFAULT_PREFETCH_CHUNKS,
+        max_memory=DEFAULT_PREFETCH_MEMORY,
+    ):
+        self._fetch = fetch
+        self._plans = plans
+        self._sample_nbytes = sample_nbytes
+        self._depth = depth
+        self._max_memory = max_memory
+        self._memory = 0
+        self._next = {key: 0 for key in plans}
+        self._pending = {key: deque() for key in plans}
+        self._executor = None
+        if depth > 0 and plans:
+            self._executor = ThreadPoolExecutor(
+                max_workers=min(DEFAULT_PARALLEL_REQUESTS, depth * len(plans))
+            )
+
+    @property
+    def memory(self):
+        """Estimated bytes of the ranges read ahead"""
+        return self._memory
+
+    def _schedule(self, key):
+        plan, pending = self._plans[key], self._pending[key]
+        position = pending[-1][0] + 1 if pending else self._next[key]
+        while len(pending) < self._depth and position < len(plan):
+            start, stop = plan[position]
+            nbytes = (stop - start) * self._sample_nbytes[key]
+            if self._memory + nbytes > self._max_memory:
+                break
+            future = self._executor.submit(self._fetch, key, start, stop)
+            pending.append((position, future, nbytes))
+            self._memory += nbytes
+            position += 1
+
+    def _cancel(self, key):
+        pending = self._pending[key]
+        for _, future, nbytes in pending:
+            future.cancel()
+            self._memory -= nbytes
+        pending.clear()
+
+    def get(self, key, start, stop):
+        """Returns samples start:stop of key and reads ahead the ranges planned after it"""
+        if key not in self._plans:
+            return self._fetch(key, start, stop)
+        plan, position = self._plans[key], self._next[key]
+        if position is None or position >= len(plan) or plan[position] != (start, stop):
+            # Off the plan, the ranges read ahead would most likely not be requested
+            self._cancel(key)
+            self._next[key] = None
+            return self._fetch(key, start, stop)
+        pending = self._pending[key]
+        future = None
+        if pending:
+            future, nbytes = pending.popleft()[1:]
+            self._memory -= nbytes
+        self._next[key] = position + 1
+        if self._executor is not None:
+            self._schedule(key)
+        return future.result() if future else self._fetch(key, start, stop)
+
+    def close(self):
+        if self._executor is not None:
+            for key in self._pending:
+                self._cancel(key)
+            self._executor.shutdown(wait=False)
+            self._executor = None
@@ -0,0 +1,395 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import collections.abc as abc
+import json
+import threading
+import uuid
+
+import numpy as np
+import numcodecs
+import zarr
+
+from hub.defaults import DEFAULT_COMPRESSOR, RAGGED_CHUNK_SIZE
+from hub.exceptions import DynamicTensorNotFoundException, ValueShapeError
+from hub.store.dynamic_tensor import (
+    DynamicTensor,
+    _stored_chunk_keys,
+    get_dynamic_dims,
+)
+from hub.store.nested_store import NestedStore
+from hub.store.parallel import delitems, getitems
+
+RAGGED_META = ".hub.ragged_tensor"
+INDEX_FOLDER = "--ragged-index--"
+# Samples per chunk of the index, also the number of samples written together by transforms
+INDEX_CHUNK = 16
+# Index columns before the sample shape
+CHUNK_ID, OFFSET, NBYTES = 0, 1, 2
+
+
+def _chunk_key(chunk_id: int) -> str:
+    return f"ragged.{chunk_id}"
+
+
+def _get_codec(compressor):
+    if compressor == DEFAULT_COMPRESSOR:
+        return numcodecs.LZ4()
+    if compressor is not None and not isinstance(compressor, numcodecs.abc.Codec):
+        raise ValueError(f"Compressor {compressor} is not supported by ragged tensors")
+    if isinstance(compressor, numcodecs.abc.Codec) and compressor.codec_id not in (
+        "lz4",
+        "zstd",
+        "blosc",
+        "zlib",
+    ):
+        raise ValueError(
+            f"Compressor {compressor.codec_id} is not supported by ragged tensors"
+        )
+    return compressor
+
+
+class RaggedTensor(DynamicTensor):
+    """Class for handling tensor with samples of different shapes without padding them
+
+    Every sample is compressed on its own and appended to a chunk, chunks are closed once they reach chunk_size bytes.
+    Index keeps chunk id, offset, size in bytes and shape of every sample.
+    Overwritten samples are appended again, old bytes stay in their chunk.
+    """
+
+    def __init__(
+        self,
+        fs_map,
+        mode: str = "r",
+        shape=None,
+        max_shape=None,
+        dtype="float64",
+        chunks=None,
+        compressor=DEFAULT_COMPRESSOR,
+        chunk_size=RAGGED_CHUNK_SIZE,
+        chunk_layout=None,
+    ):
+        """Constructor
+        Parameters
+        ----------
+        fs_map : MutableMap
+            Maps filesystem to MutableMap
+        mode : str
+            Mode in which tensor is opened (default is "r"), can be used to overwrite or append
+        shape : Tuple[int | None]
+            Shape of tensor, (must be specified) can contains Nones meaning the shape might change
+        max_shape: Tuple[int | None]
+            Maximum possible shape of the tensor (must be specified)
+        dtype : str
+            Numpy analog dtype for this tensor
+        chunks, chunk_layout :
+            Ignored, samples are packed into chunks of chunk_size bytes
+        chunk_size : int
+            Size of chunks in bytes
+        """
+        self.fs_map = fs_map
+        exist_ = fs_map.get(RAGGED_META)
+        exist = False if "w" in mode else exist_ is not None
+        if "r" in mode and not exist:
+            raise DynamicTensorNotFoundException()
+        index_store = NestedStore(fs_map, INDEX_FOLDER)
+        if ("r" in mode or "a" in mode) and exist:
+            meta = json.loads(exist_.decode("utf-8"))
+            shape = tuple(meta["shape"])
+            max_shape = tuple(meta["max_shape"])
+            dtype = meta["dtype"]
+            chunk_size = meta["chunk_size"]
+            self._codec = meta["codec"] and numcodecs.get_codec(meta["codec"])
+            self._index = zarr.open_array(index_store, mode=mode)
+        else:
+            if shape is None:
+                raise TypeError("shape cannot be none")
+            shape = tuple(shape)
+            max_shape = tuple(max_shape or shape)
+            if np.dtype(dtype) == np.dtype("O"):
+                raise ValueError("Ragged tensors can't store objects")
+            self._codec = _get_codec(compressor)
+            self._index = zarr.zeros(
+                (max_shape[0], NBYTES + len(shape)),
+                dtype="int64",
+                chunks=(INDEX_CHUNK, NBYTES + len(shape)),
+                store=index_store,
+                overwrite=("w" in mode),
+                compressor=None,
+            )
+            fs_map[RAGGED_META] = bytes(
+                json.dumps(
+                    {
+                        "shape": shape,
+                        "max_shape": max_shape,
+                        "dtype": np.dtype(dtype).str,
+                        "chunk_size": chunk_size,
+                        "codec": self._codec and self._codec.get_config(),
+                    }
+                ),
+                "utf-8",
+            )
+        self.shape = shape
+        self.max_shape = max_shape
+        self.dtype = np.dtype(dtype)
+        self.chunks = (INDEX_CHUNK,) + tuple(max_shape[1:])
+        self._chunk_size = chunk_size
+        self._dynamic_dims = get_dynamic_dims(shape)
+        self._enabled_dynamicness = True
+        # Chunk samples are currently appended to, (chunk id, bytes)
+        self._open_chunk = None
+        self._append_lock = threading.Lock()
+
+    @property
+    def _dynamic_tensor(self):
+        # Makes inherited code treat this tensor as dynamic
+        return self._index
+
+    def _sample_index(self, index: int) -> int:
+        size = self.shape[0]
+        if not -size <= index < size:
+            raise IndexError(f"index {index} is out of bounds for {size} samples")
+        return index + size if index < 0 else index
+
+    def _rows(self, samples):
+        if isinstance(samples, int):
+            samples = self._sample_index(samples)
+            return self._index[samples : samples + 1]
+        if isinstance(samples, slice):
+            return self._index[samples]
+        samples = [self._sample_index(int(index)) for index in samples]
+        return self._index.get_orthogonal_selection((samples, slice(None)))
+
+    def _shapes(self, rows):
+        shapes = rows[:, NBYTES + 1 :].copy()
+        # Samples that were never written have zeros in static dims as well
+        for i, dim in enumerate(self.shape[1:]):
+            if dim is not None:
+                shapes[:, i] = dim
+        return shapes
+
+    def get_real_shape(self, slice_):
+        slice_ = [slice_] if isinstance(slice_, int) else slice_
+        shapes = self._shapes(self._rows(slice_[0]))
+        return shapes[0] if isinstance(slice_[0], int) else list(shapes)
+
+    def get_shape_samples(self, samples):
+        """Gets full shape of sample(s)"""
+        shapes = self._shapes(self._rows(samples))
+        return shapes[0] if isinstance(samples, int) else shapes
+
+    def _fetch_chunks(self, chunk_ids) -> dict:
+        chunks = {}
+        if self._open_chunk is not None and self._open_chunk[0] in chunk_ids:
+            chunks[self._open_chunk[0]] = self._open_chunk[1]
+        keys = [_chunk_key(c) for c in chunk_ids if c not in chunks]
+        items = getitems(self.fs_map, keys, on_error="omit")
+        for chunk_id in chunk_ids:
+            if _chunk_key(chunk_id) in items:
+                chunks[chunk_id] = memoryview(items[_chunk_key(chunk_id)]).cast("B")
+        return chunks
+
+    def _decode_samples(self, rows) -> list:
+        chunk_ids = {int(c) for c in rows[:, CHUNK_ID] if c}
+        chunks = self._fetch_chunks(chunk_ids)
+        shapes = self._shapes(rows)
+        samples = []
+        for row, shape in zip(rows, shapes):
+            chunk_id, offset, nbytes = (int(x) for x in row[: NBYTES + 1])
+            if not chunk_id:
+                samples.append(np.zeros(shape, dtype=self.dtype))
+                continue
+            data = chunks[chunk_id][offset : offset + nbytes]
+            if self._codec is not None:
+                data = self._codec.decode(data)
+            samples.append(np.frombuffer(data, dtype=self.dtype).reshape(shape))
+        return samples
+
+    def _sample_range(self, samples: slice):
+        start, stop, step = samples.indices(self.shape[0])
+        if step != 1:
+            raise ValueError("Ragged tensors don't support slicing with step")
+        return start, stop
+
+    def __getitem__(self, slice_):
+        """Gets a slice or slices from tensor"""
+        if not isinstance(slice_, abc.Iterable):
+            slice_ = [slice_]
+        slice_ = list(slice_)
+        rest = tuple(slice_[1:])
+        if isinstance(slice_[0], int):
+            return self._decode_samples(self._rows(slice_[0]))[0][rest]
+        start, stop = self._sample_range(slice_[0])
+        samples = self._decode_samples(self._index[start:stop])
+        return [sample[rest] for sample in samples]
+
+    def gather(self, indexes, slice_=()):
+        """Gets samples at indexes (list of ints), each one sliced by slice_"""
+        rest = tuple(slice_)
+        samples = self._decode_samples(self._rows(indexes)) if indexes else []
+        return [sample[rest] for sample in samples]
+
+    def _append(self, data: bytes):
+        """Appends encoded sample to the open chunk, returns its chunk id and offset"""
+        with self._append_lock:
+            if self._open_chunk is not None:
+                chunk_id, buffer = self._open_chunk
+                if len(buffer) + len(data) > self._chunk_size:
+                    self.fs_map[_chunk_key(chunk_id)] = bytes(buffer)
+                    self._open_chunk = None
+            if self._open_chunk is None:
+                # Random ids keep chunks of concurrent writers apart
+                self._open_chunk = (uuid.uuid4().int >> 65, bytearray())
+            chunk_id, buffer = self._open_chunk
+            offset = len(buffer)
+            buffer += data
+            return chunk_id, offset
+
+    def _merge(self, current, slice_, value):
+        """Writes value into slice_ of current sample, growing it if needed"""
+        shape = list(current.shape)
+        for i, sl in enumerate(slice_):
+            if isinstance(sl, int) and sl >= 0:
+                shape[i] = max(shape[i], sl + 1)
+            elif isinstance(sl, slice) and sl.stop is not None and sl.stop > 0:
+                shape[i] = max(shape[i], sl.stop)
+        sample = np.zeros(shape, dtype=self.dtype)
+        sample[tuple(slice(0, dim) for dim in current.shape)] = current
+        sample[tuple(slice_)] = value
+        return sample
+
+    def _encode(self, sample):
+        sample = np.ascontiguousarray(sample, dtype=self.dtype)
+        if sample.ndim != len(self.shape) - 1 or any(
+            dim > max_dim or (fixed is not None and dim != fixed)
+            for dim, max_dim, fixed in zip(
+                sample.shape, self.max_shape[1:], self.shape[1:]
+            )
+        ):
+            raise ValueShapeError(self.shape[1:], sample.shape)
+        data = sample.tobytes()
+        if self._codec is not None:
+            data = self._codec.encode(data)
+        return bytes(data), sample.shape
+
+    def __setitem__(self, slice_, value):
+        """Sets a slice or slices with a value"""
+        if not isinstance(slice_, abc.Iterable):
+            slice_ = [slice_]
+        slice_ = list(slice_)
+        if isinstance(slice_[0], int):
+            start, stop = slice_[0], slice_[0] + 1
+            values = [value]
+        else:
+            start, stop = self._sample_range(slice_[0])
+            values = list(value)
+            if len(values) != stop - start:
+                raise ValueShapeError((stop - start,), (len(values),))
+        rows = self._index[start:stop]
+        if slice_[1:]:
+            current = self._decode_samples(rows)
+            values = [
+                self._merge(sample, slice_[1:], v) for sample, v in zip(current, values)
+            ]
+        for row, sample in zip(rows, values):
+            data, shape = self._encode(sample)
+            chunk_id, offset = self._append(data)
+            row[: NBYTES + 1] = chunk_id, offset, len(data)
+            row[NBYTES + 1 :] = shape
+        self._index[start:stop] = rows
+
+    def set_shape(self, slice_, value):
+        """Shapes of ragged samples are stored when they are written"""
+
+    def set_dynamic_shape(self, slice_, shape):
+        """Shapes of ragged samples are stored when they are written"""
+
+    def set_dynamic_shapes(self, slices, shapes):
+        """Shapes of ragged samples are stored when they are written"""
+
+    def get_shape_from_value(self, slice_, value):
+        if isinstance(slice_[0], int):
+            return np.array(np.shape(value))
+        return [np.array(np.shape(v)) for v in value]
+
+    def resize_shape(self, size: int) -> None:
+        """Changes number of samples"""
+        self.shape = (size,) + self.shape[1:]
+        self.max_shape = (size,) + self.max_shape[1:]
+        self._index.resize(size, self._index.shape[1])
+        meta = json.loads(self.fs_map[RAGGED_META].decode("utf-8"))
+        meta["shape"], meta["max_shape"] = self.shape, self.max_shape
+        self.fs_map[RAGGED_META] = bytes(json.dumps(meta), "utf-8")
+
+    @property
+    def chunksize(self):
+        return self.chunks
+
+    def vacuum(self) -> int:
+        """Deletes chunks without samples and rewrites chunks taken mostly by overwritten samples
+        Returns number of deleted chunks
+        """
+        self.flush()
+        open_id = self._open_chunk[0] if self._open_chunk is not None else None
+        stored = {
+            int(key[len("ragged.") :])
+            for key in _stored_chunk_keys(self.fs_map)
+            if key.startswith("ragged.")
+        }
+        stored.discard(open_id)
+        rows = self._index[:]
+        live = rows[rows[:, CHUNK_ID] != 0]
+        ids, inverse = np.unique(live[:, CHUNK_ID], return_inverse=True)
+        live_bytes = np.bincount(inverse, weights=live[:, NBYTES], minlength=len(ids))
+        # Overwritten samples are dead bytes before the end of the last live sample
+        ends = np.zeros(len(ids), dtype="int64")
+        np.maximum.at(ends, inverse, live[:, OFFSET] + live[:, NBYTES])
+        sparse = {
+            int(chunk_id)
+            for chunk_id, used, end in zip(ids, live_bytes, ends)
+            if int(chunk_id) in stored and used < end / 2
+        }
+        if sparse:
+            moved = np.flatnonzero(np.isin(rows[:, CHUNK_ID], list(sparse)))
+            chunks = self._fetch_chunks(sparse)
+            for i in moved:
+                chunk_id, offset, nbytes = (int(x) for x in rows[i, : NBYTES + 1])
+                data = bytes(chunks[chunk_id][offset : offset + nbytes])
+                rows[i, CHUNK_ID], rows[i, OFFSET] = self._append(data)
+            self._index.set_orthogonal_selection((moved, slice(None)), rows[moved])
+            # Moved samples are stored before their old chunks are deleted
+            self.flush()
+        referenced = set(ids.tolist()) - sparse
+        stale = [_chunk_key(chunk_id) for chunk_id in stored - referenced]
+        delitems(self.fs_map, stale)
+        return len(stale)
+
+    def _write_open_chunk(self):
+        # Open chunk is written as it is and rewritten once more samples are appended
+        with self._append_lock:
+            if self._open_chunk is not None:
+                chunk_id, buffer = self._open_chunk
+                self.fs_map[_chunk_key(chunk_id)] = bytes(buffer)
+
+    def flush(self):
+        self._write_open_chunk()
+        self.fs_map.flush()
+
+    def close(self):
+        self.flush()
+        self.fs_map.close()
+
+    def __getstate__(self):
+        # Copies must not append to the same chunk, each one starts a new chunk
+        self._write_open_chunk()
+        self._open_chunk = None
+        state = dict(super().__getstate__())
+        del state["_append_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._append_lock = threading.Lock()
@@ -11,11 +11,13 @@ from zarr import MemoryStore
 
 
 class S3FileSystemReplacement(S3FileSystem):
-    def __init__(self, *args, expiration=None, **kwargs):
+    def __init__(self, *args, expiration=None, write_behind=False, **kwargs):
+        """write_behind -> if True, datasets upload chunks in the background, see S3Storage"""
         super().__init__(*args, **kwargs)
         self._args = args
         self._kwargs = kwargs
         self.expiration = expiration
+        self.write_behind = write_behind
 
     def get_mapper(self, root: str, check=False, create=False):
         root = "s3://" + root
@@ -31,4 +33,5 @@ class S3FileSystemReplacement(S3FileSystem):
             aws_region=aws_region,
             endpoint_url=endpoint_url,
             expiration=self.expiration,
+            write_behind=self.write_behind,
         )
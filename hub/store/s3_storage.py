@@ -5,19 +5,58 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 """
 
 from collections.abc import MutableMapping
+import io
 import posixpath
 
 import boto3
 import botocore
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
 from s3fs import S3FileSystem
 
 from hub.exceptions import S3Exception
 from hub.log import logger
 from hub.client.hub_control import HubControlClient
+from hub.store.lru_cache import BackgroundWriter
+from hub.store.parallel import fetch_items, store_items
 import time
 
 
+class _BufferReader(io.RawIOBase):
+    """Read-only file object over a buffer, lets boto3 upload memoryviews and arrays without copying them"""
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._buffer) - self._pos)
+        b[:n] = self._buffer[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self._pos = offset
+        elif whence == io.SEEK_CUR:
+            self._pos += offset
+        else:
+            self._pos = len(self._buffer) + offset
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def __len__(self):
+        return len(self._buffer)
+
+
 class S3Storage(MutableMapping):
     def __init__(
         self,
@@ -31,7 +70,17 @@ class S3Storage(MutableMapping):
         endpoint_url=None,
         aws_region=None,
         expiration=None,
+        write_behind=False,
+        max_inflight_size=2 ** 28,
+        multipart_threshold=2 ** 25,
     ):
+        """MutableMapping over objects under url
+        write_behind -> if True, writes are uploaded by a pool of `parallel` threads and
+            only waited for in flush()/close(). Errors of failed uploads are raised by
+            the next write, flush() or close()
+        max_inflight_size -> maximum number of bytes queued or being uploaded in write_behind mode
+        multipart_threshold -> objects of this size or bigger are uploaded in parts concurrently
+        """
         self.s3fs = s3fs
         self.root = {}
         self.url = url
@@ -48,6 +97,19 @@ class S3Storage(MutableMapping):
             self.path = "/".join(url.split("/")[5:])
         self.bucketpath = posixpath.join(self.bucket, self.path)
         self.protocol = "object"
+        self.write_behind = write_behind
+        self.max_inflight_size = max_inflight_size
+        self.multipart_threshold = multipart_threshold
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=max(multipart_threshold // 4, 5 * 2 ** 20),
+            max_concurrency=parallel,
+        )
+        self._writer = (
+            BackgroundWriter(self, max_inflight_size, workers=parallel, write=self._put)
+            if write_behind
+            else None
+        )
 
         self.client_config = botocore.config.Config(
             max_pool_connections=parallel,
@@ -96,11 +158,23 @@ class S3Storage(MutableMapping):
                 region_name=self.aws_region,
             )
 
-    def __setitem__(self, path, content):
+    def _put(self, path, content):
         self.check_update_creds()
         try:
             path = posixpath.join(self.path, path)
-            content = bytearray(memoryview(content))
+            if not isinstance(content, (bytes, bytearray)):
+                content = _BufferReader(content)
+            if len(content) >= self.multipart_threshold:
+                self.client.upload_fileobj(
+                    content
+                    if isinstance(content, _BufferReader)
+                    else io.BytesIO(content),
+                    self.bucket,
+                    path,
+                    ExtraArgs={"ContentType": "application/octet-stream"},
+                    Config=self.transfer_config,
+                )
+                return
             attrs = {
                 "Bucket": self.bucket,
                 "Body": content,
@@ -113,7 +187,36 @@ class S3Storage(MutableMapping):
             logger.error(err)
             raise S3Exception(err)
 
+    def __setitem__(self, path, content):
+        if self._writer is not None:
+            self._writer.raise_error()
+            self._writer.put(path, content)
+        else:
+            self._put(path, content)
+
+    def flush(self):
+        """Waits for queued uploads, raises S3Exception if any of them failed"""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
     def __getitem__(self, path):
+        return self.get_with_info(path)[0]
+
+    def get_with_info(self, path):
+        """Returns the object and the dict with its size and etag"""
+        if self._writer is not None:
+            try:
+                content = self._writer.get(path)
+                return content, {
+                    "size": len(memoryview(content).cast("B")),
+                    "etag": None,
+                }
+            except KeyError:
+                pass
         self.check_update_creds()
         try:
             path = posixpath.join(self.path, path)
@@ -122,7 +225,7 @@ class S3Storage(MutableMapping):
                 Key=path,
             )
             x = resp["Body"].read()
-            return x
+            return x, {"size": len(x), "etag": resp.get("ETag")}
         except ClientError as err:
             if err.response["Error"]["Code"] == "NoSuchKey":
                 raise KeyError(err)
@@ -132,7 +235,66 @@ class S3Storage(MutableMapping):
             logger.error(err)
             raise S3Exception(err)
 
+    def info(self, path):
+        """Returns the dict with size and etag of the object without downloading it"""
+        if self._writer is not None and path in self._writer:
+            return None
+        self.check_update_creds()
+        try:
+            path = posixpath.join(self.path, path)
+            resp = self.client.head_object(
+                Bucket=self.bucket,
+                Key=path,
+            )
+            return {"size": resp["ContentLength"], "etag": resp.get("ETag")}
+        except ClientError as err:
+            if err.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                raise KeyError(err)
+            else:
+                raise
+        except Exception as err:
+            logger.error(err)
+            raise S3Exception(err)
+
+    def getitems(self, paths, on_error="omit"):
+        """Downloads many objects concurrently using up to self.parallel connections"""
+        return fetch_items(self, paths, on_error=on_error, workers=self.parallel)
+
+    def setitems(self, mapping):
+        """Uploads many objects concurrently using up to self.parallel connections"""
+        if self._writer is not None:
+            for path, content in mapping.items():
+                self._writer.put(path, content)
+        else:
+            store_items(self, mapping, workers=self.parallel)
+
+    def delitems(self, paths):
+        """Deletes many objects, up to 1000 with a single request"""
+        paths = list(paths)
+        if self._writer is not None:
+            for path in paths:
+                self._writer.discard(path)
+        self.check_update_creds()
+        for i in range(0, len(paths), 1000):
+            try:
+                # Missing keys are not reported as errors by S3
+                self.client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={
+                        "Objects": [
+                            {"Key": posixpath.join(self.path, path)}
+                            for path in paths[i : i + 1000]
+                        ],
+                        "Quiet": True,
+                    },
+                )
+            except Exception as err:
+                logger.error(err)
+                raise S3Exception(err)
+
     def __delitem__(self, path):
+        if self._writer is not None:
+            self._writer.discard(path)
         self.check_update_creds()
         try:
             path = posixpath.join(self.bucketpath, path)
@@ -142,10 +304,25 @@ class S3Storage(MutableMapping):
             raise S3Exception(err)
 
     def __len__(self):
+        return sum(1 for _ in self)
+
+    def iter_keys(self, page_size=1000):
+        """Yields keys of all stored objects, listing them page_size at a time"""
         self.check_update_creds()
-        return len(self.s3fs.ls(self.bucketpath, detail=False, refresh=True))
+        prefix = self.path.rstrip("/") + "/" if self.path else ""
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(
+            Bucket=self.bucket,
+            Prefix=prefix,
+            PaginationConfig={"PageSize": page_size},
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                yield item["Key"][len(prefix) :]
 
     def __iter__(self):
-        self.check_update_creds()
-        items = self.s3fs.ls(self.bucketpath, detail=False, refresh=True)
-        yield from [item[len(self.bucketpath) + 1 :] for item in items]
+        pending = set(self._writer.keys()) if self._writer is not None else set()
+        for key in self.iter_keys():
+            pending.discard(key)
+            yield key
+        yield from sorted(pending)
@@ -10,7 +10,13 @@ import math
 
 import numpy as np
 
-from hub.defaults import CHUNK_DEFAULT_SIZE, OBJECT_CHUNK, DEFAULT_COMPRESSOR
+from hub.defaults import (
+    CHUNK_DEFAULT_SIZE,
+    OBJECT_CHUNK,
+    DEFAULT_COMPRESSOR,
+    MAX_RAW_CHUNK_SIZE,
+    STORED_CHUNK_SIZE,
+)
 from hub.exceptions import HubException
 
 
@@ -26,16 +32,23 @@ class ShapeDetector:
         chunksize=CHUNK_DEFAULT_SIZE,
         object_chunking=OBJECT_CHUNK,
         compressor=DEFAULT_COMPRESSOR,
+        chunk_layout="auto",
     ):
         self._int32max = np.iinfo(np.dtype("int32")).max
 
         self._dtype = dtype = np.dtype(dtype)
         self._object_chunking = object_chunking
         self._compressor = compressor
+        if chunk_layout not in ("sample", "tile", "auto"):
+            raise ValueError(
+                f"chunk_layout should be 'sample', 'tile' or 'auto', got {chunk_layout}"
+            )
+        self._chunk_layout = chunk_layout
 
         self._chunksize = chunksize = self._get_chunksize(chunksize, compressor)
         self._shape = shape = self._get_shape(shape)
         self._max_shape = max_shape = self._get_max_shape(shape, max_shape)
+        self._auto_chunks = chunks is None
         self._chunks = chunks = self._get_chunks(
             shape, max_shape, chunks, dtype, chunksize
         )
@@ -85,6 +98,8 @@ class ShapeDetector:
             prod = _tuple_product(max_shape[1:])
             if dtype == "object":
                 return (self._object_chunking,) + max_shape[1:]
+            if self._is_tiled(max_shape[1:], dtype, chunksize):
+                return (1,) + self._determine_tiles(max_shape[1:], dtype, chunksize)
             if prod <= 2 * chunksize:
                 # FIXME not properly handled object type, U type, and so on.
                 sz = dtype.itemsize
@@ -121,6 +136,24 @@ class ShapeDetector:
                     )
                 return chunks
 
+    def _is_tiled(self, sample_shape, dtype, chunksize):
+        sample_size = _tuple_product(sample_shape) * dtype.itemsize
+        if self._chunk_layout == "tile":
+            return sample_size > chunksize
+        elif self._chunk_layout == "auto":
+            return len(sample_shape) >= 2 and sample_size > 2 * chunksize
+        return False
+
+    def _determine_tiles(self, sample_shape, dtype, chunksize):
+        """Splits sample into tiles of at most chunksize bytes by halving its largest dimension
+        Tile sides are powers of 2, so crops of any sample touch as few tiles as possible
+        """
+        tile = list(sample_shape)
+        while _tuple_product(tile) * dtype.itemsize > chunksize:
+            dim = tile.index(max(tile))
+            tile[dim] = 2 ** (math.ceil(math.log2(tile[dim])) - 1)
+        return tuple(tile)
+
     def _determine_chunksizes(self, max_shape, dtype, chunksize):
         """
         Autochunking of tensors
@@ -164,6 +197,39 @@ class ShapeDetector:
             chunksize = [1] * (len(max_shape) - len(chunksize)) + chunksize
         return tuple(chunksize)
 
+    @property
+    def adaptive(self) -> bool:
+        """True if samples per chunk were guessed from the uncompressed size
+        and can be adapted once compression of real data is measured
+        """
+        return (
+            self._auto_chunks
+            and self._chunks[0] > 1
+            and self._dtype != "object"
+            and self._compressor is not None
+            and not isinstance(self._compressor, PngCodec)
+        )
+
+    def adapt_chunks(self, stored_sample_size: float, target=STORED_CHUNK_SIZE):
+        """Picks number of samples per chunk so that stored (compressed) chunks are about target bytes
+
+        Parameters
+        ----------
+        stored_sample_size: float
+            Measured size of a compressed sample in bytes
+        target: int
+            Size of stored chunks to aim for
+        """
+        raw_sample_size = _tuple_product(self._max_shape[1:]) * self._dtype.itemsize
+        samples = target / max(stored_sample_size, 1)
+        # Chunks are decompressed whole, so their size in memory is limited too
+        samples = min(samples, MAX_RAW_CHUNK_SIZE / max(raw_sample_size, 1))
+        # Chunks longer than the tensor would only be rewritten in full on every write
+        samples = min(samples, 2 ** math.ceil(math.log2(max(self._shape[0], 1))))
+        samples = max(int(samples), self._chunks[0])
+        self._chunks = self.closest_power_of_2((samples,) + self._chunks[1:])
+        return self._chunks
+
     @property
     def shape(self):
         return self._shape
@@ -0,0 +1,185 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from hashlib import blake2b
+import json
+import multiprocessing
+import os
+import secrets
+import weakref
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python < 3.8
+    shared_memory = None
+
+HEADER_SIZE = 256
+# Ledger of cached chunks: a tick counter followed by one entry per chunk
+_ENTRY = np.dtype([("digest", "<u8"), ("nbytes", "<i8"), ("tick", "<i8")])
+
+
+def _digest(key) -> int:
+    digest = blake2b(repr(key).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _unlink(name: str):
+    try:
+        segment = shared_memory.SharedMemory(name)
+    except FileNotFoundError:
+        return
+    segment.close()
+    segment.unlink()
+
+
+def _entries(buf, max_entries: int):
+    return np.ndarray((max_entries,), _ENTRY, buffer=buf, offset=8)
+
+
+def _release(ledger, prefix: str, max_entries: int, owner_pid: int):
+    """Removes all cached chunks and the ledger, only in the process that created them"""
+    if os.getpid() != owner_pid:
+        return
+    digests = _entries(ledger.buf, max_entries)["digest"].tolist()
+    for digest in digests:
+        if digest:
+            _unlink(f"{prefix}_{digest:016x}")
+    ledger.close()
+    ledger.unlink()
+
+
+class SharedChunkCache:
+    """Cache of decoded chunks shared by the processes of one host, like DataLoader workers
+
+    Each chunk is kept in its own multiprocessing.shared_memory segment, named after its key.
+    A shared ledger keeps the size and the last use of every segment, any process adding
+    a chunk evicts the least recently used ones to stay within max_size bytes.
+    Segments are removed on close() or exit of the process which created the cache.
+    """
+
+    def __init__(self, max_size: int, max_entries: int = 4096):
+        if shared_memory is None:
+            raise RuntimeError("SharedChunkCache requires python 3.8 or newer")
+        self._prefix = "hub" + secrets.token_hex(4)
+        self._max_size = max_size
+        self._max_entries = max_entries
+        # Locks of the spawn context can be passed to processes started by any method
+        self._lock = multiprocessing.get_context("spawn").Lock()
+        self._ledger = shared_memory.SharedMemory(
+            self._prefix, create=True, size=8 + max_entries * _ENTRY.itemsize
+        )
+        self._finalizer = weakref.finalize(
+            self, _release, self._ledger, self._prefix, max_entries, os.getpid()
+        )
+
+    def __getstate__(self):
+        # Processes started with spawn attach the ledger again
+        return {
+            "_prefix": self._prefix,
+            "_max_size": self._max_size,
+            "_max_entries": self._max_entries,
+            "_lock": self._lock,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._ledger = None
+        self._finalizer = None
+
+    def _get_ledger(self):
+        if self._ledger is None:
+            self._ledger = shared_memory.SharedMemory(self._prefix)
+        buf = self._ledger.buf
+        return np.ndarray((1,), "<i8", buffer=buf), _entries(buf, self._max_entries)
+
+    def _name(self, digest: int) -> str:
+        return f"{self._prefix}_{digest:016x}"
+
+    def get(self, key):
+        """Returns a copy of the array cached under key, None if it is not cached"""
+        digest = _digest(key)
+        with self._lock:
+            tick, entries = self._get_ledger()
+            found = np.flatnonzero(entries["digest"] == digest)
+            if not len(found):
+                return None
+            tick[0] += 1
+            entries["tick"][found[0]] = tick[0]
+            try:
+                segment = shared_memory.SharedMemory(self._name(digest))
+            except FileNotFoundError:
+                return None
+        try:
+            meta = json.loads(bytes(segment.buf[:HEADER_SIZE]).decode("utf-8"))
+            return np.ndarray(
+                meta["shape"], meta["dtype"], buffer=segment.buf, offset=HEADER_SIZE
+            ).copy()
+        finally:
+            segment.close()
+
+    def put(self, key, value):
+        """Caches a copy of value, only numpy arrays without objects are cached"""
+        if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+            return
+        header = json.dumps({"dtype": value.dtype.str, "shape": value.shape})
+        header = header.encode("utf-8").ljust(HEADER_SIZE)
+        nbytes = HEADER_SIZE + value.nbytes
+        if len(header) > HEADER_SIZE or nbytes > self._max_size:
+            return
+        digest = _digest(key)
+        try:
+            segment = shared_memory.SharedMemory(
+                self._name(digest), create=True, size=nbytes
+            )
+        except FileExistsError:
+            # Cached or being cached by another process
+            return
+        try:
+            segment.buf[:HEADER_SIZE] = header
+            np.ndarray(
+                value.shape, value.dtype, buffer=segment.buf, offset=HEADER_SIZE
+            )[...] = value
+            # Readers find the chunk only once it is in the ledger, after it was written
+            with self._lock:
+                added = self._add_entry(digest, nbytes)
+        finally:
+            segment.close()
+        if not added:
+            segment.unlink()
+
+    def _add_entry(self, digest: int, nbytes: int) -> bool:
+        tick, entries = self._get_ledger()
+        free = entries["digest"] == 0
+        size = int(entries["nbytes"].sum())
+        while size + nbytes > self._max_size or not free.any():
+            used = np.flatnonzero(~free)
+            if not len(used):
+                return False
+            victim = used[np.argmin(entries["tick"][used])]
+            _unlink(self._name(int(entries["digest"][victim])))
+            size -= int(entries["nbytes"][victim])
+            entries[victim] = (0, 0, 0)
+            free[victim] = True
+        tick[0] += 1
+        entries[np.flatnonzero(free)[0]] = (digest, nbytes, tick[0])
+        return True
+
+    @property
+    def size(self) -> int:
+        """Bytes taken by cached chunks"""
+        with self._lock:
+            return int(self._get_ledger()[1]["nbytes"].sum())
+
+    def close(self):
+        """Removes all cached chunks if called by the process which created the cache"""
+        if self._finalizer is not None:
+            self._finalizer()
+        elif self._ledger is not None:
+            self._ledger.close()
+            self._ledger = None
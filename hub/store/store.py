@@ -16,7 +16,10 @@ import fsspec
 import gcsfs
 import zarr
 
-from hub.store.lru_cache import LRUCache
+from hub.store.lru_cache import LRUCache, ShardedLRUCache
+from hub.store.disk_cache import DiskLRUCache, getitems_with_info
+from hub.store.parallel import fetch_items, remove_items, store_items
+from hub.defaults import DEFAULT_PARALLEL_REQUESTS
 from hub.client.hub_control import HubControlClient
 from hub.store.azure_fs import AzureBlobFileSystem
 from hub.store.s3_file_system_replacement import S3FileSystemReplacement
@@ -140,10 +143,23 @@ def get_cache_path(path, cache_folder="~/.activeloop/cache/"):
     return os.path.expanduser(posixpath.join(cache_folder, path))
 
 
-def get_storage_map(fs, path, memcache=2 ** 26, lock=True, storage_cache=2 ** 28):
+def _is_local(fs) -> bool:
+    protocol = fs.protocol if isinstance(fs.protocol, (tuple, list)) else (fs.protocol,)
+    return "file" in protocol
+
+
+def get_storage_map(
+    fs, path, memcache=2 ** 26, lock=True, storage_cache=2 ** 28, cache_shards=1
+):
     store = _get_storage_map(fs, path)
+    # Local datasets are already on disk, caching them there again is pointless
+    if storage_cache and storage_cache > 0 and not _is_local(fs):
+        store = DiskLRUCache(get_cache_path(path), store, storage_cache, lock=lock)
     if memcache and memcache > 0:
-        store = LRUCache(zarr.MemoryStore(), store, memcache)
+        if cache_shards > 1:
+            store = ShardedLRUCache(store, memcache, shards=cache_shards)
+        else:
+            store = LRUCache(zarr.MemoryStore(), store, memcache, lock=lock)
     return store
 
 
@@ -151,31 +167,126 @@ class StorageMapWrapperWithCommit(MutableMapping):
     def __init__(self, map):
         self._map = map
         self.root = self._map.root
+        # Keys listed from the storage, kept up to date with writes and deletes made through this map
+        # until the next flush, so changes made by others show up after flush, commit or checkout
+        self._listing = None
 
     def __getitem__(self, slice_):
         return self._map[slice_]
 
     def __setitem__(self, slice_, value):
         self._map[slice_] = value
+        if self._listing is not None:
+            self._listing[slice_] = None
 
     def __delitem__(self, slice_):
         del self._map[slice_]
+        if self._listing is not None:
+            self._listing.pop(slice_, None)
+
+    def invalidate_listing(self):
+        """Makes the next len() or iteration list the storage again, needed if it was changed by someone else"""
+        self._listing = None
+
+    def iter_keys(self, page_size=1000):
+        """Yields keys straight from the storage without keeping them in memory"""
+        if hasattr(self._map, "iter_keys"):
+            yield from self._map.iter_keys(page_size=page_size)
+        else:
+            yield from self._map
+
+    def _get_listing(self) -> dict:
+        if self._listing is None:
+            self._listing = dict.fromkeys(self.iter_keys())
+        return self._listing
 
     def __len__(self):
-        return len(self._map)
+        return len(self._get_listing())
 
     def __iter__(self):
-        yield from self._map
+        yield from list(self._get_listing())
+
+    def _has_batch_api(self):
+        # fsspec maps of synchronous filesystems fetch keys one by one
+        if isinstance(self._map, fsspec.FSMap):
+            return getattr(self._map.fs, "async_impl", False)
+        return hasattr(self._map, "getitems")
+
+    def _workers(self):
+        # Local reads are cheap enough that threads only add overhead
+        fs = getattr(self._map, "fs", None)
+        return 1 if fs is not None and _is_local(fs) else DEFAULT_PARALLEL_REQUESTS
+
+    def getitems(self, keys, on_error="omit"):
+        """Reads many keys at once, concurrently if possible"""
+        if self._has_batch_api():
+            return self._map.getitems(keys, on_error=on_error)
+        return fetch_items(self._map, keys, on_error=on_error, workers=self._workers())
+
+    def setitems(self, mapping):
+        """Writes many items at once, concurrently if possible"""
+        if self._has_batch_api():
+            self._map.setitems(mapping)
+        else:
+            store_items(self._map, mapping, workers=self._workers())
+        if self._listing is not None:
+            self._listing.update(dict.fromkeys(mapping))
+
+    def delitems(self, keys):
+        """Deletes many keys at once, concurrently if possible, missing keys are skipped"""
+        keys = list(keys)
+        if self._has_batch_api() and hasattr(self._map, "delitems"):
+            self._map.delitems(keys)
+        else:
+            remove_items(self._map, keys, workers=self._workers())
+        if self._listing is not None:
+            for key in keys:
+                self._listing.pop(key, None)
+
+    def get_with_info(self, slice_):
+        """Returns the item and the dict with its size and etag"""
+        if hasattr(self._map, "get_with_info"):
+            return self._map.get_with_info(slice_)
+        result = self._map[slice_]
+        return result, {"size": len(result), "etag": None}
+
+    def getitems_with_info(self, keys):
+        """Returns dict of the items and dict of their sizes and etags, missing keys are left out"""
+        if hasattr(self._map, "get_with_info"):
+            return getitems_with_info(self._map, keys)
+        # Batch reads of other backends don't report etags
+        items = self.getitems(keys)
+        return items, {
+            key: {"size": len(value), "etag": None} for key, value in items.items()
+        }
+
+    def info(self, slice_):
+        """Returns the dict with size and etag of the item, None if the backend can't tell"""
+        if hasattr(self._map, "info"):
+            return self._map.info(slice_)
+        fs = getattr(self._map, "fs", None)
+        if fs is None or not hasattr(self._map, "_key_to_str"):
+            return None
+        try:
+            info = fs.info(self._map._key_to_str(slice_))
+        except FileNotFoundError:
+            raise KeyError(slice_)
+        except Exception:
+            return None
+        return {"size": info.get("size"), "etag": info.get("ETag") or info.get("etag")}
 
     def flush(self):
-        pass
+        if hasattr(self._map, "flush"):
+            self._map.flush()
+        self._listing = None
 
     def commit(self):
         """ Deprecated alias to flush()"""
         self.flush()
 
     def close(self):
-        pass
+        if hasattr(self._map, "close"):
+            self._map.close()
 
     def __enter__(self):
         return self
@@ -0,0 +1,128 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pytest
+
+import hub.store.chunk_index
+from hub.store.chunk_index import ChunkCommitIndex, INDEX_FOLDER
+
+
+def test_chunk_index():
+    storage = {}
+    index = ChunkCommitIndex(storage)
+    index.add("0.0", "a")
+    index.add("0.0", "b")
+    index.add("1.0", "a")
+    assert index.commits("0.0") == {"a": "a", "b": "b"}
+    assert index.commits("2.0") == {}
+    index.remove("0.0", "b")
+    assert index.chunks("a") == ["0.0", "1.0"]
+    assert index.chunks("b") == []
+    with pytest.raises(KeyError):
+        index.remove("2.0", "a")
+
+
+def test_chunk_index_flush():
+    storage = {}
+    index = ChunkCommitIndex(storage)
+    index.add("0.0", "a")
+    state = index.flush()
+    assert state == {"base": 1, "deltas": 0}
+    index.add("1.0", "b")
+    index.remove("0.0", "a")
+    state = index.flush()
+    assert state == {"base": 1, "deltas": 1}
+    assert index.flush() == state
+    # Only the changes since the previous flush are written
+    assert len(storage[f"{INDEX_FOLDER}/delta.1.1"]) < 100
+
+    reopened = ChunkCommitIndex(storage, **state)
+    assert reopened.commits("0.0") == {}
+    assert reopened.commits("1.0") == {"b": "b"}
+    assert reopened.chunks("b") == ["1.0"]
+
+
+def test_chunk_index_compaction(monkeypatch):
+    monkeypatch.setattr(hub.store.chunk_index, "MAX_DELTAS", 2)
+    storage = {}
+    index = ChunkCommitIndex(storage)
+    for i in range(5):
+        index.add(f"{i}.0", "a")
+        index.add(f"{i}.0", str(i))
+        state = index.flush()
+    assert state == {"base": 2, "deltas": 1}
+    index.remove("0.0", "a")
+    index.flush()
+    assert sorted(storage) == [
+        f"{INDEX_FOLDER}/base.2",
+        f"{INDEX_FOLDER}/delta.2.1",
+        f"{INDEX_FOLDER}/delta.2.2",
+    ]
+    reopened = ChunkCommitIndex(storage, **index.state)
+    assert reopened.chunks("a") == ["1.0", "2.0", "3.0", "4.0"]
+    assert set(reopened.commits("3.0")) == {"a", "3"}
+
+
+def test_chunk_index_from_sets():
+    storage = {}
+    index = ChunkCommitIndex.from_sets(storage, {"0.0": {"a", "b"}, "1.0": set()})
+    assert set(index.commits("0.0")) == {"a", "b"}
+    state = index.flush()
+    reopened = ChunkCommitIndex(storage, **state)
+    assert reopened.chunks("b") == ["0.0"]
+    assert reopened.commits("1.0") == {}
+
+
+def test_chunk_index_link():
+    storage = {}
+    index = ChunkCommitIndex(storage)
+    index.add("0.0", "a")
+    index.add("1.0", "a")
+    index.flush()
+    index.link("a", "b")
+    index.link("b", "c")
+    assert index.commits("0.0") == {"a": "a", "b": "a", "c": "a"}
+    assert index.chunks("c") == ["0.0", "1.0"]
+    assert sorted(index.borrowers("0.0", "a")) == ["b", "c"]
+    index.add("0.0", "b")
+    assert index.commits("0.0") == {"a": "a", "b": "b", "c": "a"}
+    index.remove("1.0", "c")
+    assert index.chunks("c") == ["0.0"]
+    reopened = ChunkCommitIndex(storage, **index.flush())
+    assert reopened.commits("0.0") == {"a": "a", "b": "b", "c": "a"}
+    assert reopened.borrowers("1.0", "a") == ["b"]
+
+
+class SlowStorage(dict):
+    def __getitem__(self, key):
+        time.sleep(0.01)
+        return super().__getitem__(key)
+
+
+def test_chunk_index_concurrent_load():
+    storage = SlowStorage()
+    index = ChunkCommitIndex(storage)
+    for i in range(10):
+        index.add(f"{i}.0", "a")
+    state = index.flush()
+    index.add("0.0", "b")
+    state = index.flush()
+    reopened = ChunkCommitIndex(storage, **state)
+    keys = [f"{i}.0" for i in range(10)]
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        commits = list(executor.map(reopened.commits, keys))
+    assert commits == [{"a": "a", "b": "b"}] + [{"a": "a"}] * 9
+
+
+if __name__ == "__main__":
+    test_chunk_index()
+    test_chunk_index_flush()
+    test_chunk_index_from_sets()
+    test_chunk_index_link()
+    test_chunk_index_concurrent_load()
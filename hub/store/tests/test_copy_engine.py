@@ -0,0 +1,61 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import fsspec
+import pytest
+
+import hub
+from hub.exceptions import DirectoryNotEmptyException
+from hub.store.copy_engine import copy_files, list_files
+
+
+def _make_files(fs, root):
+    fs.makedirs(f"{root}/a/b", exist_ok=True)
+    fs.pipe_file(f"{root}/meta.json", b"{}")
+    fs.pipe_file(f"{root}/a/0", b"0" * 10)
+    fs.pipe_file(f"{root}/a/b/1", b"1" * 20)
+
+
+def test_copy_files(tmpdir):
+    fs = fsspec.filesystem("file")
+    src, dst = str(tmpdir.join("src")), str(tmpdir.join("dst"))
+    _make_files(fs, src)
+    stats = copy_files(fs, src, fs, dst, workers=4)
+    assert stats["files"] == 3
+    assert stats["bytes"] == 32
+    assert list_files(fs, dst) == {"meta.json": 2, "a/0": 10, "a/b/1": 20}
+    with pytest.raises(DirectoryNotEmptyException):
+        copy_files(fs, src, fs, dst)
+
+
+def test_copy_files_resume(tmpdir):
+    src_fs = fsspec.filesystem("memory")
+    src = "/copy_engine_src"
+    _make_files(src_fs, src)
+    fs = fsspec.filesystem("file")
+    dst = str(tmpdir.join("dst"))
+    fs.makedirs(f"{dst}/a/b", exist_ok=True)
+    fs.pipe_file(f"{dst}/a/0", b"0" * 10)
+    fs.pipe_file(f"{dst}/a/b/1", b"partial")
+    stats = copy_files(src_fs, src, fs, dst, resume=True)
+    assert stats["files"] == 2
+    assert stats["skipped"] == 1
+    assert fs.cat_file(f"{dst}/a/b/1") == b"1" * 20
+    src_fs.rm(src, recursive=True)
+
+
+def test_dataset_copy_local():
+    ds = hub.Dataset(
+        "./data/test_copy_engine/src", shape=(10,), schema={"x": "int32"}, mode="w"
+    )
+    ds["x", 3] = 5
+    ds2 = ds.copy("./data/test_copy_engine/dst", workers=4)
+    assert ds2["x", 3].compute() == 5
+    assert ds2.shape == (10,)
+
+
+if __name__ == "__main__":
+    test_dataset_copy_local()
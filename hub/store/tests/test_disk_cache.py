@@ -0,0 +1,132 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import os
+
+from hub.store.disk_cache import DiskLRUCache, DiskStorage
+
+import zarr
+
+
+class RemoteStore(zarr.MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.reads = 0
+        self.infos = 0
+        self.etags = {}
+
+    def __getitem__(self, key):
+        self.reads += 1
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.etags[key] = str(hash(bytes(value)))
+
+    def get_with_info(self, key):
+        value = self[key]
+        return value, {"size": len(value), "etag": self.etags[key]}
+
+    def info(self, key):
+        self.infos += 1
+        return {"size": len(super().__getitem__(key)), "etag": self.etags[key]}
+
+
+def test_disk_storage(tmpdir):
+    storage = DiskStorage(str(tmpdir))
+    storage["a/0.0:abc"] = b"hello"
+    storage["b"] = memoryview(b"world")
+    assert storage["a/0.0:abc"] == b"hello"
+    assert sorted(storage) == ["a/0.0:abc", "b"]
+    del storage["b"]
+    assert len(storage) == 1
+    open(os.path.join(str(tmpdir), "b.%tmp-123"), "wb").close()
+    storage = DiskStorage(str(tmpdir))
+    assert not os.path.exists(os.path.join(str(tmpdir), "b.%tmp-123"))
+
+
+def test_disk_lru_cache(tmpdir):
+    remote = RemoteStore()
+    remote["a"] = b"a" * 10
+    remote["b"] = b"b" * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 25)
+    assert cache["a"] == b"a" * 10
+    assert cache["a"] == b"a" * 10
+    assert remote.reads == 1
+    cache["c"] = b"c" * 10
+    assert cache["b"] == b"b" * 10
+    assert "a" not in cache.cache_storage
+    cache.close()
+    assert remote["c"] == b"c" * 10
+
+    remote.reads = 0
+    cache = DiskLRUCache(str(tmpdir), remote, 25)
+    assert cache["b"] == b"b" * 10
+    assert cache["c"] == b"c" * 10
+    assert remote.reads == 0
+
+
+def test_disk_lru_cache_validation(tmpdir):
+    remote = RemoteStore()
+    remote["a"] = b"a" * 10
+    remote["b"] = b"b" * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    cache["a"], cache["b"]
+    cache.close()
+
+    remote["a"] = b"A" * 10
+    del remote["b"]
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    assert cache["a"] == b"A" * 10
+    try:
+        cache["b"]
+        assert False
+    except KeyError:
+        pass
+    assert sorted(cache.cache_storage) == ["a"]
+
+
+def test_disk_lru_cache_unindexed(tmpdir):
+    remote = RemoteStore()
+    remote["a"] = b"a" * 10
+    remote["b"] = b"b" * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    cache["a"]
+    cache.flush()
+    # Cached after the last flush, so not in the saved index
+    cache["b"]
+    remote["b"] = b"B" * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    assert sorted(cache.cache_storage) == ["a"]
+    assert cache["b"] == b"B" * 10
+
+
+def test_disk_lru_cache_batch_etags(tmpdir):
+    remote = RemoteStore()
+    for key in "abc":
+        remote[key] = key.encode() * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    assert sorted(cache.getitems(["a", "b", "c"])) == ["a", "b", "c"]
+    cache.close()
+
+    # Overwritten with the same size, only the ETag tells the copies apart
+    remote["b"] = b"B" * 10
+    cache = DiskLRUCache(str(tmpdir), remote, 100)
+    assert cache["a"] == b"a" * 10
+    # All items loaded from disk are validated on the first access
+    assert remote.infos == 3
+    assert cache.getitems(["b", "c"]) == {"b": b"B" * 10, "c": b"c" * 10}
+    assert remote.infos == 3
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_disk_storage(tempfile.mkdtemp())
+    test_disk_lru_cache(tempfile.mkdtemp())
+    test_disk_lru_cache_validation(tempfile.mkdtemp())
+    test_disk_lru_cache_unindexed(tempfile.mkdtemp())
+    test_disk_lru_cache_batch_etags(tempfile.mkdtemp())
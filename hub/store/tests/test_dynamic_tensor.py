@@ -5,10 +5,12 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 """
 
 from hub.exceptions import DynamicTensorShapeException
+import json
 import posixpath
 
 import numpy as np
 import fsspec
+import zarr
 from zarr.creation import create
 
 from hub.store.dynamic_tensor import DynamicTensor
@@ -129,6 +131,182 @@ def test_dynamic_tensor_4():
     assert (t[0, 6:8] == np.ones((2, 20, 10), dtype="int32")).all()
 
 
+def test_dynamic_tensor_read_samples(monkeypatch):
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_7"),
+        mode="w",
+        shape=(50, None, None),
+        max_shape=(50, 30, 30),
+        dtype="int32",
+        chunks=(1, 30, 30),
+    )
+    for i in range(50):
+        t[i] = np.full((10 + i % 7, 5 + i % 11), i, dtype="int32")
+    reads = []
+    get_item = zarr.Array.__getitem__
+
+    def counting_get_item(self, sl):
+        reads.append(sl)
+        return get_item(self, sl)
+
+    monkeypatch.setattr(zarr.Array, "__getitem__", counting_get_item)
+    samples = t[5:45]
+    # One read of the shapes and one read of the samples
+    assert len(reads) == 2
+    assert len(samples) == 40
+    for i, sample in enumerate(samples, 5):
+        assert sample.shape == (10 + i % 7, 5 + i % 11)
+        assert (sample == i).all()
+    cropped = t[5:10, 2:, 1:3]
+    for i, sample in enumerate(cropped, 5):
+        assert sample.shape == (8 + i % 7, 2)
+        assert (sample == i).all()
+    assert [sample.tolist() for sample in t[10:12, 1]] == [
+        [10] * (5 + 10 % 11),
+        [11] * (5 + 11 % 11),
+    ]
+    t.close()
+
+
+def test_dynamic_tensor_batched_shapes(monkeypatch):
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_8"),
+        mode="w",
+        shape=(30, None, None),
+        max_shape=(30, 20, 20),
+        dtype="int32",
+        chunks=(1, 20, 20),
+    )
+    calls = []
+    get_item, set_item = zarr.Array.__getitem__, zarr.Array.__setitem__
+
+    def counting_get_item(self, sl):
+        if self is t._dynamic_tensor:
+            calls.append("read")
+        return get_item(self, sl)
+
+    def counting_set_item(self, sl, value):
+        if self is t._dynamic_tensor:
+            calls.append("write")
+        return set_item(self, sl, value)
+
+    monkeypatch.setattr(zarr.Array, "__getitem__", counting_get_item)
+    monkeypatch.setattr(zarr.Array, "__setitem__", counting_set_item)
+    t[0:20] = [np.ones((1 + i % 5, 2 + i % 3), dtype="int32") for i in range(20)]
+    # Shapes of all samples are read and written once
+    assert calls == ["read", "write"]
+    monkeypatch.undo()
+    assert t.get_shape([slice(3, 5)]).tolist() == [[4, 2], [5, 3]]
+    t.set_dynamic_shapes(
+        [[slice(20, 22)], [slice(25, 26)], [slice(22, 24)]],
+        [np.array([[1, 1], [2, 2]]), np.array([[5, 5]]), np.array([[3, 3], [4, 4]])],
+    )
+    assert t.get_shape([slice(20, 26)]).tolist() == [
+        [1, 1],
+        [2, 2],
+        [3, 3],
+        [4, 4],
+        [0, 0],
+        [5, 5],
+    ]
+    t.close()
+
+
+def _stored_chunks(t):
+    return sorted(key for key in t.fs_map if key[0].isdigit())
+
+
+def test_dynamic_tensor_delete_chunks_after_reshape():
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_9"),
+        mode="w",
+        shape=(5, None, None),
+        max_shape=(5, 100, 100),
+        dtype="int32",
+        chunks=(1, 10, 10),
+    )
+    t[0] = np.ones((35, 25), dtype="int32")
+    t[1] = np.ones((10, 10), dtype="int32")
+    assert len(_stored_chunks(t)) == 13
+    t[0] = np.full((5, 12), 2, dtype="int32")
+    assert _stored_chunks(t) == ["0.0.0", "0.0.1", "1.0.0"]
+    assert t[0].shape == (5, 12)
+    assert (t[0] == 2).all()
+    # Writing a part of the sample only grows it
+    t[0, 3:4, 0:30] = np.full((1, 30), 3, dtype="int32")
+    assert t[0].shape == (5, 30)
+    assert t[0, 3].tolist() == [3] * 30
+    t[0:2] = [np.ones((1, 1), dtype="int32"), np.ones((2, 2), dtype="int32")]
+    assert _stored_chunks(t) == ["0.0.0", "1.0.0"]
+
+
+def test_dynamic_tensor_vacuum():
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_10"),
+        mode="w",
+        shape=(5, None),
+        max_shape=(5, 100),
+        dtype="int32",
+        chunks=(1, 10),
+    )
+    # Smaller samples of a batch are padded, their padding is stored out of their shape
+    t[0:2] = [np.ones(5, dtype="int32"), np.ones(45, dtype="int32")]
+    t.fs_map["9.0"] = b"stale"
+    assert len(_stored_chunks(t)) == 11
+    assert t.vacuum() == 5
+    assert _stored_chunks(t) == ["0.0"] + [f"1.{i}" for i in range(5)]
+    assert t[1].tolist() == [1] * 45
+    assert t.vacuum() == 0
+
+
+def test_dynamic_tensor_adaptive_chunks():
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_11"),
+        mode="w",
+        shape=(10000, 64, 64),
+        dtype="float32",
+    )
+    assert t.chunks == (1024, 64, 64)
+    t[0:10] = np.zeros((10, 64, 64), dtype="float32")
+    # Zeros compress well, so more of them fit into a stored chunk
+    assert t.chunks == (2048, 64, 64)
+    t[10] = np.ones((64, 64), dtype="float32")
+    meta = json.loads(t.fs_map[".hub.dynamic_tensor"].decode("utf-8"))
+    assert meta["chunks"] == [2048, 64, 64]
+    assert meta["compression_ratio"] > 100
+    t = DynamicTensor(t.fs_map, mode="r")
+    assert t.chunks == (2048, 64, 64)
+    assert t[10].tolist() == np.ones((64, 64)).tolist()
+
+
+def test_dynamic_tensor_tiles(monkeypatch):
+    t = DynamicTensor(
+        create_store("./data/test/test_dynamic_tensor_12"),
+        mode="w",
+        shape=(2, None, None),
+        max_shape=(2, 3000, 3000),
+        dtype="float32",
+        chunk_layout="tile",
+    )
+    assert t.chunks == (1, 2048, 2048)
+    image = np.arange(3000 * 2500, dtype="float32").reshape(3000, 2500)
+    t[0] = image
+    fetched = []
+    getitems = t.fs_map.getitems
+
+    def counting_getitems(keys, on_error="omit"):
+        fetched.extend(k for k in keys if not k.startswith("--dynamic--"))
+        return getitems(keys, on_error=on_error)
+
+    monkeypatch.setattr(t.fs_map, "getitems", counting_getitems)
+    # Crops read only the tiles they touch
+    assert (t[0, 10:20, 30:40] == image[10:20, 30:40]).all()
+    assert fetched == ["0.0.0"]
+    fetched.clear()
+    assert (t[0, 2000:2100, 2000:2100] == image[2000:2100, 2000:2100]).all()
+    assert sorted(fetched) == ["0.0.0", "0.0.1", "0.1.0", "0.1.1"]
+
+
 if __name__ == "__main__":
     test_read_and_append_modes()
     # test_chunk_iterator()
@@ -4,8 +4,12 @@ This Source Code Form is subject to the terms of the Mozilla Public License, v.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
 
-from hub.store.lru_cache import LRUCache
+from concurrent.futures import ThreadPoolExecutor
+import pickle
 
+from hub.store.lru_cache import LRUCache, ShardedLRUCache
+
+import numpy as np
 import zarr
 
 
@@ -43,5 +47,105 @@ def test_lru_cache():
     cache.commit()
 
 
+def test_lru_cache_memoryview_size():
+    data = memoryview(np.ones(10, dtype="int64"))
+    cache = LRUCache(zarr.MemoryStore(), zarr.MemoryStore(), 200)
+    cache["a"] = data
+    assert cache.total_cached == 80
+    cache["b"] = bytearray(100)
+    cache["c"] = bytes(100)
+    assert "a" not in cache._cached_items
+    assert cache.total_cached == 200
+    assert bytes(cache.actual_storage["a"]) == data.tobytes()
+
+
+def test_lru_cache_pickle():
+    cache = LRUCache(zarr.MemoryStore(), zarr.MemoryStore(), 30)
+    cache["a"] = b"hello"
+    cache = pickle.loads(pickle.dumps(cache))
+    cache["b"] = b"world"
+    assert cache["a"] == b"hello"
+
+
+def test_sharded_lru_cache():
+    actual = zarr.MemoryStore()
+    cache = ShardedLRUCache(actual, 1000, shards=4)
+    for i in range(100):
+        cache[str(i)] = bytes([i]) * 50
+    assert cache.total_cached <= 1000
+    for i in range(100):
+        assert cache[str(i)] == bytes([i]) * 50
+    assert sorted(cache, key=int) == [str(i) for i in range(100)]
+    items = cache.getitems([str(i) for i in range(0, 100, 10)] + ["missing"])
+    assert sorted(items, key=int) == [str(i) for i in range(0, 100, 10)]
+    assert items["50"] == bytes([50]) * 50
+    del cache["5"]
+    try:
+        cache["5"]
+        assert False
+    except KeyError:
+        pass
+    cache.flush()
+    assert len(actual) == 99
+    assert actual["7"] == bytes([7]) * 50
+    cache = pickle.loads(pickle.dumps(cache))
+    assert cache["8"] == bytes([8]) * 50
+    cache.close()
+
+
+def test_sharded_lru_cache_threads():
+    actual = zarr.MemoryStore()
+    cache = ShardedLRUCache(actual, 2000, shards=8)
+
+    def work(t):
+        for i in range(200):
+            key = f"{t}.{i}"
+            cache[key] = bytes([t, i % 256]) * 10
+            assert cache[key] == bytes([t, i % 256]) * 10
+        for i in range(200):
+            assert cache[f"{t}.{i}"] == bytes([t, i % 256]) * 10
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(work, range(16)))
+    cache.flush()
+    assert len(actual) == 16 * 200
+    assert cache.total_cached <= 2000
+
+
+class _WritingStore(dict):
+    """Storage where the cache is written to while a read is in progress"""
+
+    on_read = None
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if self.on_read is not None:
+            on_read, self.on_read = self.on_read, None
+            on_read()
+        return value
+
+
+def test_lru_cache_write_during_read():
+    actual = _WritingStore(a=b"old")
+    cache = LRUCache(dict(), actual, 10)
+
+    def write():
+        cache["a"] = b"new"
+        # Evicts "a" to the storage
+        cache["b"] = bytes(10)
+
+    actual.on_read = write
+    cache["a"]
+    assert cache["a"] == b"new"
+    actual.on_read = lambda: cache.delitems(["b"])
+    assert cache.getitems(["b"]) == {"b": bytes(10)}
+    assert cache.getitems(["b"]) == {}
+
+
 if __name__ == "__main__":
     test_lru_cache()
+    test_lru_cache_memoryview_size()
+    test_lru_cache_pickle()
+    test_sharded_lru_cache()
+    test_sharded_lru_cache_threads()
+    test_lru_cache_write_during_read()
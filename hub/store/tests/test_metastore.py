@@ -0,0 +1,76 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import json
+
+import numpy as np
+import zarr
+
+import hub
+from hub import defaults
+from hub.schema import Tensor
+from hub.store.metastore import MetaCache
+
+
+class CountingStore(zarr.MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.meta_reads = 0
+        self.meta_writes = 0
+
+    def __getitem__(self, key):
+        if key == defaults.META_FILE:
+            self.meta_reads += 1
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        if key == defaults.META_FILE:
+            self.meta_writes += 1
+        super().__setitem__(key, value)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_meta_cache():
+    storage = CountingStore()
+    cache = MetaCache(storage)
+    assert cache.meta is None
+    cache[defaults.META_FILE] = b'{"shape": [1]}'
+    cache.meta["x"] = 1
+    cache.mark_dirty()
+    assert storage.meta_writes == 0
+    cache.flush()
+    cache.flush()
+    assert storage.meta_writes == 1
+    assert MetaCache(storage).meta == {"shape": [1], "x": 1}
+
+
+def test_meta_cache_dataset():
+    schema = {f"t{i}": Tensor((None,), max_shape=(10,)) for i in range(20)}
+    ds = hub.Dataset("./data/test_metastore/ds", shape=(5,), schema=schema, mode="w")
+    storage = CountingStore()
+    storage.update(ds._fs_map._fs_map)
+    storage.meta_writes = 0
+    ds._fs_map._fs_map = storage
+    ds.resize_shape(10)
+    ds["t3", 7] = np.ones(4)
+    assert storage.meta_reads == 0
+    ds.flush()
+    assert storage.meta_writes == 1
+    ds.flush()
+    assert storage.meta_writes == 1
+    meta = json.loads(storage[defaults.META_FILE])
+    assert meta["shape"] == [10]
+    assert meta[".zarray"]["/t3"]["shape"][0] == 10
+
+
+if __name__ == "__main__":
+    test_meta_cache()
+    test_meta_cache_dataset()
@@ -0,0 +1,52 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import time
+
+import pytest
+import zarr
+
+from hub.store.lru_cache import LRUCache
+from hub.store.nested_store import NestedStore
+from hub.store.parallel import fetch_items, getitems, setitems
+
+
+class SlowStore(zarr.MemoryStore):
+    def __getitem__(self, key):
+        time.sleep(0.05)
+        return super().__getitem__(key)
+
+
+def test_fetch_items():
+    store = SlowStore()
+    for i in range(32):
+        store[str(i)] = bytes([i])
+    start = time.time()
+    items = fetch_items(store, [str(i) for i in range(32)] + ["missing"], workers=32)
+    assert time.time() - start < 0.05 * 8
+    assert len(items) == 32
+    assert items["7"] == bytes([7])
+    with pytest.raises(KeyError):
+        fetch_items(store, ["1", "missing"], on_error="raise")
+
+
+def test_getitems_through_stack():
+    actual = zarr.MemoryStore()
+    cache = LRUCache(zarr.MemoryStore(), actual, 100)
+    store = NestedStore(cache, "tensor")
+    setitems(store, {"0.0": b"a", "0.1": b"b"})
+    assert "tensor/0.0" in cache.cache_storage
+    cache.flush()
+    assert actual["tensor/0.1"] == b"b"
+    cache = LRUCache(zarr.MemoryStore(), actual, 100)
+    store = NestedStore(cache, "tensor")
+    assert getitems(store, ["0.0", "0.1", "0.2"]) == {"0.0": b"a", "0.1": b"b"}
+    assert sorted(cache.cache_storage) == ["tensor/0.0", "tensor/0.1"]
+
+
+if __name__ == "__main__":
+    test_fetch_items()
+    test_getitems_through_stack()
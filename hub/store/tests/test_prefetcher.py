@@ -0,0 +1,102 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import threading
+import time
+
+from hub.store.prefetcher import ChunkPrefetcher, plan_chunk_ranges
+
+
+class Reader:
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.reads = []
+        self.lock = threading.Lock()
+
+    def __call__(self, key, start, stop):
+        time.sleep(self.delay)
+        with self.lock:
+            self.reads.append((key, start, stop))
+        return list(range(start, stop))
+
+
+def test_plan_chunk_ranges():
+    assert plan_chunk_ranges([0, 1, 2, 3, 4], 2, 4) == [(0, 2), (2, 4), (4, 5)]
+    assert plan_chunk_ranges([4, 5, 0, 1, 2], 4, 5) == [(4, 6), (0, 4)]
+    assert plan_chunk_ranges([], 4, None) == []
+    indexes = [0, 4, 1, 8, 5, 2, 9]
+    ranges = [(0, 4), (4, 8), (0, 4), (8, 10), (4, 8), (0, 4), (8, 10)]
+    assert plan_chunk_ranges(indexes, 4, 9) == ranges
+    assert plan_chunk_ranges(indexes, 4, 9, resident=3) == [(0, 4), (4, 8), (8, 10)]
+
+
+def test_prefetcher_reads_ahead():
+    reader = Reader(delay=0.05)
+    plan = [(i, i + 4) for i in range(0, 40, 4)]
+    prefetcher = ChunkPrefetcher(reader, {"a": plan}, {"a": 1}, depth=3)
+    assert prefetcher.get("a", 0, 4) == [0, 1, 2, 3]
+    time.sleep(0.1)
+    assert sorted(reader.reads) == [("a", i, i + 4) for i in range(0, 16, 4)]
+    start = time.time()
+    for begin, end in plan[1:4]:
+        assert prefetcher.get("a", begin, end) == list(range(begin, end))
+    assert time.time() - start < 0.05 * 3
+    prefetcher.close()
+    assert prefetcher.memory == 0
+
+
+def test_prefetcher_off_plan():
+    reader = Reader()
+    plan = [(i, i + 2) for i in range(0, 20, 2)]
+    prefetcher = ChunkPrefetcher(reader, {"a": plan}, {"a": 1}, depth=2)
+    assert prefetcher.get("a", 0, 2) == [0, 1]
+    assert prefetcher.get("a", 2, 4) == [2, 3]
+    # Interleaved workers skip ranges of the plan, reading ahead stops
+    assert prefetcher.get("a", 10, 12) == [10, 11]
+    assert prefetcher.memory == 0
+    assert prefetcher.get("a", 4, 6) == [4, 5]
+    assert prefetcher.get("a", 12, 14) == [12, 13]
+    assert prefetcher.get("a", 1, 3) == [1, 2]
+    assert prefetcher.get("b", 0, 2) == [0, 1]
+    prefetcher.close()
+    # Only the 2 ranges read ahead before the skip can be read without being requested
+    assert len(reader.reads) <= 7 + 2
+    assert reader.reads.count(("a", 12, 14)) == 1
+    assert ("a", 14, 16) not in reader.reads
+
+
+def test_prefetcher_random_order():
+    reader = Reader()
+    plan = [(i, i + 2) for i in range(0, 40, 2)]
+    prefetcher = ChunkPrefetcher(reader, {"a": plan}, {"a": 1}, depth=4)
+    order = [7, 3, 12, 0, 19, 5, 8, 1]
+    for position in order:
+        start, stop = plan[position]
+        assert prefetcher.get("a", start, stop) == list(range(start, stop))
+    prefetcher.close()
+    assert len(reader.reads) == len(order)
+
+
+def test_prefetcher_memory_limit():
+    reader = Reader()
+    plan = [(i, i + 10) for i in range(0, 100, 10)]
+    prefetcher = ChunkPrefetcher(
+        reader, {"a": plan}, {"a": 10}, depth=5, max_memory=250
+    )
+    prefetcher.get("a", 0, 10)
+    assert prefetcher.memory == 200
+    prefetcher.close()
+    prefetcher = ChunkPrefetcher(reader, {"a": plan}, {"a": 10}, depth=0)
+    prefetcher.get("a", 0, 10)
+    assert prefetcher.memory == 0
+
+
+if __name__ == "__main__":
+    test_plan_chunk_ranges()
+    test_prefetcher_reads_ahead()
+    test_prefetcher_off_plan()
+    test_prefetcher_random_order()
+    test_prefetcher_memory_limit()
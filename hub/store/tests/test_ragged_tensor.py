@@ -0,0 +1,162 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import pickle
+
+import fsspec
+import numpy as np
+import pytest
+import zarr
+
+import hub
+from hub.exceptions import ValueShapeError
+from hub.schema import Tensor
+from hub.store.ragged_tensor import RaggedTensor
+from hub.store.store import StorageMapWrapperWithCommit
+
+
+def test_ragged_tensor():
+    storage = StorageMapWrapperWithCommit(zarr.MemoryStore())
+    t = RaggedTensor(
+        storage,
+        mode="w",
+        shape=(10, None, 3),
+        max_shape=(10, 100, 3),
+        dtype="int32",
+        chunk_size=200,
+    )
+    samples = [np.random.randint(0, 2 ** 30, (i, 3), dtype="int32") for i in range(10)]
+    for i in range(10):
+        t[i] = samples[i]
+    assert t[4].tolist() == samples[4].tolist()
+    assert [sample.shape for sample in t[2:5]] == [(2, 3), (3, 3), (4, 3)]
+    assert t.get_shape([slice(1, 3)]).tolist() == [[1, 3], [2, 3]]
+    assert t[9, 2:4, 1].tolist() == samples[9][2:4, 1].tolist()
+    assert [sample.tolist() for sample in t.gather([7, 2], [slice(1, 3)])] == [
+        samples[7][1:3].tolist(),
+        samples[2][1:3].tolist(),
+    ]
+    t.flush()
+    # Samples are packed without padding, several samples per chunk
+    chunks = [k for k in storage if k.startswith("ragged.")]
+    assert 1 < len(chunks) < 10
+
+    t[3, 5] = [1, 2, 3]
+    assert t[3].shape == (6, 3)
+    assert t[3, 5].tolist() == [1, 2, 3]
+    assert t[-1].tolist() == samples[9].tolist()
+    assert t.get_shape(-7).tolist() == [6, 3]
+    with pytest.raises(IndexError):
+        t[10]
+    with pytest.raises(ValueShapeError):
+        t[0] = np.ones((101, 3))
+    with pytest.raises(ValueShapeError):
+        t[0] = np.ones((5, 2))
+    t.flush()
+
+    t = RaggedTensor(storage, mode="r")
+    assert t[9].tolist() == samples[9].tolist()
+    assert t[3, 5].tolist() == [1, 2, 3]
+    # Samples that were never written are empty
+    t = RaggedTensor(storage, mode="a")
+    t.resize_shape(12)
+    assert t[11].shape == (0, 3)
+    assert RaggedTensor(storage, mode="r").shape == (12, None, 3)
+
+
+def test_ragged_tensor_batch_write():
+    storage = StorageMapWrapperWithCommit(zarr.MemoryStore())
+    t = RaggedTensor(
+        storage, mode="w", shape=(4, None), max_shape=(4, 10), dtype="float32"
+    )
+    t[0:4] = [np.arange(i, dtype="float32") for i in range(4)]
+    assert [sample.tolist() for sample in t[1:3]] == [[0], [0, 1]]
+    with pytest.raises(ValueShapeError):
+        t[0:2] = [np.ones(1)]
+
+
+def test_ragged_tensor_vacuum():
+    storage = StorageMapWrapperWithCommit(zarr.MemoryStore())
+    t = RaggedTensor(
+        storage,
+        mode="w",
+        shape=(10, None),
+        max_shape=(10, 1000),
+        dtype="int64",
+        chunk_size=1000,
+        compressor=None,
+    )
+    for i in range(10):
+        t[i] = np.arange(50) + i
+    for i in range(7):
+        t[i] = np.arange(5) + i
+    t.flush()
+    assert len([k for k in storage if k.startswith("ragged.")]) == 6
+    assert t.vacuum() == 3
+    assert len([k for k in storage if k.startswith("ragged.")]) == 3
+    t = RaggedTensor(storage, mode="r")
+    assert [t[i][-1] for i in range(10)] == list(range(4, 11)) + [56, 57, 58]
+
+
+def test_ragged_tensor_pickle(tmpdir):
+    storage = StorageMapWrapperWithCommit(fsspec.get_mapper(str(tmpdir)))
+    t = RaggedTensor(
+        storage, mode="w", shape=(32, None), max_shape=(32, 10), dtype="int32"
+    )
+    t[0] = np.arange(3)
+    copy = pickle.loads(pickle.dumps(t))
+    # Both copies keep appending without overwriting the chunk of the other one
+    t[1] = np.arange(4)
+    copy[16] = np.arange(5)
+    t.flush()
+    copy.flush()
+    t = RaggedTensor(storage, mode="r")
+    assert t[0].tolist() == [0, 1, 2]
+    assert t[1].tolist() == [0, 1, 2, 3]
+    assert t[16].tolist() == [0, 1, 2, 3, 4]
+
+
+def test_ragged_dataset():
+    schema = {
+        "x": Tensor((None, 3), "int32", max_shape=(1000, 3), ragged=True),
+        "y": "int32",
+    }
+    ds = hub.Dataset("./data/test_ragged/ds", shape=(20,), schema=schema, mode="w")
+    for i in range(20):
+        ds["x", i] = np.full((i, 3), i, dtype="int32")
+    ds["y", 3] = 5
+    assert ds["x", 5].shape.tolist() == [5, 3]
+    assert [sample.shape for sample in ds["x", 2:4].compute()] == [(2, 3), (3, 3)]
+    ds.flush()
+
+    ds = hub.Dataset("./data/test_ragged/ds")
+    assert ds.schema.dict_["x"].ragged
+    assert isinstance(ds._tensors["/x"], RaggedTensor)
+    assert ds["x", 19].compute()[0].tolist() == [19] * 3
+    assert ds["y", 3].compute() == 5
+
+
+def test_ragged_transform():
+    schema = {"x": Tensor((None,), "float32", max_shape=(100,), ragged=True)}
+
+    @hub.transform(schema=schema)
+    def arange(i):
+        return {"x": np.arange(i, dtype="float32")}
+
+    ds = arange(range(30)).store("./data/test_ragged/transform")
+    assert ds["x", 29].compute().shape == (29,)
+    assert ds["x", 3].compute().tolist() == [0, 1, 2]
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    test_ragged_tensor()
+    test_ragged_tensor_batch_write()
+    test_ragged_tensor_vacuum()
+    test_ragged_tensor_pickle(tempfile.mkdtemp())
+    test_ragged_dataset()
+    test_ragged_transform()
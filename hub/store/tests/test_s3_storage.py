@@ -5,6 +5,7 @@ If a copy of the MPL was not distributed with this file, You can obtain one at h
 """
 
 from concurrent.futures.thread import ThreadPoolExecutor
+import io
 
 import boto3
 import pytest
@@ -12,6 +13,8 @@ from s3fs import S3FileSystem
 import cloudpickle
 import numpy as np
 
+from hub.exceptions import S3Exception
+from hub.store.s3_file_system_replacement import S3FileSystemReplacement
 from hub.store.s3_storage import S3Storage
 from hub.utils import s3_creds_exist
 
@@ -47,5 +50,114 @@ def test_s3_storage_pickability():
     cloudpickle.dumps(storage)
 
 
+class FakeS3Client:
+    def __init__(self, fail=False):
+        self.objects = {}
+        self.fail = fail
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        if self.fail:
+            raise Exception("upload failed")
+        self.objects[Key] = Body if isinstance(Body, bytes) else Body.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": io.BytesIO(self.objects[Key]), "ETag": "etag"}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key, ExtraArgs, Config):
+        self.objects[Key] = Fileobj.read()
+
+    def delete_objects(self, Bucket, Delete):
+        self.delete_requests = getattr(self, "delete_requests", 0) + 1
+        for item in Delete["Objects"]:
+            self.objects.pop(item["Key"], None)
+
+    def get_paginator(self, name):
+        return FakePaginator(self.objects)
+
+
+class FakePaginator:
+    def __init__(self, objects):
+        self.objects = objects
+        self.pages = 0
+
+    def paginate(self, Bucket, Prefix, PaginationConfig):
+        keys = sorted(k for k in self.objects if k.startswith(Prefix))
+        size = PaginationConfig["PageSize"]
+        for i in range(0, len(keys), size):
+            self.pages += 1
+            yield {"Contents": [{"Key": k} for k in keys[i : i + size]]}
+
+
+def test_s3_storage_write_behind():
+    storage = S3Storage(
+        None,
+        "s3://bucket/ds",
+        aws_region="us-east-1",
+        write_behind=True,
+        max_inflight_size=100,
+        multipart_threshold=50,
+    )
+    storage.client = FakeS3Client()
+    storage["a"] = BYTE_DATA
+    storage["b"] = memoryview(np.arange(10, dtype="int64"))
+    storage["c"] = bytes(60)
+    assert storage["a"] == BYTE_DATA
+    storage.flush()
+    assert storage.client.objects["ds/a"] == BYTE_DATA
+    assert storage.client.objects["ds/b"] == np.arange(10, dtype="int64").tobytes()
+    assert storage.client.objects["ds/c"] == bytes(60)
+
+    storage.client = FakeS3Client(fail=True)
+    storage["d"] = BYTE_DATA
+    with pytest.raises(S3Exception):
+        storage.flush()
+    storage["e"] = BYTE_DATA
+    storage._writer._queue.join()
+    # Failed upload is raised by the next write
+    with pytest.raises(S3Exception):
+        storage["f"] = BYTE_DATA
+    storage.close()
+
+
+def test_s3_write_behind_opt_in():
+    kwargs = {
+        "key": "key",
+        "secret": "secret",
+        "client_kwargs": {"region_name": "us-east-1"},
+    }
+    assert S3FileSystemReplacement(**kwargs).get_mapper("bucket/ds")._writer is None
+    fs = S3FileSystemReplacement(write_behind=True, **kwargs)
+    assert fs.get_mapper("bucket/ds")._writer is not None
+
+
+def test_s3_storage_iter_keys():
+    storage = S3Storage(None, "s3://bucket/ds", aws_region="us-east-1")
+    storage.client = FakeS3Client()
+    for i in range(5):
+        storage[f"{i}.0"] = BYTE_DATA
+    storage["--dynamic--/0.0"] = BYTE_DATA
+    storage.client.objects["other/0.0"] = BYTE_DATA
+    keys = storage.iter_keys(page_size=2)
+    assert next(keys) == "--dynamic--/0.0"
+    assert list(keys) == [f"{i}.0" for i in range(5)]
+    assert len(storage) == 6
+
+
+def test_s3_storage_delitems():
+    storage = S3Storage(None, "s3://bucket/ds", aws_region="us-east-1")
+    storage.client = FakeS3Client()
+    for i in range(1500):
+        storage[f"{i}.0"] = BYTE_DATA
+    storage.delitems([f"{i}.0" for i in range(1200)] + ["missing"])
+    assert storage.client.delete_requests == 2
+    assert sorted(storage.client.objects) == sorted(
+        f"ds/{i}.0" for i in range(1200, 1500)
+    )
+
+
 if __name__ == "__main__":
     test_s3_storage()
+    test_s3_storage_write_behind()
+    test_s3_write_behind_opt_in()
+    test_s3_storage_iter_keys()
+    test_s3_storage_delitems()
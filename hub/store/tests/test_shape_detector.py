@@ -44,3 +44,35 @@ def test_shape_detector_wrong_chunk_shape():
 def test_shape_detector_wrong_chunk_value():
     with pytest.raises(Exception):
         ShapeDetector((10, 10, 10), (10, 10, 10), (2, 10, 10))
+
+
+def test_shape_detector_adapt_chunks():
+    s = ShapeDetector((100000, 64, 64), dtype="float32")
+    assert s.adaptive
+    assert s.chunks == (1024, 64, 64)
+    # Incompressible data keeps the default
+    assert s.adapt_chunks(16384) == (1024, 64, 64)
+    # Stored chunks aim at the target size, as long as raw chunks fit in memory
+    assert s.adapt_chunks(16384 / 4) == (2048, 64, 64)
+    assert s.adapt_chunks(1) == (2048, 64, 64)
+    # and are no longer than the tensor
+    s = ShapeDetector((1000, 64, 64), dtype="float32")
+    assert s.adapt_chunks(1) == (1024, 64, 64)
+    assert not ShapeDetector((10, 10), chunks=5).adaptive
+    assert not ShapeDetector((10, 10), compressor=None).adaptive
+
+
+def test_shape_detector_tiles():
+    s = ShapeDetector((10, 20000, 20000, 3), dtype="uint8")
+    assert s.chunks == (1, 2048, 2048, 3)
+    s = ShapeDetector((10, 20000, 20000, 3), dtype="uint8", chunk_layout="sample")
+    assert s.chunks == (1, 280, 20000, 3)
+    # Samples that fit into a chunk aren't tiled
+    s = ShapeDetector((10, 1000, 1000, 3), dtype="uint8", chunk_layout="tile")
+    assert s.chunks == (4, 1000, 1000, 3)
+    s = ShapeDetector((10, 3000, 3000), dtype="float32", chunk_layout="tile")
+    assert s.chunks == (1, 2048, 2048)
+    # 1D samples are tiled only on request
+    assert ShapeDetector((10, 2 ** 25), dtype="uint8").chunks[1] == 2 ** 25
+    with pytest.raises(ValueError):
+        ShapeDetector((10, 10), chunk_layout="rows")
@@ -0,0 +1,73 @@
+"""
+License:
+This Source Code Form is subject to the terms of the Mozilla Public License, v. 2.0.
+If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
+"""
+
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from hub.store.shared_cache import SharedChunkCache, shared_memory
+
+requires_shared_memory = pytest.mark.skipif(
+    shared_memory is None, reason="requires python 3.8 or newer"
+)
+
+
+def _read_and_write(cache, queue):
+    queue.put(cache.get(("a", 0, 4)).tolist())
+    cache.put(("b", 0, 4), np.full((4,), 7.0))
+
+
+@requires_shared_memory
+def test_shared_cache():
+    cache = SharedChunkCache(2 ** 20)
+    value = np.arange(12, dtype="int32").reshape(4, 3)
+    cache.put(("a", 0, 4), value)
+    assert (cache.get(("a", 0, 4)) == value).all()
+    assert cache.get(("a", 4, 8)) is None
+    cache.put(("c", 0, 4), np.array(["x", None], dtype=object))
+    assert cache.get(("c", 0, 4)) is None
+    assert cache.size == 256 + value.nbytes
+    cache.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(cache._name(1))
+
+
+@requires_shared_memory
+def test_shared_cache_eviction():
+    cache = SharedChunkCache(3 * (256 + 800))
+    for i in range(3):
+        cache.put(i, np.full((100,), i, dtype="float64"))
+    cache.get(0)
+    cache.put(3, np.full((100,), 3, dtype="float64"))
+    assert cache.get(1) is None
+    assert [cache.get(i)[0] for i in (0, 2, 3)] == [0, 2, 3]
+    cache.put(4, np.zeros((1000,)))
+    assert cache.get(4) is None
+    assert cache.size == 3 * (256 + 800)
+    cache.close()
+
+
+@requires_shared_memory
+def test_shared_cache_processes():
+    cache = SharedChunkCache(2 ** 20)
+    cache.put(("a", 0, 4), np.arange(4))
+    methods = multiprocessing.get_all_start_methods()
+    for method in [method for method in ("fork", "spawn") if method in methods]:
+        context = multiprocessing.get_context(method)
+        queue = context.Queue()
+        process = context.Process(target=_read_and_write, args=(cache, queue))
+        process.start()
+        assert queue.get() == [0, 1, 2, 3]
+        process.join()
+        assert (cache.get(("b", 0, 4)) == 7).all()
+    cache.close()
+
+
+if __name__ == "__main__":
+    test_shared_cache()
+    test_shared_cache_eviction()
+    test_shared_cache_processes()
@@ -4,7 +4,20 @@ This Source Code Form is subject to the terms of the Mozilla Public License, v.
 If a copy of the MPL was not distributed with this file, You can obtain one at https://mozilla.org/MPL/2.0/.
 """
 
-from hub.store.store import get_cache_path
+import zarr
+
+from hub.store.lru_cache import LRUCache
+from hub.store.store import StorageMapWrapperWithCommit, get_cache_path
+
+
+class ListingStore(zarr.MemoryStore):
+    def __init__(self):
+        super().__init__()
+        self.listings = 0
+
+    def __iter__(self):
+        self.listings += 1
+        return super().__iter__()
 
 
 def test_get_cache_path():
@@ -18,5 +31,31 @@ def test_get_cache_path():
     assert "./cache/test\\testdb" == get_cache_path("C:\\test\\testdb", cache_folder)
 
 
+def test_cached_listing():
+    actual = ListingStore()
+    actual["a"] = b"1"
+    store = StorageMapWrapperWithCommit(actual)
+    cache = LRUCache(zarr.MemoryStore(), store, 100)
+    assert len(cache) == 1
+    cache["b"] = b"2"
+    assert len(cache) == 2
+    cache.flush()
+    # Flush lists the storage again
+    assert sorted(cache) == ["a", "b"]
+    del cache["a"]
+    store.setitems({"c": b"3"})
+    assert sorted(store) == ["b", "c"]
+    assert actual.listings == 2
+    actual["d"] = b"4"
+    store.invalidate_listing()
+    assert len(store) == 3
+    assert actual.listings == 3
+    actual["e"] = b"5"
+    cache.flush()
+    assert sorted(cache) == ["b", "c", "d", "e"]
+    assert actual.listings == 4
+
+
 if __name__ == "__main__":
     test_get_cache_path()
+    test_cached_listing()